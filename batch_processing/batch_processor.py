@@ -1,39 +1,43 @@
 import pandas as pd
-import importlib
+import numpy as np
+import asyncio
 import time
 import os
 import sys
-import random
-import requests
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
 from pathlib import Path
-from requests.exceptions import HTTPError
-from openpyxl.styles import Alignment
 
 # Add parent directory to path to import scoring modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-class RateLimiter:
-    """Handles rate limiting with exponential backoff and jitter."""
-    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0):
-        self.max_retries = max_retries
-        self.base_delay = base_delay
-        self.max_delay = max_delay
-    
-    def wait_and_retry(self, attempt):
-        if attempt >= self.max_retries:
-            raise Exception("Max retries exceeded")
-        
-        # Exponential backoff with jitter
-        delay = min(self.base_delay * (2 ** attempt) + random.uniform(0, 1), self.max_delay)
-        time.sleep(delay)
-        return delay
+from scoring_files.llm_client import (
+    APIRequestError, RateLimitError, configure_pool, configure_rate_limit, get_rate_limiter, submit
+)
+from scoring_files.usage import metered_usage, prompt_cache_report
+from scoring_files.combined import evaluate_combined_async
+from scoring_files.registry import get_metric, metric_names
+from batch_processing.budget import SpendBudget
+from batch_processing.excel_io import write_results_workbook
+from batch_processing.formats import (
+    count_rows, file_format, iter_rows, load_frame, open_result_writer, read_header, write_frame
+)
+from batch_processing.journal import (
+    BatchJournal, file_fingerprint, journal_path_for, load_journal
+)
+from batch_processing.planner import plan_batch
+
+STATUS_CATEGORIES = ["Passed", "Failed"]
+# Spend of this run on each row; rows whose results were shared with a
+# duplicate input or restored from the journal spent nothing
+USAGE_COLUMNS = ["Tokens Used", "Cost (USD)"]
 
 class BatchProcessor:
     """
     Handles batch processing of GenAI evaluation tasks from Excel files with robust rate limiting.
     """
 
-    def __init__(self, api_key, api_url, accept_criteria, request_delay=0.2):
+    def __init__(self, api_key, api_url, accept_criteria, max_workers=8, requests_per_second=None,
+                 combined_judge=False, token_budget=None, cost_budget=None, early_stop=False):
         """
         Initialize the batch processor.
 
@@ -41,34 +45,52 @@ class BatchProcessor:
         - api_key (str): The API key for DeepSeek
         - api_url (str): The API URL for DeepSeek
         - accept_criteria (dict): Dictionary of acceptance thresholds for each metric
-        - request_delay (float): Delay in seconds between each metric evaluation to avoid rate limits
+        - max_workers (int): Maximum number of (row, metric) evaluations in flight at once
+        - requests_per_second (float): Optional cap on the API request rate. The shared
+          adaptive rate limiter backs off below this (and below max_workers concurrent
+          requests) whenever the API throttles, then grows back towards it.
+        - combined_judge (bool): Score all metrics of a row with one API call instead
+          of one call (or several runs) per metric. Metrics the combined answer
+          leaves out are scored individually.
+        - token_budget (int): Optional cap on the tokens one run may spend
+        - cost_budget (float): Optional cap on the US dollars one run may spend. A run
+          that would go over either budget stops starting evaluations; its finished
+          cells are journaled, so it can be resumed with a larger budget.
+        - early_stop (bool): Let multi-run metrics (hallucination, consistency, ...)
+          stop sampling once further runs cannot change their median score.
+          Off by default: every configured run is made.
         """
         self.api_key = api_key
         self.api_url = api_url
         self.accept_criteria = accept_criteria
-        self.request_delay = request_delay
-        self.metrics = [
-            "Correctness", "Relevancy", "Hallucination", "Completeness",
-            "Bias", "Toxicity", "Consistency"
-        ]
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.combined_judge = combined_judge
+        self.metrics = metric_names()
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.early_stop = early_stop
+        # Spend of the last batch run; budget.meter has its usage per metric
+        self.budget = SpendBudget()
         self.required_columns = [
             "Question to chatbot", "Chatbot Response", "Expected Response"
         ]
 
     def validate_excel(self, file_path):
         """
-        Validates that the Excel file contains the required columns.
+        Validates that the input file contains the required columns.
 
         Parameters:
-        - file_path (str): Path to the Excel file
+        - file_path (str): Path to the Excel, CSV, JSONL or Parquet file
 
         Returns:
         - tuple: (is_valid, error_message)
         """
         try:
-            df = pd.read_excel(file_path)
+            # Only the header row is needed to check the columns
+            header = read_header(file_path)
             # Normalize column names for case insensitivity
-            normalized_columns = [col.strip().lower() for col in df.columns]
+            normalized_columns = [col.strip().lower() for col in header]
             missing_columns = [col for col in self.required_columns 
                               if col.lower() not in normalized_columns]
             
@@ -76,197 +98,612 @@ class BatchProcessor:
                 return False, f"Missing required columns: {', '.join(missing_columns)}"
             return True, ""
         except Exception as e:
-            return False, f"Error validating Excel file: {str(e)}"
+            return False, f"Error validating input file: {str(e)}"
+
+    def plan_batch(self, file_path, streaming=False, resume=False, journal_path=None):
+        """
+        Dry run: estimate the API calls, tokens, cost and wall time of processing
+        a file with the current metrics, mode, concurrency and budgets. Nothing
+        is sent to the API.
+
+        Parameters:
+        - file_path (str): Path to the Excel, CSV, JSONL or Parquet file
+        - streaming (bool): Plan a process_batch_streaming run instead
+        - resume (bool): Only count the cells an earlier run's journal is missing
+        - journal_path (str): Checkpoint journal location; defaults to one next to the file
+
+        Returns:
+        - BatchPlan: see batch_processing.planner; format() gives a printable report
+        """
+        return plan_batch(self, file_path, streaming=streaming, resume=resume, journal_path=journal_path)
 
-    def process_batch(self, file_path, progress_callback=None, status_callback=None, stop_flag=None):
+    def process_batch(self, file_path, progress_callback=None, status_callback=None, stop_flag=None,
+                      resume=False, journal_path=None):
         """
-        Process all rows in the Excel file for all metrics with rate limiting.
+        Process all rows in the input file for all metrics with rate limiting.
+
+        Every (row, metric) pair is scheduled as an independent coroutine on the
+        shared evaluation event loop, with at most ``max_workers`` in flight, so
+        wall-clock time scales with the concurrency limit rather than with the
+        number of rows.
 
         Parameters:
-        - file_path (str): Path to the Excel file
+        - file_path (str): Path to the Excel, CSV, JSONL or Parquet file
         - progress_callback (function): Optional callback function to report progress
         - status_callback (function): Optional callback for status messages
         - stop_flag (callable): Optional function that returns True if processing should stop
+        - resume (bool): Reuse the cells completed by an earlier, interrupted run of the
+          same file from its journal and evaluate only the missing ones
+        - journal_path (str): Checkpoint journal location; defaults to one next to the file
 
         Returns:
         - tuple: (processed_df, elapsed_time)
         """
         start_time = time.time()
-        df = pd.read_excel(file_path)
+        self.budget = SpendBudget(self.token_budget, self.cost_budget)
+        df = load_frame(file_path)
         total_rows = len(df)
         
-        # Preload scoring modules
-        scoring_modules = {}
+        evaluators = self.load_evaluators(status_callback)
+
+        # Results are collected in typed arrays per metric and attached to the
+        # frame in a single step once the run ends: scores as uint8 with a
+        # missing-value mask, statuses as category codes, reasons as interned text
+        scores = {metric: np.zeros(total_rows, dtype=np.uint8) for metric in self.metrics}
+        score_missing = {metric: np.ones(total_rows, dtype=bool) for metric in self.metrics}
+        status_codes = {metric: np.full(total_rows, -1, dtype=np.int8) for metric in self.metrics}
+        reasons = {metric: np.full(total_rows, None, dtype=object) for metric in self.metrics}
+        row_tokens = np.zeros(total_rows, dtype=np.int64)
+        row_cost = np.zeros(total_rows, dtype=np.float64)
+
+        def store(position, metric, cells):
+            score, status, reason = cells
+            if score is not None:
+                scores[metric][position] = score
+                score_missing[metric][position] = False
+            if status is not None:
+                status_codes[metric][position] = STATUS_CATEGORIES.index(status)
+            if reason is not None:
+                reasons[metric][position] = sys.intern(reason)
+
+        # Size the shared HTTP connection pool and rate limiter to the batch concurrency
+        configure_pool(self.max_workers)
+        configure_rate_limit(self.max_workers, self.requests_per_second)
+
+        # Read every row's inputs up front so each (row, metric) unit can be
+        # scheduled independently of the others
+        rows = self.input_rows(df)
+        units = self.plan_units(rows)
+
+        # Every finished cell is appended to the checkpoint journal. When
+        # resuming, cells an earlier run already completed are filled in
+        # from it and their units are not scheduled again.
+        journal_path = journal_path or journal_path_for(file_path)
+        fingerprint = file_fingerprint(file_path)
+        completed = load_journal(journal_path, fingerprint) if resume else {}
+        journal = BatchJournal(journal_path, fingerprint, resumed=bool(completed))
+        if completed and status_callback:
+            status_callback(f"Resuming: {len(completed)} cells restored from {os.path.basename(journal_path)}")
+
+        total_units = len(rows) * (1 if self.combined_judge else len(self.metrics))
+        unique_rows = {tuple(self.input_key(value) for value in row[1:]) for row in rows}
+        batch_stats = {
+            "duplicate_rows": len(rows) - len(unique_rows),
+            "evaluations_saved": total_units - len(units)
+        }
+
+        # Dispatch all units to the shared event loop and write results back
+        # into their cells as they complete. A unit is one (input, metric) pair,
+        # or a whole row in combined-judge mode.
+        remaining_metrics = {idx: len(self.metrics) for idx, _, _, _ in rows}
+        for (idx, metric), cells in completed.items():
+            if idx in remaining_metrics and metric in self.metrics:
+                store(idx, metric, self.restore_cell(metric, cells))
+                remaining_metrics[idx] -= 1
+        rows_done = sum(1 for remaining in remaining_metrics.values() if remaining == 0)
+        if progress_callback and rows_done:
+            progress_callback(rows_done, total_rows)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        futures = {}
+        try:
+            for (metric, _, _, _), (idx, question, chatbot_response, expected_response, indexes) in units.items():
+                unit_metrics = self.metrics if metric is None else [metric]
+                if all((i, m) in completed for i in indexes for m in unit_metrics):
+                    continue
+                if metric is None:
+                    future = submit(self.evaluate_row_combined(
+                        evaluators, idx,
+                        question, chatbot_response, expected_response,
+                        semaphore, status_callback, stop_flag
+                    ))
+                else:
+                    future = submit(self.evaluate_cell(
+                        evaluators.get(metric), metric, idx,
+                        question, chatbot_response, expected_response,
+                        semaphore, status_callback, stop_flag
+                    ))
+                futures[future] = indexes
+
+            for future in as_completed(futures):
+                cells, meter = future.result()
+                if meter is not None:
+                    # Tokens are charged to the row that was evaluated, not to its duplicates
+                    total = meter.total()
+                    row_tokens[futures[future][0]] += total["total_tokens"]
+                    row_cost[futures[future][0]] += total["cost"]
+                for idx in futures[future]:
+                    for metric, (score, status, reason) in cells.items():
+                        if (idx, metric) in completed:
+                            continue
+                        store(idx, metric, (score, status, reason))
+                        remaining_metrics[idx] -= 1
+                        # Failed cells stay out of the journal so a resume retries them
+                        if score is not None:
+                            journal.record(idx, metric, score, status, reason)
+
+                        if remaining_metrics[idx] == 0:
+                            rows_done += 1
+                            if progress_callback and rows_done < total_rows:
+                                progress_callback(rows_done, total_rows)
+
+                if stop_flag and stop_flag():
+                    break
+        finally:
+            # Drop any units that have not finished if we stopped early
+            for future in futures:
+                future.cancel()
+            journal.close()
+
+        # Attach all result columns at once, replacing any left in the input
+        # by an earlier run
+        results = {}
+        for metric in self.metrics:
+            results[f"{metric} Score"] = pd.arrays.IntegerArray(scores[metric], score_missing[metric])
+            results[f"{metric} Status"] = pd.Categorical.from_codes(status_codes[metric], STATUS_CATEGORIES)
+            results[f"{metric} Reason"] = pd.array(reasons[metric], dtype=object)
+        results[USAGE_COLUMNS[0]] = row_tokens
+        results[USAGE_COLUMNS[1]] = row_cost.round(6)
+        df = pd.concat(
+            [df.drop(columns=[col for col in results if col in df.columns]),
+             pd.DataFrame(results, index=df.index)],
+            axis=1
+        )
+        df.attrs.update(batch_stats)
+        self.report_usage(status_callback)
+        df.attrs["usage"] = self.budget.meter.by_metric()
+        df.attrs["budget_exhausted"] = self.budget.exhausted
+
+        elapsed_time = time.time() - start_time
+        return df, elapsed_time
+
+    def process_batch_streaming(self, file_path, output_path, progress_callback=None, status_callback=None,
+                                stop_flag=None, resume=False, journal_path=None, window=None, pass_counts=None):
+        """
+        Process an input too large to hold in memory, writing results as rows finish.
+
+        Rows are read in chunks (openpyxl read_only mode for workbooks) and at
+        most ``window`` rows are held at once: new rows are only read once earlier
+        ones are written. Each finished row goes straight to the output file, in
+        input order; Excel output also gets a summary sheet at the end.
+        Duplicate inputs are not coalesced here because that would require every
+        row in memory; repeated inputs are still served from the judgment cache.
+
+        Parameters:
+        - file_path (str): Path to the .xlsx, CSV, JSONL or Parquet input file
+        - output_path (str): Results file to create; its extension picks the format
+        - progress_callback (function): Optional callback function to report progress
+        - status_callback (function): Optional callback for status messages
+        - stop_flag (callable): Optional function that returns True if processing should stop
+        - resume (bool): Reuse the cells completed by an earlier run from its journal
+        - journal_path (str): Checkpoint journal location; defaults to one next to the file
+        - window (int): Maximum number of rows in memory; defaults to 16 per worker
+        - pass_counts (dict): Optional dict that receives {metric: (passed, total)}
+          for the rows written
+
+        Returns:
+        - tuple: (rows_written, elapsed_time)
+        """
+        start_time = time.time()
+        self.budget = SpendBudget(self.token_budget, self.cost_budget)
+        window = window or self.max_workers * 16
+        evaluators = self.load_evaluators(status_callback)
+        configure_pool(self.max_workers)
+        configure_rate_limit(self.max_workers, self.requests_per_second)
+
+        total_rows = count_rows(file_path)
+        header, rows = iter_rows(file_path)
+        positions = self.resolve_columns(header)
+
+        result_columns = [f"{metric} {kind}" for metric in self.metrics for kind in ("Score", "Status", "Reason")]
+        result_columns += USAGE_COLUMNS
+        # The required columns of a workbook are read as text on the in-memory
+        # path (see sidecar.normalize_inputs); other input columns keep their type
+        input_kinds = [None] * len(header)
+        if file_format(file_path) == "excel":
+            for position in positions:
+                if position is not None:
+                    input_kinds[position] = "text"
+        column_kinds = input_kinds + ["score", "status", "text"] * len(self.metrics) + ["tokens", "cost"]
+        writer = open_result_writer(output_path, header + result_columns, column_kinds, source_path=file_path)
+
+        journal_path = journal_path or journal_path_for(file_path)
+        fingerprint = file_fingerprint(file_path)
+        completed = load_journal(journal_path, fingerprint) if resume else {}
+        journal = BatchJournal(journal_path, fingerprint, resumed=bool(completed))
+        if completed and status_callback:
+            status_callback(f"Resuming: {len(completed)} cells restored from {os.path.basename(journal_path)}")
+
+        counts = {metric: [0, 0] for metric in self.metrics}
+        in_memory = {}  # idx -> (input values, {metric: cells}, [tokens, cost])
+        futures = {}
+        rows_done = 0
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        def finish_row(idx):
+            nonlocal rows_done
+            values, cells, spent = in_memory.pop(idx)
+            row = list(values)
+            for metric in self.metrics:
+                score, status, reason = cells.get(metric, (None, None, None))
+                row += [score, status, reason]
+                if status is not None:
+                    counts[metric][1] += 1
+                    counts[metric][0] += status == "Passed"
+            row += [spent[0], round(spent[1], 6)]
+            writer.add(idx, row)
+            rows_done += 1
+            if progress_callback and rows_done < total_rows:
+                progress_callback(rows_done, total_rows)
+
+        def schedule_row(idx, values):
+            question, chatbot_response, expected_response = (
+                "" if position is None or values[position] is None else values[position]
+                for position in positions
+            )
+            cells = {
+                metric: self.restore_cell(metric, completed[(idx, metric)])
+                for metric in self.metrics if (idx, metric) in completed
+            }
+            in_memory[idx] = (values, cells, [0, 0.0])
+            missing = [metric for metric in self.metrics if metric not in cells]
+            if not missing:
+                finish_row(idx)
+            elif self.combined_judge:
+                futures[submit(self.evaluate_row_combined(
+                    evaluators, idx, question, chatbot_response, expected_response,
+                    semaphore, status_callback, stop_flag
+                ))] = idx
+            else:
+                for metric in missing:
+                    futures[submit(self.evaluate_cell(
+                        evaluators.get(metric), metric, idx,
+                        question, chatbot_response, expected_response,
+                        semaphore, status_callback, stop_flag
+                    ))] = idx
+
+        try:
+            rows = enumerate(rows)
+            exhausted = False
+            while True:
+                # Read ahead only while the window has room, so memory stays
+                # bounded even when one slow row holds back finished ones
+                while (not exhausted and len(in_memory) + len(writer.buffer) < window
+                       and not (stop_flag and stop_flag()) and not self.budget.exhausted):
+                    try:
+                        idx, values = next(rows)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    schedule_row(idx, values)
+
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures.pop(future)
+                    _, cells, spent = in_memory[idx]
+                    unit_cells, meter = future.result()
+                    if meter is not None:
+                        total = meter.total()
+                        spent[0] += total["total_tokens"]
+                        spent[1] += total["cost"]
+                    for metric, (score, status, reason) in unit_cells.items():
+                        if metric in cells:
+                            continue
+                        cells[metric] = (score, status, reason)
+                        if score is not None:
+                            journal.record(idx, metric, score, status, reason)
+                    if len(cells) == len(self.metrics):
+                        finish_row(idx)
+
+                if stop_flag and stop_flag():
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+            journal.close()
+            summary = {metric: tuple(passed_total) for metric, passed_total in counts.items()}
+            writer.write_summary(summary, usage=self.budget.meter.by_metric(),
+                                 budget_exhausted=self.budget.exhausted)
+            if pass_counts is not None:
+                pass_counts.update(summary)
+            rows_written = writer.close()
+        self.report_usage(status_callback)
+
+        elapsed_time = time.time() - start_time
+        return rows_written, elapsed_time
+
+    @property
+    def usage(self):
+        """Token usage and cost of the last batch run, per metric."""
+        return self.budget.meter.by_metric()
+
+    @property
+    def budget_exhausted(self):
+        """Whether the last run stopped early because of token_budget or cost_budget."""
+        return self.budget.exhausted
+
+    def report_usage(self, status_callback=None):
+        """Report the prompt cache hit share and, if it ran out, the budget of the last run."""
+        if not status_callback:
+            return
+        report = prompt_cache_report(self.usage)
+        if report:
+            status_callback(report)
+        if self.budget.exhausted:
+            status_callback(self.budget.describe())
+
+    def load_evaluators(self, status_callback=None):
+        """
+        Look up the evaluator of each metric in the metric registry. Modules
+        are imported once per process, not per batch.
+
+        Returns:
+        - dict: {metric: registry Metric, or None if its evaluator cannot be loaded}
+        """
+        evaluators = {}
         for metric in self.metrics:
-            module_name = f"scoring_files.{metric.lower()}"
             try:
-                scoring_modules[metric] = importlib.import_module(module_name)
-                # Reload to ensure fresh state
-                importlib.reload(scoring_modules[metric])
-            except ImportError as e:
+                evaluators[metric] = get_metric(metric).load()
+            except (ImportError, ValueError) as e:
                 if status_callback:
                     status_callback(f"Error loading {metric} module: {str(e)}")
-                scoring_modules[metric] = None
+                evaluators[metric] = None
+        return evaluators
 
-        # Create result columns for each metric
+    async def evaluate_cell(self, evaluator, metric, idx, question, chatbot_response,
+                            expected_response, semaphore, status_callback=None, stop_flag=None):
+        """
+        Evaluate a single (row, metric) unit of work.
+
+        Runs as a coroutine on the shared event loop, so it only returns the
+        cell values and leaves writing them into the DataFrame to the
+        dispatching thread. Throttling is handled by the shared adaptive rate
+        limiter inside the HTTP client, which retries 429s as the API asks.
+
+        Returns:
+        - dict: {metric: (score, status, reason)}
+        - UsageMeter: tokens the unit spent, or None if it was not started
+        """
+        async with semaphore:
+            if (stop_flag and stop_flag()) or not self.budget.start_unit():
+                return {metric: (None, None, None)}, None
+            with metered_usage() as meter:
+                try:
+                    cells = {metric: await self.score_metric(
+                        evaluator, metric, idx,
+                        question, chatbot_response, expected_response, status_callback
+                    )}
+                finally:
+                    self.budget.finish_unit(meter)
+            return cells, meter
+
+    async def evaluate_row_combined(self, evaluators, idx, question, chatbot_response,
+                                    expected_response, semaphore, status_callback=None, stop_flag=None):
+        """
+        Evaluate every metric of a row with a single combined-judge call.
+        Metrics missing from the combined answer fall back to their own evaluator.
+
+        Returns:
+        - dict: {metric: (score, status, reason)}
+        - UsageMeter: tokens the row spent, or None if it was not started
+        """
+        async with semaphore:
+            if (stop_flag and stop_flag()) or not self.budget.start_unit():
+                return {metric: (None, None, None) for metric in self.metrics}, None
+
+            with metered_usage() as meter:
+                try:
+                    cells = await self.score_row_combined(
+                        evaluators, idx, question, chatbot_response, expected_response, status_callback
+                    )
+                finally:
+                    self.budget.finish_unit(meter)
+            return cells, meter
+
+    async def score_row_combined(self, evaluators, idx, question, chatbot_response,
+                                 expected_response, status_callback=None):
+        """
+        Returns:
+        - dict: {metric: (score, status, reason)}
+        """
+        try:
+            combined_results, _ = await evaluate_combined_async(
+                question, chatbot_response, expected_response,
+                self.api_key, self.api_url, metrics=self.metrics
+            )
+        except APIRequestError as e:
+            error_msg = self.describe_error(e, "combined evaluation", idx, status_callback)
+            return {metric: (None, None, error_msg) for metric in self.metrics}
+
+        cells = {}
         for metric in self.metrics:
-            df[f"{metric} Score"] = None
-            df[f"{metric} Status"] = None
-            df[f"{metric} Reason"] = None
+            if metric in combined_results:
+                cells[metric] = self.format_cell(metric, combined_results[metric])
+            else:
+                cells[metric] = await self.score_metric(
+                    evaluators.get(metric), metric, idx,
+                    question, chatbot_response, expected_response, status_callback
+                )
+        return cells
 
-        # Initialize rate limiter
-        rate_limiter = RateLimiter(max_retries=5, base_delay=10.0, max_delay=120.0)
+    async def score_metric(self, evaluator, metric, idx, question, chatbot_response,
+                           expected_response, status_callback=None):
+        """
+        Run one metric's evaluator and turn its result into cell values.
 
-        # Process each row
-        for idx, row in df.iterrows():
-            if stop_flag and stop_flag():
-                break
+        Returns:
+        - tuple: (score, status, reason)
+        """
+        if evaluator is None:
+            return None, None, "Scoring module not available"
 
-            # Get normalized column values (case-insensitive)
-            question = self.get_row_value(row, "Question to chatbot")
-            chatbot_response = self.get_row_value(row, "Chatbot Response")
-            expected_response = self.get_row_value(row, "Expected Response")
+        try:
+            # The registry passes the expected response only to metrics that use it
+            options = {"early_stop": True} if self.early_stop and "early_stop" in evaluator.signature.parameters else {}
+            result, _ = await evaluator.evaluate_async(
+                question, chatbot_response, expected_response,
+                self.api_key, self.api_url, **options
+            )
 
-            # Update progress if callback provided
-            if progress_callback:
-                progress_callback(idx, total_rows)
+            return self.format_cell(metric, result)
 
-            # Process each metric for this row
-            for metric in self.metrics:
-                if stop_flag and stop_flag():
-                    break
-                
-                # Add request delay between metrics
-                time.sleep(self.request_delay)
-                
-                # Try evaluation with rate limiting
-                for attempt in range(rate_limiter.max_retries):  # Max 5 attempts
-                    try:
-                        if scoring_modules.get(metric) is None:
-                            df.at[idx, f"{metric} Reason"] = "Scoring module not available"
-                            break
-                            
-                        evaluation_function = getattr(scoring_modules[metric], f"evaluate_{metric.lower()}")
-                        
-                        if metric == "Correctness":
-                            result, _ = evaluation_function(
-                                question, chatbot_response, expected_response,
-                                self.api_key, self.api_url
-                            )
-                        else:
-                            result, _ = evaluation_function(
-                                question, chatbot_response,
-                                self.api_key, self.api_url
-                            )
-
-                        score = result.get("score", 0)
-                        threshold = self.accept_criteria.get(metric, 90)
-                        
-                        # Determine status based on metric type
-                        if metric in ["Toxicity", "Bias", "Hallucination"]:
-                            status = "Failed" if score >= threshold else "Passed"
-                        else:
-                            status = "Passed" if score >= threshold else "Failed"
-                            
-                        # Update DataFrame
-                        df.at[idx, f"{metric} Score"] = f"{score}%"
-                        df.at[idx, f"{metric} Status"] = status
-                        df.at[idx, f"{metric} Reason"] = result.get("reason", "")
-                        break  # Success, exit retry loop
-
-                    except requests.exceptions.RequestException as e:
-                        # Check for 429 in the response (if available)
-                        status_code = getattr(getattr(e, "response", None), "status_code", None)
-                        if status_code == 429:
-                            delay = rate_limiter.wait_and_retry(attempt)
-                            if status_callback:
-                                status_callback(f"Rate limited on {metric} row {idx+1}. Waiting {delay:.1f}s...")
-                            print(f"429 Too Many Requests: waiting {delay:.1f}s before retry (attempt {attempt+1})")
-                        elif status_code == 401:
-                            error_msg = "Unauthorized: Check your API key."
-                            df.at[idx, f"{metric} Reason"] = error_msg
-                            if status_callback:
-                                status_callback(error_msg)
-                            break  # Do not retry on 401
-                        else:
-                            error_msg = f"HTTP error ({status_code}) processing {metric} for row {idx+1}: {str(e)}"
-                            df.at[idx, f"{metric} Reason"] = error_msg
-                            if status_callback:
-                                status_callback(error_msg)
-                            break
-                    except Exception as e:
-                        # Handle other exceptions
-                        error_msg = f"Error processing {metric} for row {idx+1}: {str(e)}"
-                        df.at[idx, f"{metric} Reason"] = error_msg
-                        if status_callback:
-                            status_callback(error_msg)
-                        break
+        except APIRequestError as e:
+            return None, None, self.describe_error(e, metric, idx, status_callback)
+        except Exception as e:
+            # Handle other exceptions
+            error_msg = f"Error processing {metric} for row {idx+1}: {str(e)}"
+            if status_callback:
+                status_callback(error_msg)
+            return None, None, error_msg
+
+    def format_cell(self, metric, result):
+        """
+        Convert an evaluator result into (score, status, reason) cell values.
+
+        Returns:
+        - tuple: (int 0-100, "Passed" or "Failed", interned reason text)
+        """
+        score = result.get("score", 0)
+        threshold = self.accept_criteria.get(metric, 90)
+
+        # Lower-is-better metrics (toxicity, bias, ...) pass below the threshold
+        status = "Passed" if get_metric(metric).passed(score, threshold) else "Failed"
+
+        # Scores are kept as whole numbers; the "%" is only an Excel number format
+        score = min(max(int(round(score)), 0), 100)
+        return score, status, sys.intern(str(result.get("reason", "")))
+
+    def describe_error(self, error, what, idx, status_callback=None):
+        """
+        Build the error message for a failed API request and report it.
+        """
+        if isinstance(error, RateLimitError):
+            error_msg = f"Rate limited processing {what} for row {idx+1}: {str(error)}"
+            if status_callback:
+                status_callback(f"{error_msg} (limiter: {get_rate_limiter().stats()})")
+            return error_msg
+        if error.status_code == 401:
+            error_msg = "Unauthorized: Check your API key."
+        else:
+            error_msg = f"HTTP error ({error.status_code}) processing {what} for row {idx+1}: {str(error)}"
+        if status_callback:
+            status_callback(error_msg)
+        return error_msg
+
+    def restore_cell(self, metric, cells):
+        """
+        Cell values of a journaled cell. Only the score is taken from the
+        journal; the status is judged again against the current accept
+        criteria, which may have changed since the cell was recorded.
+
+        Returns:
+        - tuple: (score, status, reason)
+        """
+        score, _, reason = cells
+        threshold = self.accept_criteria.get(metric, 90)
+        status = "Passed" if get_metric(metric).passed(score, threshold) else "Failed"
+        return score, status, reason
+
+    def input_rows(self, df):
+        """
+        The inputs of every row. Column positions are resolved once and rows
+        are read as plain tuples; rows are identified by their position in the file.
+        Blank cells read as NaN from a parsed workbook but as pd.NA from its
+        sidecar; both become "", as in process_batch_streaming, so every read
+        path gives the same rows and prompts.
+
+        Returns:
+        - list: (idx, question, chatbot_response, expected_response) tuples
+        """
+        positions = self.resolve_columns(df.columns)
+        return [
+            (idx,) + tuple(
+                "" if position is None or pd.isna(values[position]) else values[position]
+                for position in positions
+            )
+            for idx, values in enumerate(df.itertuples(index=False, name=None))
+        ]
+
+    def plan_units(self, rows):
+        """
+        Group rows into units of work, coalescing duplicate inputs: each unique
+        input is evaluated once per metric and the result is fanned out to
+        every row that shares it. Only metrics that read the expected response
+        tell apart rows that differ only in that column.
+
+        Returns:
+        - dict: {(metric, question, response, expected or None): (idx, question,
+          chatbot_response, expected_response, [row indexes])} where idx is the
+          row that is evaluated; a metric of None stands for a whole-row
+          combined-judge unit
+        """
+        units = {}
+        for idx, question, chatbot_response, expected_response in rows:
+            for metric in ([None] if self.combined_judge else self.metrics):
+                if metric is None:
+                    uses_expected = any(get_metric(name).needs_expected for name in self.metrics)
                 else:
-                    # Max retries exceeded
-                    df.at[idx, f"{metric} Reason"] = "Max retries exceeded"
+                    uses_expected = get_metric(metric).needs_expected
+                key = (
+                    metric,
+                    self.input_key(question),
+                    self.input_key(chatbot_response),
+                    self.input_key(expected_response) if uses_expected else None
+                )
+                if key not in units:
+                    units[key] = (idx, question, chatbot_response, expected_response, [])
+                units[key][4].append(idx)
+        return units
 
-        elapsed_time = time.time() - start_time
-        return df, elapsed_time
+    def input_key(self, value):
+        """Normalize a cell value for duplicate detection; blank cells all match."""
+        if pd.isna(value):
+            return ""
+        return str(value)
 
-    def get_row_value(self, row, column_name):
-        """Case-insensitive column value retrieval"""
-        normalized_columns = {col.lower(): col for col in row.index}
-        normalized_name = column_name.lower()
-        
-        if normalized_name in normalized_columns:
-            return row[normalized_columns[normalized_name]]
-        return ""
+    def resolve_columns(self, columns):
+        """
+        Case-insensitive positions of the required columns.
+
+        Returns:
+        - list: Position of each of self.required_columns, or None if missing
+        """
+        normalized_columns = {str(col).strip().lower(): position for position, col in enumerate(columns)}
+        return [normalized_columns.get(name.lower()) for name in self.required_columns]
 
     def save_results(self, df, output_path, add_summary=False):
         """
-        Save the processed results to an Excel file, optionally with a summary sheet.
-        Applies automatic formatting to the output.
+        Save the processed results, optionally with a summary sheet.
+        Excel output gets automatic formatting; a .csv, .jsonl or .parquet
+        output path writes the same columns in that format instead.
         """
         try:
-            if add_summary:
-                from batch_processing.summary import add_summary_sheet
-                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Results')
-                    add_summary_sheet(writer, df)
-                    self.apply_formatting(writer)
+            if file_format(output_path) != "excel":
+                write_frame(df, output_path)
             else:
-                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Results')
-                    self.apply_formatting(writer)
+                write_results_workbook(df, output_path, add_summary=add_summary)
             return True
         except Exception as e:
             print(f"Error saving results: {str(e)}")
             return False
-
-    def apply_formatting(self, writer):
-        """Apply consistent formatting to Excel output"""
-        workbook = writer.book
-        worksheet = writer.sheets['Results']
-        
-        # Define styles
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        wrap_alignment = Alignment(wrap_text=True, vertical='top')
-        
-        # Apply formatting to all columns
-        for col_idx, column in enumerate(worksheet.iter_cols(min_row=1, max_row=worksheet.max_row), 1):
-            col_letter = column[0].column_letter
-            
-            # Set column widths
-            worksheet.column_dimensions[col_letter].width = 25
-            
-            # Apply cell formatting
-            for cell in column:
-                if cell.row == 1:  # Header row
-                    cell.font = Font(bold=True)
-                    cell.alignment = center_alignment
-                else:
-                    if "Score" in cell.column_letter or "Status" in cell.column_letter:
-                        cell.alignment = center_alignment
-                    else:
-                        cell.alignment = wrap_alignment
-        
-        # Auto-adjust row heights for text-heavy columns
-        for row in worksheet.iter_rows():
-            for cell in row:
-                if "Reason" in cell.column_letter or cell.column_letter in ['A', 'B', 'C']:
-                    worksheet.row_dimensions[cell.row].height = 60
\ No newline at end of file
@@ -2,10 +2,9 @@ import os
 import threading
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-import pandas as pd
 
-from batch_processing.batch_processor import BatchProcessor
-from batch_processing.summary import add_summary_sheet
+# The processing modules (pandas, openpyxl, aiohttp) are imported on first
+# use, so building this panel does not delay the main window.
 
 class BatchUI:
     """
@@ -18,7 +17,7 @@ class BatchUI:
         self.api_url = api_url
         self.accept_criteria = accept_criteria
 
-        self.batch_processor = BatchProcessor(api_key, api_url, accept_criteria)
+        self._batch_processor = None
 
         # File paths
         self.uploaded_file_path = None
@@ -31,6 +30,14 @@ class BatchUI:
         # Setup UI components
         self.setup_ui()
 
+    @property
+    def batch_processor(self):
+        """The BatchProcessor, created on first use."""
+        if self._batch_processor is None:
+            from batch_processing.batch_processor import BatchProcessor
+            self._batch_processor = BatchProcessor(self.api_key, self.api_url, self.accept_criteria)
+        return self._batch_processor
+
     def setup_ui(self):
         # Main batch frame
         self.batch_frame = ctk.CTkFrame(self.parent_frame)
@@ -99,9 +106,11 @@ class BatchUI:
         )
         self.status_label.pack(pady=(5, 10))
 
-        # New left-aligned "Run Batch" button
+        # Left-aligned "Run Batch" and "Estimate" buttons
+        run_frame = ctk.CTkFrame(self.batch_frame, fg_color="transparent")
+        run_frame.pack(fill="x", padx=20, pady=(10, 0))
         self.batch_button = ctk.CTkButton(
-            self.batch_frame,
+            run_frame,
             text="Run Batch",
             command=self.run_batch_evaluation,
             fg_color="#28a745",
@@ -110,13 +119,55 @@ class BatchUI:
             height=30,
             state="disabled"
         )
-        self.batch_button.pack(pady=(10, 0), anchor="w", padx=20)
+        self.batch_button.pack(side="left", padx=(0, 10))
+
+        # Dry run: estimate calls, tokens, cost and time without calling the API
+        self.estimate_button = ctk.CTkButton(
+            run_frame,
+            text="Estimate",
+            command=self.estimate_batch,
+            fg_color="#6c757d",
+            hover_color="#5a6268",
+            width=100,
+            height=30,
+            state="disabled"
+        )
+        self.estimate_button.pack(side="left")
+
+        # Score all metrics of a row with one API call
+        self.combined_judge_var = ctk.BooleanVar(value=False)
+        self.combined_judge_checkbox = ctk.CTkCheckBox(
+            self.batch_frame,
+            text="Single-call mode (all metrics in one request per row)",
+            variable=self.combined_judge_var
+        )
+        self.combined_judge_checkbox.pack(pady=(10, 0), anchor="w", padx=20)
+
+        # Optional spend limits; a run stops starting evaluations before it would go over
+        budget_frame = ctk.CTkFrame(self.batch_frame, fg_color="transparent")
+        budget_frame.pack(fill="x", padx=20, pady=(10, 0))
+        self.token_budget_entry = ctk.CTkEntry(
+            budget_frame,
+            placeholder_text="Token budget (optional)",
+            width=180
+        )
+        self.token_budget_entry.pack(side="left", padx=(0, 10))
+        self.cost_budget_entry = ctk.CTkEntry(
+            budget_frame,
+            placeholder_text="Cost budget in USD (optional)",
+            width=200
+        )
+        self.cost_budget_entry.pack(side="left")
 
     def upload_excel(self):
         """Handle Excel file upload."""
+        from batch_processing.formats import (
+            INPUT_FILETYPES, STREAMING_ROW_THRESHOLD, can_stream, count_rows, preload_frame
+        )
+
         file_path = filedialog.askopenfilename(
-            title="Select Excel File",
-            filetypes=[("Excel files", "*.xlsx *.xls")]
+            title="Select Input File",
+            filetypes=INPUT_FILETYPES
         )
 
         if not file_path:
@@ -126,56 +177,165 @@ class BatchUI:
         is_valid, error_message = self.batch_processor.validate_excel(file_path)
 
         if not is_valid:
-            messagebox.showerror("Invalid Excel File", error_message)
+            messagebox.showerror("Invalid Input File", error_message)
             return
 
+        # Parse the rows in the background while the user gets ready to run;
+        # large workbooks are streamed at run time instead
+        if not (can_stream(file_path) and count_rows(file_path) > STREAMING_ROW_THRESHOLD):
+            preload_frame(file_path)
+
         # Update UI
         self.uploaded_file_path = file_path
         filename = os.path.basename(file_path)
         self.file_label.configure(text=f"Selected: {filename}", text_color="white")
         self.batch_button.configure(state="normal")
+        self.estimate_button.configure(state="normal")
         self.download_button.configure(state="disabled")
         self.processed_file_path = None
 
     def run_batch_evaluation(self):
         """Run batch evaluation on the uploaded Excel file."""
+        from batch_processing.journal import journal_path_for
+
         if not self.uploaded_file_path or self.is_processing:
             return
 
+        # Offer to continue an interrupted run of the same file
+        resume = False
+        if os.path.exists(journal_path_for(self.uploaded_file_path)):
+            resume = messagebox.askyesno(
+                "Resume Batch",
+                "An interrupted run of this file was found. Resume it and only evaluate the missing results?"
+            )
+
+        if not self.apply_settings():
+            return
+
         self.is_processing = True
         self.update_ui_processing_started()
 
         # Start processing in a separate thread
         self.processing_thread = threading.Thread(
             target=self._process_batch,
+            args=(resume,),
             daemon=True
         )
         self.processing_thread.start()
 
-    def _process_batch(self):
+    def apply_settings(self):
+        """
+        Pass the mode and budgets chosen in the panel to the processor.
+
+        Returns:
+        - bool: False if a budget entry is invalid (an error is shown)
+        """
+        try:
+            token_budget = self.read_budget(self.token_budget_entry, int)
+            cost_budget = self.read_budget(self.cost_budget_entry, float)
+        except ValueError:
+            messagebox.showerror("Invalid Budget", "Budgets must be positive numbers, or left empty.")
+            return False
+        self.batch_processor.combined_judge = self.combined_judge_var.get()
+        self.batch_processor.token_budget = token_budget
+        self.batch_processor.cost_budget = cost_budget
+        return True
+
+    def estimate_batch(self):
+        """Show a dry-run estimate of the uploaded file with the current settings."""
+        from batch_processing.journal import journal_path_for
+
+        if not self.uploaded_file_path or self.is_processing or not self.apply_settings():
+            return
+
+        file_path = self.uploaded_file_path
+        resume = os.path.exists(journal_path_for(file_path))
+        self.estimate_button.configure(state="disabled")
+        self.status_label.configure(text="Estimating...", text_color="gray")
+
+        def run():
+            from batch_processing.formats import STREAMING_ROW_THRESHOLD, can_stream, count_rows
+
+            try:
+                streaming = can_stream(file_path) and count_rows(file_path) > STREAMING_ROW_THRESHOLD
+                report = self.batch_processor.plan_batch(file_path, streaming=streaming, resume=resume).format()
+                self.parent_frame.after(0, lambda: self.show_estimate(report))
+            except Exception as e:
+                self.parent_frame.after(0, lambda err=str(e): self.update_ui_processing_error(err))
+            finally:
+                self.parent_frame.after(0, lambda: self.estimate_button.configure(state="normal"))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_estimate(self, report):
+        """Display a dry-run report."""
+        self.status_label.configure(text="Estimate ready", text_color="gray")
+        messagebox.showinfo("Batch Estimate", report)
+
+    def read_budget(self, entry, kind):
+        """
+        Parse a budget entry.
+
+        Returns:
+        - int or float: the budget, or None if the entry is empty
+
+        Raises:
+        - ValueError: if the entry is not a positive number
+        """
+        text = entry.get().strip().lstrip("$").replace(",", "")
+        if not text:
+            return None
+        value = kind(text)
+        if value <= 0:
+            raise ValueError(text)
+        return value
+
+    def _process_batch(self, resume=False):
         """Process the batch in a separate thread."""
         try:
-            # Process the batch
-            df, elapsed_time = self.batch_processor.process_batch(
-                self.uploaded_file_path,
-                progress_callback=self.update_progress
-            )
+            from batch_processing.excel_io import write_results_workbook
+            from batch_processing.formats import STREAMING_ROW_THRESHOLD, can_stream, count_rows
+            from batch_processing.journal import discard_journal, journal_path_for
 
             # Save results to a temporary file
             output_dir = os.path.dirname(self.uploaded_file_path)
             base_name = os.path.splitext(os.path.basename(self.uploaded_file_path))[0]
             self.processed_file_path = os.path.join(output_dir, f"{base_name}_results.xlsx")
 
-            # Save with summary sheet
-            with pd.ExcelWriter(self.processed_file_path, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Results')
-                add_summary_sheet(writer, df)
+            if (can_stream(self.uploaded_file_path)
+                    and count_rows(self.uploaded_file_path) > STREAMING_ROW_THRESHOLD):
+                # Large input: stream rows in and results out with bounded memory
+                _, elapsed_time = self.batch_processor.process_batch_streaming(
+                    self.uploaded_file_path,
+                    self.processed_file_path,
+                    progress_callback=self.update_progress,
+                    resume=resume
+                )
+            else:
+                # Process the batch
+                df, elapsed_time = self.batch_processor.process_batch(
+                    self.uploaded_file_path,
+                    progress_callback=self.update_progress,
+                    resume=resume
+                )
+
+                # Save with summary sheet
+                write_results_workbook(df, self.processed_file_path)
 
             # Format elapsed time
             hours, remainder = divmod(elapsed_time, 3600)
             minutes, seconds = divmod(remainder, 60)
             time_str = f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
 
+            if self.batch_processor.budget_exhausted:
+                # Keep the journal so the next run can resume with a larger budget
+                message = f"{self.batch_processor.budget.describe()}. Partial results saved; run again to resume."
+                self.parent_frame.after(0, lambda: self.update_ui_processing_paused(message))
+                return
+
+            # The results are saved, so the checkpoint journal is no longer needed
+            discard_journal(journal_path_for(self.uploaded_file_path))
+
             # Update UI on the main thread
             self.parent_frame.after(0, lambda: self.update_ui_processing_completed(True, time_str))
 
@@ -194,6 +354,7 @@ class BatchUI:
     def update_ui_processing_started(self):
         """Update UI when processing starts."""
         self.batch_button.configure(state="disabled")
+        self.estimate_button.configure(state="disabled")
         self.upload_button.configure(state="disabled")
         self.download_button.configure(state="disabled")
         self.progress_bar.set(0)
@@ -203,6 +364,7 @@ class BatchUI:
         """Update UI when processing completes."""
         self.is_processing = False
         self.batch_button.configure(state="normal")
+        self.estimate_button.configure(state="normal")
         self.upload_button.configure(state="normal")
 
         if success:
@@ -218,10 +380,20 @@ class BatchUI:
                 text_color="#dc3545"
             )
 
+    def update_ui_processing_paused(self, message):
+        """Update UI when a run stops on its budget; the partial results can be downloaded."""
+        self.is_processing = False
+        self.batch_button.configure(state="normal")
+        self.estimate_button.configure(state="normal")
+        self.upload_button.configure(state="normal")
+        self.download_button.configure(state="normal")
+        self.status_label.configure(text=message, text_color="#fd7e14")
+
     def update_ui_processing_error(self, error_message):
         """Update UI when processing encounters an error."""
         self.is_processing = False
         self.batch_button.configure(state="normal")
+        self.estimate_button.configure(state="normal")
         self.upload_button.configure(state="normal")
         self.status_label.configure(
             text=f"Error: {error_message}",
@@ -257,7 +429,8 @@ class BatchUI:
     def update_accept_criteria(self, new_criteria):
         """Update the acceptance criteria used for batch processing."""
         self.accept_criteria = new_criteria
-        self.batch_processor.accept_criteria = new_criteria
+        if self._batch_processor is not None:
+            self._batch_processor.accept_criteria = new_criteria
 
     def clear_fields(self):
         """Reset all batch UI elements to their initial state."""
@@ -265,6 +438,7 @@ class BatchUI:
         self.processed_file_path = None
         self.file_label.configure(text="No file selected", text_color="gray")
         self.batch_button.configure(state="disabled")
+        self.estimate_button.configure(state="disabled")
         self.download_button.configure(state="disabled")
         self.progress_bar.set(0)
         self.status_label.configure(text="Ready", text_color="gray")
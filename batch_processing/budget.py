@@ -0,0 +1,89 @@
+import threading
+
+from scoring_files.usage import UsageMeter
+
+# Spend limits for batch runs.
+# A SpendBudget caps the tokens and/or US dollars one run may spend. Each
+# unit of work asks for room before it starts. The projected spend is what
+# has been spent so far, plus the average cost of a finished unit for every
+# unit still in flight and for the one about to start. If that would go over
+# a limit the unit is refused and the budget is marked exhausted. Units
+# already in flight still finish, so the tokens they spend are not wasted.
+#
+# Refused cells are left empty and stay out of the checkpoint journal, so
+# rerunning with resume and a larger budget picks up where the run paused.
+
+
+class SpendBudget:
+    """
+    Token and cost allowance of one batch run.
+
+    Parameters:
+    - max_tokens (int): Total tokens (prompt + completion) the run may spend; None for no limit
+    - max_cost (float): US dollars the run may spend, at usage.py's prices; None for no limit
+    """
+
+    def __init__(self, max_tokens=None, max_cost=None):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.meter = UsageMeter()
+        self.tokens = 0
+        self.cost = 0.0
+        self.units_finished = 0
+        self.in_flight = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self):
+        return self.max_tokens is not None or self.max_cost is not None
+
+    def start_unit(self):
+        """
+        Reserve room for one more unit of work.
+
+        Returns:
+        - bool: False if starting it would take the run over budget
+        """
+        with self._lock:
+            if self.exhausted:
+                return False
+            # Until a unit has finished there is no cost estimate, so the
+            # first units always start
+            if self.limited and self.units_finished:
+                units = self.in_flight + 1
+                if self._over(self.tokens + self.tokens / self.units_finished * units,
+                              self.cost + self.cost / self.units_finished * units):
+                    self.exhausted = True
+                    return False
+            self.in_flight += 1
+            return True
+
+    def finish_unit(self, meter):
+        """Record what a unit started with start_unit spent."""
+        total = meter.total()
+        self.meter.merge(meter)
+        with self._lock:
+            self.in_flight -= 1
+            self.units_finished += 1
+            self.tokens += total["total_tokens"]
+            self.cost += total["cost"]
+            if self._over(self.tokens, self.cost, inclusive=True):
+                self.exhausted = True
+
+    def _over(self, tokens, cost, inclusive=False):
+        if inclusive:
+            return ((self.max_tokens is not None and tokens >= self.max_tokens)
+                    or (self.max_cost is not None and cost >= self.max_cost))
+        return ((self.max_tokens is not None and tokens > self.max_tokens)
+                or (self.max_cost is not None and cost > self.max_cost))
+
+    def describe(self):
+        """Status line for a run that stopped on its budget."""
+        limits = []
+        if self.max_tokens is not None:
+            limits.append(f"{self.max_tokens:,} tokens")
+        if self.max_cost is not None:
+            limits.append(f"${self.max_cost:g}")
+        return (f"Budget of {' / '.join(limits)} reached after {self.tokens:,} tokens "
+                f"(${self.cost:,.4f}); no further evaluations were started")
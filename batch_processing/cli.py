@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+
+# Headless batch runner for cron jobs and CI on machines without a display.
+# It wraps BatchProcessor and never imports tkinter or customtkinter; the
+# processing modules are only imported after the arguments are parsed, so
+# --help and argument errors return immediately.
+#
+#   python -m batch_processing.cli traces.xlsx -o results.xlsx --workers 16
+#   python -m batch_processing.cli traces.jsonl --metrics Correctness,Relevancy --threshold 80
+#
+# The API key is read from --api-key or the DEEPSEEK_API_KEY environment variable.
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scoring_files.registry import get_metric, metric_names
+
+DEFAULT_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEFAULT_THRESHOLD = 90
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_BUDGET = 3
+EXIT_STOPPED = 130
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m batch_processing.cli",
+        description="Evaluate a batch file of chatbot responses without the GUI."
+    )
+    parser.add_argument("input", help="Input .xlsx, .xls, .csv, .jsonl or .parquet file")
+    parser.add_argument("-o", "--output",
+                        help="Results file; its extension picks the format (default: <input>_results.xlsx)")
+    parser.add_argument("--metrics",
+                        help=f"Comma-separated metrics to evaluate (default: all of {','.join(metric_names())})")
+    parser.add_argument("--threshold", action="append", default=[], metavar="[METRIC=]PERCENT",
+                        help=f"Acceptance threshold for every metric, or for one metric with METRIC=PERCENT; "
+                             f"repeatable (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Evaluations in flight at once (default: 8)")
+    parser.add_argument("--rps", type=float,
+                        help="Cap on API requests per second")
+    parser.add_argument("--max-tokens", type=int,
+                        help="Stop starting evaluations before the run spends more tokens than this")
+    parser.add_argument("--max-cost", type=float, metavar="USD",
+                        help="Stop starting evaluations before the run spends more US dollars than this")
+    parser.add_argument("--combined", action="store_true",
+                        help="Score all metrics of a row with one API call")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="Stop sampling multi-run metrics once more runs cannot change their median")
+    parser.add_argument("--stream", choices=("auto", "always", "never"), default="auto",
+                        help="Stream rows in and results out with bounded memory (default: auto, for large inputs)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only estimate the API calls, tokens, cost and time of the run, without calling the API")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run of the same input from its journal")
+    parser.add_argument("--journal", help="Checkpoint journal location (default: next to the input)")
+    parser.add_argument("--keep-journal", action="store_true",
+                        help="Keep the journal after the results are saved")
+    parser.add_argument("--cache",
+                        help="Judgment cache database (default: GENAI_EVALUATOR_CACHE or ~/.genai_evaluator)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the judgment cache")
+    parser.add_argument("--cache-max-mb", type=float, help="Size cap of the judgment cache in MB")
+    parser.add_argument("--cache-ttl-days", type=float, help="Days a cached judgment stays valid")
+    parser.add_argument("--api-key", default=os.environ.get("DEEPSEEK_API_KEY", ""),
+                        help="API key (default: DEEPSEEK_API_KEY)")
+    parser.add_argument("--api-url", default=os.environ.get("DEEPSEEK_API_URL", DEFAULT_API_URL),
+                        help="Chat completions endpoint (default: DEEPSEEK_API_URL or DeepSeek)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors and the final summary")
+    return parser
+
+
+def parse_metrics(value):
+    """
+    Resolve a comma-separated metric list, case-insensitively.
+
+    Raises:
+    - ValueError: for unknown metric names
+    """
+    if not value:
+        return metric_names()
+    metrics = []
+    for name in value.split(","):
+        if not name.strip():
+            continue
+        metric = get_metric(name).name
+        if metric not in metrics:
+            metrics.append(metric)
+    if not metrics:
+        raise ValueError("No metrics selected")
+    return metrics
+
+
+def parse_thresholds(values):
+    """
+    Build accept_criteria from --threshold values such as "80" or "Toxicity=20".
+
+    Raises:
+    - ValueError: for malformed values, unknown metrics or percentages outside 0-100
+    """
+    accept_criteria = {metric: DEFAULT_THRESHOLD for metric in metric_names()}
+    for value in values:
+        metric, _, percent = value.rpartition("=")
+        try:
+            percent = float(percent.strip().rstrip("%"))
+        except ValueError:
+            raise ValueError(f"Invalid threshold '{value}'")
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Threshold '{value}' must be between 0 and 100")
+        if not metric:
+            accept_criteria = {name: percent for name in metric_names()}
+        else:
+            accept_criteria[get_metric(metric).name] = percent
+    return accept_criteria
+
+
+def default_output_path(input_path):
+    base, _ = os.path.splitext(input_path)
+    return f"{base}_results.xlsx"
+
+
+def configure_judgment_cache(args):
+    """Apply the --cache options; without any, the cache opens as usual on first use."""
+    if not (args.no_cache or args.cache or args.cache_max_mb is not None or args.cache_ttl_days is not None):
+        return
+    from scoring_files.judgment_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL
+    from scoring_files.llm_client import configure_cache
+
+    configure_cache(
+        path=args.cache or os.environ.get("GENAI_EVALUATOR_CACHE", str(DEFAULT_CACHE_PATH)),
+        max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb is not None else DEFAULT_MAX_BYTES,
+        ttl=args.cache_ttl_days * 24 * 3600 if args.cache_ttl_days is not None else DEFAULT_TTL,
+        enabled=not args.no_cache
+    )
+
+
+def print_summary(pass_counts, rows, elapsed_time, output_path, usage=None):
+    """Print the pass rate of each metric, for logs and CI output."""
+    minutes, seconds = divmod(elapsed_time, 60)
+    print(f"Evaluated {rows} rows in {int(minutes)}m {seconds:.1f}s -> {output_path}")
+    for metric, (passed, total) in pass_counts.items():
+        rate = f"{passed / total * 100:.1f}%" if total else "N/A"
+        print(f"  {metric:<14} {rate:>7}  ({passed}/{total} passed)")
+    if usage:
+        from scoring_files.llm_client import prompt_cache_report
+
+        tokens = sum(counts["total_tokens"] for counts in usage.values())
+        cost = sum(counts["cost"] for counts in usage.values())
+        print(f"Spent {tokens:,} tokens (${cost:,.4f}) on {sum(counts['calls'] for counts in usage.values())} calls")
+        report = prompt_cache_report(usage)
+        if report:
+            print(report)
+
+
+def run(args):
+    """
+    Run one batch evaluation from parsed arguments.
+
+    Returns:
+    - int: process exit code
+    """
+    try:
+        metrics = parse_metrics(args.metrics)
+        accept_criteria = parse_thresholds(args.threshold)
+    except ValueError as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    if not args.api_key and not args.dry_run:
+        print("error: no API key; pass --api-key or set DEEPSEEK_API_KEY", file=sys.stderr)
+        return EXIT_USAGE
+    if args.workers < 1:
+        print("error: --workers must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+    if (args.max_tokens is not None and args.max_tokens <= 0) or (args.max_cost is not None and args.max_cost <= 0):
+        print("error: --max-tokens and --max-cost must be positive", file=sys.stderr)
+        return EXIT_USAGE
+
+    from batch_processing.batch_processor import BatchProcessor
+    from batch_processing.formats import STREAMING_ROW_THRESHOLD, can_stream, count_rows
+    from batch_processing.journal import discard_journal, journal_path_for
+
+    output_path = args.output or default_output_path(args.input)
+    journal_path = args.journal or journal_path_for(args.input)
+
+    processor = BatchProcessor(
+        args.api_key, args.api_url, accept_criteria,
+        max_workers=args.workers,
+        requests_per_second=args.rps,
+        combined_judge=args.combined,
+        token_budget=args.max_tokens,
+        cost_budget=args.max_cost,
+        early_stop=args.early_stop
+    )
+    processor.metrics = metrics
+
+    is_valid, error_message = processor.validate_excel(args.input)
+    if not is_valid:
+        print(f"error: {error_message}", file=sys.stderr)
+        return EXIT_FAILED
+
+    if args.stream == "always":
+        streaming = True
+    elif args.stream == "never":
+        streaming = False
+    else:
+        streaming = can_stream(args.input) and count_rows(args.input) > STREAMING_ROW_THRESHOLD
+
+    if args.dry_run:
+        try:
+            plan = processor.plan_batch(args.input, streaming=streaming, resume=args.resume, journal_path=journal_path)
+        except Exception as e:
+            print(f"error: {str(e)}", file=sys.stderr)
+            return EXIT_FAILED
+        print(plan.format())
+        return EXIT_OK
+
+    configure_judgment_cache(args)
+
+    # Ctrl-C or SIGTERM finishes the cells in flight, journals them and exits;
+    # a rerun with --resume picks up from there
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        if stop_event.is_set():
+            raise KeyboardInterrupt
+        print("Stopping after the evaluations in flight (again to abort)...", file=sys.stderr)
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    def report_status(message):
+        print(message, file=sys.stderr)
+
+    last_percent = [-1]
+
+    def report_progress(current, total):
+        percent = int(current * 100 / total) if total else 100
+        if percent != last_percent[0]:
+            last_percent[0] = percent
+            print(f"Processed {current}/{total} rows ({percent}%)", file=sys.stderr)
+
+    progress_callback = None if args.quiet else report_progress
+    status_callback = None if args.quiet else report_status
+
+    # The evaluators print their raw API responses; --quiet keeps them out of
+    # stdout so the summary is all a cron mail or CI log shows
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        try:
+            if streaming:
+                pass_counts = {}
+                rows, elapsed_time = processor.process_batch_streaming(
+                    args.input, output_path,
+                    progress_callback=progress_callback,
+                    status_callback=status_callback,
+                    stop_flag=stop_event.is_set,
+                    resume=args.resume,
+                    journal_path=journal_path,
+                    pass_counts=pass_counts
+                )
+            else:
+                df, elapsed_time = processor.process_batch(
+                    args.input,
+                    progress_callback=progress_callback,
+                    status_callback=status_callback,
+                    stop_flag=stop_event.is_set,
+                    resume=args.resume,
+                    journal_path=journal_path
+                )
+                if stop_event.is_set():
+                    print(f"Stopped; rerun with --resume to continue from {journal_path}", file=sys.stderr)
+                    return EXIT_STOPPED
+                if not processor.save_results(df, output_path, add_summary=True):
+                    print(f"error: could not save results to {output_path}", file=sys.stderr)
+                    return EXIT_FAILED
+                rows = len(df)
+                pass_counts = {}
+                for metric in metrics:
+                    statuses = df[f"{metric} Status"]
+                    pass_counts[metric] = (int((statuses == "Passed").sum()), int(statuses.notna().sum()))
+        except KeyboardInterrupt:
+            print(f"Aborted; rerun with --resume to continue from {journal_path}", file=sys.stderr)
+            return EXIT_STOPPED
+        except Exception as e:
+            print(f"error: {str(e)}", file=sys.stderr)
+            return EXIT_FAILED
+
+    if stop_event.is_set():
+        print(f"Stopped after {rows} rows; rerun with --resume to continue from {journal_path}", file=sys.stderr)
+        return EXIT_STOPPED
+
+    if processor.budget_exhausted:
+        # Partial results are saved; the journal stays so a larger budget can finish the run
+        print_summary(pass_counts, rows, elapsed_time, output_path, usage=processor.usage)
+        print(f"{processor.budget.describe()}; rerun with --resume and a larger budget "
+              f"to continue from {journal_path}", file=sys.stderr)
+        return EXIT_BUDGET
+
+    if not args.keep_journal:
+        discard_journal(journal_path)
+    print_summary(pass_counts, rows, elapsed_time, output_path, usage=processor.usage)
+    return EXIT_OK
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from batch_processing.summary import write_streaming_summary
+
+# Streaming Excel I/O for workbooks too large to hold in memory.
+# Input rows are iterated with openpyxl's read_only mode, which parses the
+# sheet XML lazily, and results are written with write_only mode, which
+# serializes each row as soon as it is appended. Neither side keeps the
+# whole workbook in memory.
+
+STREAMING_EXTENSIONS = (".xlsx", ".xlsm")
+# Scores are stored as whole numbers 0-100; this shows them as "85%"
+# without changing the cell value
+SCORE_NUMBER_FORMAT = '0"%"'
+
+
+def supports_streaming(file_path):
+    """read_only/write_only modes only exist for the OOXML formats."""
+    return str(file_path).lower().endswith(STREAMING_EXTENSIONS)
+
+
+def iter_excel_rows(file_path):
+    """
+    Stream the rows of the first worksheet.
+
+    Parameters:
+    - file_path (str): Path to the Excel file
+
+    Returns:
+    - list: Header names
+    - generator: Row value tuples, padded to the header length; the workbook is
+      closed when the generator is exhausted or closed
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    worksheet = workbook.worksheets[0]
+    rows = worksheet.iter_rows(values_only=True)
+    try:
+        header = [("" if value is None else str(value)) for value in next(rows)]
+    except StopIteration:
+        workbook.close()
+        return [], iter(())
+
+    def generate():
+        try:
+            width = len(header)
+            for values in rows:
+                # Skip the trailing empty rows some editors leave behind
+                if values is None or all(value is None for value in values):
+                    continue
+                values = tuple(values[:width])
+                yield values + (None,) * (width - len(values))
+        finally:
+            workbook.close()
+
+    return header, generate()
+
+
+def read_excel_header(file_path):
+    """
+    Read only the header row of the first worksheet.
+
+    Returns:
+    - list: Header names
+    """
+    if not supports_streaming(file_path):
+        return [str(col) for col in pd.read_excel(file_path, nrows=0).columns]
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        for values in workbook.worksheets[0].iter_rows(max_row=1, values_only=True):
+            return [("" if value is None else str(value)) for value in values]
+        return []
+    finally:
+        workbook.close()
+
+
+def is_score_column(name):
+    return str(name).endswith(" Score")
+
+
+def result_styles(workbook):
+    """
+    Register the named styles used for results sheets on a workbook.
+
+    A named style is stored once in the workbook and cells only reference
+    it, so styling a cell is a single assignment instead of building and
+    de-duplicating Font/Alignment objects per cell.
+
+    Returns:
+    - dict: {"header" | "score" | "status" | "text": style name}
+    """
+    styles = {
+        "header": NamedStyle(
+            name="Result Header",
+            font=Font(bold=True),
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True)
+        ),
+        "score": NamedStyle(
+            name="Result Score",
+            alignment=Alignment(horizontal="center", vertical="center"),
+            number_format=SCORE_NUMBER_FORMAT
+        ),
+        "status": NamedStyle(
+            name="Result Status",
+            alignment=Alignment(horizontal="center", vertical="center")
+        ),
+        "text": NamedStyle(
+            name="Result Text",
+            alignment=Alignment(wrap_text=True, vertical="top")
+        ),
+    }
+    for style in styles.values():
+        if style.name not in workbook.named_styles:
+            workbook.add_named_style(style)
+    return {key: style.name for key, style in styles.items()}
+
+
+def column_style(name):
+    """Style key for a results column."""
+    if is_score_column(name):
+        return "score"
+    if str(name).endswith(" Status"):
+        return "status"
+    return "text"
+
+
+def count_excel_rows(file_path):
+    """
+    Data row count from the sheet dimensions, without reading the rows.
+    The count can be off for files whose writer did not record dimensions.
+    """
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return max(0, (workbook.worksheets[0].max_row or 1) - 1)
+    finally:
+        workbook.close()
+
+
+class StreamingResultWriter:
+    """
+    Write-only results workbook that accepts rows in any order.
+
+    Rows completed out of order are buffered until every earlier row has
+    been written, so at most the rows still in flight are kept in memory.
+
+    Every column has one cell carrying its named style (see column_style).
+    Write-only sheets serialize a row as soon as it is appended, so each row
+    only sets the values of those cells; nothing is styled per cell.
+
+    Parameters:
+    - output_path (str): Workbook to create
+    - columns (list): Header names
+    - first_index (int): Index of the first row that will be added
+    - row_height (float): Height of the data rows
+    """
+
+    def __init__(self, output_path, columns, first_index=0, row_height=60):
+        self.output_path = output_path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet("Results")
+        self.next_index = first_index
+        self.buffer = {}
+        self.rows_written = 0
+
+        for col_idx in range(len(columns)):
+            self.worksheet.column_dimensions[get_column_letter(col_idx + 1)].width = 25
+        # Data rows get their height from the sheet default instead of one
+        # row dimension each, which would grow with the row count
+        self.worksheet.sheet_format.defaultRowHeight = row_height
+        self.worksheet.sheet_format.customHeight = True
+        self.worksheet.row_dimensions[1].height = 15
+
+        self.styles = result_styles(self.workbook)
+        header = []
+        for name in columns:
+            cell = WriteOnlyCell(self.worksheet, value=name)
+            cell.style = self.styles["header"]
+            header.append(cell)
+        self.worksheet.append(header)
+
+        self.cells = []
+        for name in columns:
+            cell = WriteOnlyCell(self.worksheet)
+            cell.style = self.styles[column_style(name)]
+            self.cells.append(cell)
+
+    def add(self, index, values):
+        """Queue a finished row and write every row that is now in order."""
+        self.buffer[index] = values
+        while self.next_index in self.buffer:
+            self._append(self.buffer.pop(self.next_index))
+            self.next_index += 1
+            self.rows_written += 1
+
+    def _append(self, values):
+        for cell, value in zip(self.cells, values):
+            cell.value = value
+        self.worksheet.append(self.cells)
+
+    def write_summary(self, pass_counts, usage=None, stats=None, budget_exhausted=False):
+        """
+        Add the summary sheet; pass_counts is {metric: (passed, total)}, usage
+        {metric: usage}, stats the duplicate counts of process_batch.
+        """
+        write_streaming_summary(self.workbook.create_sheet("Summary"), pass_counts, usage,
+                                stats=stats, budget_exhausted=budget_exhausted)
+
+    def close(self):
+        """
+        Save the workbook. Rows still buffered behind a missing earlier row
+        (a stopped run) are written as well, in index order.
+
+        Returns:
+        - int: number of result rows written
+        """
+        for index in sorted(self.buffer):
+            self._append(self.buffer.pop(index))
+            self.rows_written += 1
+        self.workbook.save(self.output_path)
+        return self.rows_written
+
+
+
+def write_results_workbook(df, output_path, add_summary=True):
+    """
+    Save a processed DataFrame as a results workbook.
+
+    The frame goes through StreamingResultWriter, so in-memory and streamed
+    runs produce identically formatted sheets, and formatting costs one
+    value assignment per cell.
+
+    Parameters:
+    - df (DataFrame): Output of BatchProcessor.process_batch
+    - output_path (str): Workbook to create
+    - add_summary (bool): Add the summary sheet (pass rates, duplicates, usage)
+    """
+    from scoring_files.registry import metric_names
+
+    columns = [str(col) for col in df.columns]
+    writer = StreamingResultWriter(output_path, columns)
+    # Missing scores come back as pd.NA, which openpyxl cannot store
+    frame = df.astype(object).where(df.notna(), None)
+    for index, values in enumerate(frame.itertuples(index=False, name=None)):
+        writer.add(index, values)
+
+    if add_summary:
+        pass_counts = {}
+        for metric in metric_names():
+            status = df.get(f"{metric} Status")
+            if status is not None:
+                pass_counts[metric] = (int((status == "Passed").sum()), int(status.notna().sum()))
+        stats = None
+        if "evaluations_saved" in df.attrs:
+            stats = {"Duplicate Rows": df.attrs.get("duplicate_rows", 0),
+                     "Evaluations Saved": df.attrs["evaluations_saved"]}
+        writer.write_summary(pass_counts, df.attrs.get("usage"), stats=stats,
+                             budget_exhausted=df.attrs.get("budget_exhausted", False))
+    writer.close()
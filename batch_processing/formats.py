@@ -0,0 +1,423 @@
+import csv
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+
+from batch_processing.excel_io import (
+    StreamingResultWriter, count_excel_rows, iter_excel_rows, read_excel_header, supports_streaming
+)
+from batch_processing.sidecar import read_input_frame
+
+# Batch input and output formats, chosen by file extension.
+# Excel stays the format for analysts; CSV, JSONL and Parquet let large
+# production traces skip the xlsx overhead entirely. Every format provides
+# a header-only read, a full read into a DataFrame, a chunked row iterator
+# for the streaming path and an in-order result writer.
+#
+# Parquet needs pyarrow, which is optional.
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+CSV_EXTENSIONS = (".csv",)
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+INPUT_FILETYPES = [
+    ("All supported files", "*.xlsx *.xls *.csv *.jsonl *.ndjson *.parquet"),
+    ("Excel files", "*.xlsx *.xls"),
+    ("CSV files", "*.csv"),
+    ("JSON Lines files", "*.jsonl *.ndjson"),
+    ("Parquet files", "*.parquet"),
+]
+
+CHUNK_ROWS = 10000
+
+# Arrow types of the result columns, matching what the in-memory path
+# writes: uint8 scores, categorical statuses, text reasons, int64 tokens and
+# float64 cost. Built on use, as pyarrow is optional.
+RESULT_ARROW_TYPES = {
+    "score": lambda: pa.uint8(),
+    "status": lambda: pa.dictionary(pa.int8(), pa.string()),
+    "text": lambda: pa.large_string(),
+    "tokens": lambda: pa.int64(),
+    "cost": lambda: pa.float64(),
+}
+# Inputs with more rows than this are streamed instead of loaded whole
+STREAMING_ROW_THRESHOLD = 20000
+MAX_CACHED_FRAMES = 2
+
+# Parsed input frames keyed by (path, mtime, size), so a file validated or
+# preloaded at upload is not parsed again when the run starts. Entries are
+# futures so a run that starts while the preload is still parsing waits for
+# it instead of parsing the file a second time.
+_frame_cache = {}
+_frame_lock = threading.Lock()
+
+
+def file_format(file_path):
+    """
+    Return "excel", "csv", "jsonl" or "parquet" for a file name.
+
+    Raises:
+    - ValueError: for unsupported extensions
+    """
+    extension = os.path.splitext(str(file_path))[1].lower()
+    for name, extensions in (
+        ("excel", EXCEL_EXTENSIONS),
+        ("csv", CSV_EXTENSIONS),
+        ("jsonl", JSONL_EXTENSIONS),
+        ("parquet", PARQUET_EXTENSIONS),
+    ):
+        if extension in extensions:
+            if name == "parquet" and pa is None:
+                raise ValueError("Parquet files need pyarrow: pip install pyarrow")
+            return name
+    raise ValueError(f"Unsupported file type: {extension or 'no extension'}")
+
+
+def can_stream(file_path):
+    """Whether the file can be processed without loading it whole."""
+    if file_format(file_path) == "excel":
+        return supports_streaming(file_path)
+    return True
+
+
+def read_header(file_path):
+    """
+    Read only the column names of an input file.
+
+    Returns:
+    - list: Header names
+    """
+    fmt = file_format(file_path)
+    if fmt == "excel":
+        return read_excel_header(file_path)
+    if fmt == "csv":
+        return [str(col) for col in pd.read_csv(file_path, nrows=0).columns]
+    if fmt == "jsonl":
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    return [str(key) for key in json.loads(line)]
+        return []
+    return list(pq.read_schema(file_path).names)
+
+
+def read_frame(file_path):
+    """Read a whole input file into a DataFrame."""
+    fmt = file_format(file_path)
+    if fmt == "excel":
+        return read_input_frame(file_path)
+    if fmt == "csv":
+        return pd.read_csv(file_path)
+    if fmt == "jsonl":
+        return pd.read_json(file_path, lines=True, dtype=False)
+    return pd.read_parquet(file_path)
+
+
+def count_rows(file_path):
+    """
+    Number of data rows, without parsing them where the format allows.
+    CSV and JSONL count line breaks, so quoted multi-line CSV cells make the
+    count an overestimate; it is only used for progress.
+    """
+    fmt = file_format(file_path)
+    if fmt == "excel":
+        return count_excel_rows(file_path)
+    if fmt == "parquet":
+        return pq.ParquetFile(file_path).metadata.num_rows
+
+    lines = 0
+    last = b"\n"
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - 1) if fmt == "csv" else lines
+
+
+def iter_rows(file_path, chunk_rows=CHUNK_ROWS):
+    """
+    Stream the rows of an input file, chunk by chunk.
+
+    Returns:
+    - list: Header names
+    - generator: Row value tuples in header order, with blank cells as None
+    """
+    fmt = file_format(file_path)
+    if fmt == "excel":
+        return iter_excel_rows(file_path)
+
+    header = read_header(file_path)
+
+    def generate_csv():
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield from chunk.itertuples(index=False, name=None)
+
+    def generate_jsonl():
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield tuple(record.get(name) for name in header)
+
+    def generate_parquet():
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows, columns=header):
+            columns = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+            yield from zip(*columns)
+
+    generators = {"csv": generate_csv, "jsonl": generate_jsonl, "parquet": generate_parquet}
+    return header, generators[fmt]()
+
+
+def _frame_key(file_path):
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def load_frame(file_path):
+    """
+    Parse an input file into a DataFrame once per (path, mtime, size).
+    Repeated runs of an unchanged workbook load its columnar sidecar instead.
+
+    Returns:
+    - DataFrame: a shallow copy of the cached frame; callers may add columns
+      without affecting the cache
+    """
+    key = _frame_key(file_path)
+    with _frame_lock:
+        future = _frame_cache.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _frame_cache[key] = future
+            while len(_frame_cache) > MAX_CACHED_FRAMES:
+                del _frame_cache[next(iter(_frame_cache))]
+
+    if is_owner:
+        try:
+            future.set_result(read_frame(file_path))
+        except Exception as e:
+            with _frame_lock:
+                _frame_cache.pop(key, None)
+            future.set_exception(e)
+
+    return future.result().copy(deep=False)
+
+
+def preload_frame(file_path):
+    """Parse an input file into the frame cache on a background thread."""
+    def run():
+        try:
+            load_frame(file_path)
+        except Exception:
+            # The run reports the error when it parses the file itself
+            pass
+
+    thread = threading.Thread(target=run, name="genai-evaluator-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def write_frame(df, output_path):
+    """Write a results DataFrame in a non-Excel format chosen by extension."""
+    fmt = file_format(output_path)
+    if fmt == "csv":
+        df.to_csv(output_path, index=False)
+    elif fmt == "jsonl":
+        df.to_json(output_path, orient="records", lines=True, force_ascii=False)
+    elif fmt == "parquet":
+        df.to_parquet(output_path, index=False)
+    else:
+        raise ValueError("Excel output is written by BatchProcessor.save_results")
+
+
+class OrderedResultWriter:
+    """
+    Base for streaming result writers that accept rows in any order.
+
+    Rows completed out of order are buffered until every earlier row has
+    been written, so at most the rows still in flight are kept in memory.
+    """
+
+    def __init__(self, output_path, columns, first_index=0):
+        self.output_path = output_path
+        self.columns = columns
+        self.next_index = first_index
+        self.buffer = {}
+        self.rows_written = 0
+
+    def add(self, index, values):
+        """Queue a finished row and write every row that is now in order."""
+        self.buffer[index] = values
+        while self.next_index in self.buffer:
+            self._write_row(self.buffer.pop(self.next_index))
+            self.next_index += 1
+            self.rows_written += 1
+
+    def write_summary(self, pass_counts, usage=None, stats=None, budget_exhausted=False):
+        """Only Excel output has a summary sheet."""
+
+    def close(self):
+        """
+        Flush rows still buffered behind a missing earlier row (a stopped run).
+
+        Returns:
+        - int: number of result rows written
+        """
+        for index in sorted(self.buffer):
+            self._write_row(self.buffer.pop(index))
+            self.rows_written += 1
+        self._close()
+        return self.rows_written
+
+    def _write_row(self, values):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvResultWriter(OrderedResultWriter):
+
+    def __init__(self, output_path, columns, first_index=0):
+        super().__init__(output_path, columns, first_index)
+        self.file = open(output_path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def _write_row(self, values):
+        self.writer.writerow(["" if value is None else value for value in values])
+
+    def _close(self):
+        self.file.close()
+
+
+class JsonlResultWriter(OrderedResultWriter):
+
+    def __init__(self, output_path, columns, first_index=0):
+        super().__init__(output_path, columns, first_index)
+        self.file = open(output_path, "w", encoding="utf-8")
+
+    def _write_row(self, values):
+        self.file.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str) + "\n")
+
+    def _close(self):
+        self.file.close()
+
+
+class ParquetResultWriter(OrderedResultWriter):
+    """
+    Writes one row group per CHUNK_ROWS rows, with the column types
+    write_frame gives the same results in memory. Result columns have fixed
+    types (see RESULT_ARROW_TYPES); input columns take the type pandas
+    gives them, read from the source schema for Parquet inputs and inferred
+    from the first row group otherwise. The file is opened with the first
+    row group, once those types are known.
+
+    Parameters:
+    - column_kinds (list): Kind per column ("score", "status", "tokens",
+      "cost", "text"), None for an input column
+    - source_schema (pyarrow.Schema): Schema of a Parquet input file
+    """
+
+    def __init__(self, output_path, columns, first_index=0, column_kinds=None, source_schema=None):
+        super().__init__(output_path, columns, first_index)
+        self.column_kinds = column_kinds or [None] * len(columns)
+        self.source_types = {}
+        if source_schema is not None:
+            # Reading a Parquet file into pandas and writing it back changes some
+            # types (string becomes large_string); take the types after that trip
+            frame = source_schema.empty_table().to_pandas()
+            for field in pa.Schema.from_pandas(frame, preserve_index=False):
+                source_field = source_schema.field(field.name)
+                self.source_types[field.name] = field.type if "null" not in str(field.type) else source_field.type
+        self.schema = None
+        self.writer = None
+        self.pending = []
+
+    def _write_row(self, values):
+        self.pending.append(values)
+        if len(self.pending) >= CHUNK_ROWS:
+            self._flush()
+
+    def _column_type(self, name, kind, values):
+        if kind in RESULT_ARROW_TYPES:
+            return RESULT_ARROW_TYPES[kind]()
+        if name in self.source_types:
+            return self.source_types[name]
+        try:
+            inferred = pa.Array.from_pandas(pd.Series(list(values))).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed values; write_frame could not store these either
+            return pa.large_string()
+        # A column that is blank so far has no type yet; keep it as text
+        return pa.large_string() if pa.types.is_null(inferred) else inferred
+
+    def _open(self):
+        value_columns = list(zip(*self.pending)) or [()] * len(self.columns)
+        self.schema = pa.schema([
+            (name, self._column_type(name, kind, values))
+            for name, kind, values in zip(self.columns, self.column_kinds, value_columns)
+        ])
+        self.writer = pq.ParquetWriter(self.output_path, self.schema)
+
+    def _flush(self):
+        if self.writer is None:
+            self._open()
+        if not self.pending:
+            return
+        columns = []
+        for field, values in zip(self.schema, zip(*self.pending)):
+            if pa.types.is_large_string(field.type) or pa.types.is_string(field.type):
+                values = [None if value is None else str(value) for value in values]
+            try:
+                columns.append(pa.array(values, type=field.type, from_pandas=True))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise ValueError(
+                    f"Column '{field.name}' no longer fits the type {field.type} taken from the first "
+                    f"{CHUNK_ROWS} rows ({str(e)}); write the results as .csv or .jsonl instead"
+                ) from e
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        self.pending = []
+
+    def _close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_result_writer(output_path, columns, column_kinds=None, source_path=None):
+    """
+    Streaming result writer for the output file's format.
+
+    Parameters:
+    - column_kinds (list): Kind per column, for formats that store types
+      (see ParquetResultWriter); None for input columns
+    - source_path (str): Input file, whose schema types the input columns
+      of Parquet output when it is a Parquet file itself
+    """
+    writers = {
+        "excel": StreamingResultWriter,
+        "csv": CsvResultWriter,
+        "jsonl": JsonlResultWriter,
+    }
+    fmt = file_format(output_path)
+    if fmt == "excel" and not supports_streaming(output_path):
+        raise ValueError("Streaming Excel output must be .xlsx")
+    if fmt == "parquet":
+        source_schema = None
+        if source_path is not None and file_format(source_path) == "parquet":
+            source_schema = pq.read_schema(source_path)
+        return ParquetResultWriter(output_path, columns, column_kinds=column_kinds, source_schema=source_schema)
+    return writers[fmt](output_path, columns)
@@ -0,0 +1,333 @@
+import math
+import os
+
+from batch_processing.formats import can_stream, iter_rows, load_frame
+from batch_processing.journal import file_fingerprint, journal_path_for, load_journal
+from scoring_files.chunking import CHUNK_TOKENS, CONTEXT_TOKENS, SEGMENT_NOTE, segment_count
+from scoring_files.registry import get_metric
+from scoring_files.usage import estimate_tokens, usage_cost
+
+# Dry-run planner for batch runs.
+# Works out what a batch would do without calling the API. It counts rows,
+# unique inputs, units of work and judge calls per metric. Multi-run metrics
+# are counted at their num_runs default; with early stopping they need
+# between two runs and all of them, so calls are given as a range.
+# Prompt tokens are estimated from each evaluator's actual templates and the
+# length of every row's text; rows too long for one call count one call per
+# segment, as chunking.py splits them, and in combined mode leave their
+# whole-answer metrics to the per-metric evaluators. Completion tokens,
+# latency and cost use the
+# assumptions below. The local judgment cache is not consulted, so a rerun of
+# an unchanged workbook costs less than planned.
+
+COMPLETION_TOKENS_PER_ANSWER = 200  # one metric's JSON verdict with its breakdown
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators of each chat message
+FALLBACK_PROMPT_TOKENS = 600  # metrics whose module does not declare its templates
+PREFIX_CACHE_BLOCK = 64  # the provider caches prompt prefixes in 64-token blocks
+CALL_OVERHEAD_SECONDS = 1.5
+OUTPUT_TOKENS_PER_SECOND = 30
+SEGMENT_NOTE_TOKENS = estimate_tokens(SEGMENT_NOTE)
+
+
+class MetricPlan:
+    """
+    Planned work of one metric, or of the combined judge.
+
+    Parameters:
+    - name (str): Metric name, or "Combined"
+    - system_tokens (int): Tokens of the static system message
+    - static_tokens (int): Tokens of the per-row message without the row text
+    - needs_expected (bool): The prompt includes the expected response
+    - completion_tokens (int): Expected answer length per call
+    - min_runs, max_runs (int): Judge calls per unit with and without early stopping
+    - chunk_tokens (int): Row text the evaluator sends in one call
+    """
+
+    def __init__(self, name, system_tokens, static_tokens, needs_expected, completion_tokens, min_runs=1, max_runs=1,
+                 chunk_tokens=CHUNK_TOKENS):
+        self.name = name
+        self.system_tokens = system_tokens
+        self.static_tokens = static_tokens
+        self.needs_expected = needs_expected
+        self.completion_tokens = completion_tokens
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.chunk_tokens = chunk_tokens
+        self.units = 0
+        self.segments = 0
+        self.unit_prompt_tokens = 0
+
+    def add_unit(self, question_tokens, response_tokens, expected_tokens):
+        expected_tokens = expected_tokens if self.needs_expected else 0
+        segments = segment_count(response_tokens, expected_tokens, self.chunk_tokens)
+        per_call = self.system_tokens + self.static_tokens + question_tokens
+        if segments > 1:
+            per_call += SEGMENT_NOTE_TOKENS
+        self.units += 1
+        self.segments += segments
+        self.unit_prompt_tokens += per_call * segments + response_tokens + expected_tokens
+
+    def calls(self, runs):
+        return self.segments * runs
+
+    def usage(self, runs):
+        """
+        Estimated usage of the planned calls, in llm_client usage fields. Every
+        call after the first reuses the system message from the provider cache.
+        """
+        calls = self.calls(runs)
+        cached_prefix = (self.system_tokens // PREFIX_CACHE_BLOCK) * PREFIX_CACHE_BLOCK
+        prompt_tokens = self.unit_prompt_tokens * runs
+        hit_tokens = min(prompt_tokens, cached_prefix * max(0, calls - 1))
+        completion_tokens = self.completion_tokens * calls
+        return {
+            "prompt_tokens": prompt_tokens,
+            "prompt_cache_hit_tokens": hit_tokens,
+            "prompt_cache_miss_tokens": prompt_tokens - hit_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def seconds_per_call(self):
+        return CALL_OVERHEAD_SECONDS + self.completion_tokens / OUTPUT_TOKENS_PER_SECOND
+
+
+class BatchPlan:
+    """
+    Estimated calls, tokens, cost and wall time of a batch run.
+
+    Attributes:
+    - rows (int): Input rows
+    - unique_rows (int): Rows with distinct inputs
+    - restored_cells (int): Cells a resumed run takes from its journal
+    - metrics (list): MetricPlan per metric (and for the combined judge)
+    """
+
+    def __init__(self, file_path, rows, unique_rows, restored_cells, metrics, streaming, combined,
+                 max_workers, requests_per_second=None, token_budget=None, cost_budget=None):
+        self.file_path = file_path
+        self.rows = rows
+        self.unique_rows = unique_rows
+        self.restored_cells = restored_cells
+        self.metrics = metrics
+        self.streaming = streaming
+        self.combined = combined
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+
+    def _total(self, field, early_stop):
+        return sum(plan.usage(plan.min_runs if early_stop else plan.max_runs)[field] for plan in self.metrics)
+
+    @property
+    def calls(self):
+        """(fewest, most) judge calls."""
+        return (sum(plan.calls(plan.min_runs) for plan in self.metrics),
+                sum(plan.calls(plan.max_runs) for plan in self.metrics))
+
+    @property
+    def tokens(self):
+        """(fewest, most) total tokens."""
+        return self._total("total_tokens", True), self._total("total_tokens", False)
+
+    @property
+    def cost(self):
+        """(lowest, highest) cost in USD."""
+        return (sum(usage_cost(plan.usage(plan.min_runs)) for plan in self.metrics),
+                sum(usage_cost(plan.usage(plan.max_runs)) for plan in self.metrics))
+
+    @property
+    def wall_seconds(self):
+        """
+        (shortest, longest) run time. Every call holds one of max_workers
+        request slots while it runs, and requests_per_second caps how fast
+        calls can start.
+        """
+        estimates = []
+        for early_stop in (True, False):
+            calls = 0
+            busy_seconds = 0.0
+            for plan in self.metrics:
+                plan_calls = plan.calls(plan.min_runs if early_stop else plan.max_runs)
+                calls += plan_calls
+                busy_seconds += plan_calls * plan.seconds_per_call()
+            seconds = busy_seconds / max(1, self.max_workers)
+            if self.requests_per_second:
+                seconds = max(seconds, calls / self.requests_per_second)
+            estimates.append(seconds)
+        return tuple(estimates)
+
+    def format(self):
+        """Multi-line report for the batch panel and the CLI."""
+        def span(low, high, fmt="{:,}".format):
+            return fmt(low) if fmt(low) == fmt(high) else f"{fmt(low)} - {fmt(high)}"
+
+        lines = [
+            f"Dry run for {os.path.basename(self.file_path)}",
+            f"Rows: {self.rows:,} ({self.unique_rows:,} unique inputs)"
+            + (", streamed without coalescing duplicates" if self.streaming else ""),
+        ]
+        if self.restored_cells:
+            lines.append(f"Resuming: {self.restored_cells:,} cells already done")
+        lines.append("Mode: one call for all metrics of a row" if self.combined else "Mode: one call per metric")
+        for plan in self.metrics:
+            runs = span(plan.min_runs, plan.max_runs) + (" run" if plan.max_runs == 1 else " runs")
+            tokens = span(plan.usage(plan.min_runs)["total_tokens"], plan.usage(plan.max_runs)["total_tokens"])
+            units = f"{plan.units:,} units" + (f" in {plan.segments:,} segments" if plan.segments != plan.units else "")
+            lines.append(f"  {plan.name:<14} {units} x {runs} = "
+                         f"{span(plan.calls(plan.min_runs), plan.calls(plan.max_runs))} calls, ~{tokens} tokens")
+
+        low, high = self.wall_seconds
+        lines += [
+            f"API calls: {span(*self.calls)}",
+            f"Tokens: ~{span(*self.tokens)}",
+            f"Cost: ~{span(*self.cost, fmt=format_cost)}",
+            f"Time: ~{span(low, high, fmt=format_duration)} "
+            f"at {self.max_workers} workers"
+            + (f", {self.requests_per_second:g} requests/s" if self.requests_per_second else ""),
+        ]
+        if self.token_budget is not None and self.tokens[1] > self.token_budget:
+            lines.append(f"The token budget ({self.token_budget:,}) may stop the run early")
+        if self.cost_budget is not None and self.cost[1] > self.cost_budget:
+            lines.append(f"The cost budget (${self.cost_budget:g}) may stop the run early")
+        return "\n".join(lines)
+
+
+def format_cost(cost):
+    return f"${cost:,.2f}" if cost >= 1 else f"${cost:.4f}"
+
+
+def format_duration(seconds):
+    hours, remainder = divmod(int(math.ceil(seconds)), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+def metric_plan(metric, early_stop=False):
+    """
+    MetricPlan of one registry metric, from its templates and num_runs default.
+    With early_stop, metrics that support it may settle after two runs.
+    """
+    system, template = metric.prompt_templates()
+    if template is None:
+        system_tokens, static_tokens = 0, FALLBACK_PROMPT_TOKENS
+    else:
+        system_tokens = estimate_tokens(system) + MESSAGE_OVERHEAD_TOKENS if system else 0
+        static_tokens = estimate_tokens(
+            template.format(question="", actual_result="", expected_result="")
+        ) + MESSAGE_OVERHEAD_TOKENS
+
+    max_runs = metric.default_runs
+    min_runs = min(2, max_runs) if early_stop and "early_stop" in metric.signature.parameters else max_runs
+    return MetricPlan(metric.name, system_tokens, static_tokens, metric.needs_expected,
+                      COMPLETION_TOKENS_PER_ANSWER, min_runs, max_runs,
+                      CONTEXT_TOKENS if metric.whole_answer else CHUNK_TOKENS)
+
+
+def combined_plan(metrics):
+    """MetricPlan of the combined judge scoring the given metrics in one call."""
+    from scoring_files.combined import build_combined_prompt
+
+    system, prompt = build_combined_prompt("", "", "", metrics)
+    return MetricPlan(
+        "Combined",
+        estimate_tokens(system) + MESSAGE_OVERHEAD_TOKENS,
+        estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS,
+        any(get_metric(metric).needs_expected for metric in metrics),
+        COMPLETION_TOKENS_PER_ANSWER * len(metrics)
+    )
+
+
+def plan_batch(processor, file_path, streaming=False, resume=False, journal_path=None):
+    """
+    Plan a batch run of a BatchProcessor without making any API call.
+
+    Parameters:
+    - processor (BatchProcessor): Supplies the metrics, mode, concurrency and budgets
+    - file_path (str): Input file
+    - streaming (bool): Plan process_batch_streaming, which does not coalesce duplicates
+    - resume (bool): Leave out the cells the journal of an earlier run already has
+    - journal_path (str): Checkpoint journal location; defaults to one next to the file
+
+    Returns:
+    - BatchPlan
+    """
+    from scoring_files.combined import COMBINED_RUBRICS
+
+    metrics = list(processor.metrics)
+    combined_metrics = [metric for metric in metrics if metric in COMBINED_RUBRICS] if processor.combined_judge else []
+    # Metrics the combined judge does not cover are still scored one by one
+    plans = {
+        metric: metric_plan(get_metric(metric), processor.early_stop)
+        for metric in metrics if metric not in combined_metrics
+    }
+    combined = combined_plan(combined_metrics) if combined_metrics else None
+
+    journal_path = journal_path or journal_path_for(file_path)
+    streaming = streaming and can_stream(file_path)
+    token_counts = {}
+
+    def tokens_of(value):
+        key = processor.input_key(value)
+        if key not in token_counts:
+            if len(token_counts) > 100000:
+                token_counts.clear()
+            token_counts[key] = estimate_tokens(key)
+        return token_counts[key]
+
+    def add_units(question, chatbot_response, expected_response, unit_metrics):
+        tokens = (tokens_of(question), tokens_of(chatbot_response), tokens_of(expected_response))
+        per_metric = [metric for metric in unit_metrics if metric not in combined_metrics]
+        in_combined = [metric for metric in unit_metrics if metric in combined_metrics]
+        if in_combined and segment_count(tokens[1], tokens[2] if combined.needs_expected else 0) > 1:
+            # evaluate_combined_async leaves whole-answer metrics of long rows to their evaluators
+            per_metric += [metric for metric in in_combined if get_metric(metric).whole_answer]
+            in_combined = [metric for metric in in_combined if not get_metric(metric).whole_answer]
+        if in_combined:
+            combined.add_unit(*tokens)
+        for metric in per_metric:
+            if metric not in plans:
+                plans[metric] = metric_plan(get_metric(metric), processor.early_stop)
+            plans[metric].add_unit(*tokens)
+
+    if streaming:
+        # Same read path as process_batch_streaming, one pass with bounded memory
+        completed = load_journal(journal_path, file_fingerprint(file_path)) if resume else {}
+        header, rows = iter_rows(file_path)
+        positions = processor.resolve_columns(header)
+        row_count = 0
+        unique_inputs = set()
+        for idx, values in enumerate(rows):
+            row_count += 1
+            inputs = tuple(
+                "" if position is None or values[position] is None else values[position]
+                for position in positions
+            )
+            unique_inputs.add(hash(tuple(processor.input_key(value) for value in inputs)))
+            missing = [metric for metric in metrics if (idx, metric) not in completed]
+            if missing:
+                add_units(*inputs, missing)
+        unique_rows = len(unique_inputs)
+    else:
+        rows = processor.input_rows(load_frame(file_path))
+        completed = load_journal(journal_path, file_fingerprint(file_path)) if resume else {}
+        row_count = len(rows)
+        unique_rows = len({tuple(processor.input_key(value) for value in row[1:]) for row in rows})
+        for (metric, _, _, _), (_, question, chatbot_response, expected_response, indexes) in \
+                processor.plan_units(rows).items():
+            unit_metrics = metrics if metric is None else [metric]
+            missing = [m for m in unit_metrics if not all((i, m) in completed for i in indexes)]
+            if missing:
+                add_units(question, chatbot_response, expected_response, missing)
+
+    restored_cells = sum(1 for (_, metric) in completed if metric in metrics)
+    metric_plans = ([combined] if combined is not None else []) + list(plans.values())
+    return BatchPlan(
+        file_path, row_count, unique_rows, restored_cells, metric_plans, streaming, processor.combined_judge,
+        processor.max_workers, processor.requests_per_second, processor.token_budget, processor.cost_budget
+    )
@@ -0,0 +1,135 @@
+import os
+
+import pandas as pd
+
+from batch_processing.journal import file_fingerprint
+
+# Columnar sidecar of a parsed input workbook, for workbooks that are run
+# again and again. The first run writes the normalized input frame as an
+# Arrow IPC file next to the workbook; later runs memory-map it instead of
+# parsing the xlsx. The sidecar records the SHA-256 of the workbook it was
+# built from and is ignored as soon as the workbook's content changes.
+#
+# pyarrow is optional: without it every run simply parses the workbook. The
+# input columns are normalized the same way either way, so installing
+# pyarrow does not change what gets evaluated.
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+SIDECAR_SUFFIX = ".inputs.arrow"
+SIDECAR_VERSION = "1"
+# Small workbooks parse quickly; not worth leaving a file behind for them
+SIDECAR_MIN_ROWS = 1000
+INPUT_COLUMNS = ["Question to chatbot", "Chatbot Response", "Expected Response"]
+
+
+def sidecar_available():
+    return pa is not None
+
+
+def sidecar_path_for(file_path):
+    return f"{file_path}{SIDECAR_SUFFIX}"
+
+
+def normalize_inputs(df):
+    """
+    Give the input columns their canonical names and text values, so the
+    frame converts to Arrow regardless of how Excel typed the cells.
+    """
+    renames = {}
+    for col in df.columns:
+        for name in INPUT_COLUMNS:
+            if str(col).strip().lower() == name.lower():
+                renames[col] = name
+    df = df.rename(columns=renames)
+    for name in INPUT_COLUMNS:
+        if name in df.columns:
+            df[name] = df[name].map(lambda value: None if pd.isna(value) else str(value))
+    return df
+
+
+def load_sidecar(file_path, content_hash):
+    """
+    Memory-map the sidecar of a workbook.
+
+    The sidecar is uncompressed and the columns are returned as Arrow-backed
+    pandas dtypes, so the text stays in the mapped file instead of being
+    copied into Python string objects.
+
+    Returns:
+    - DataFrame, or None if there is no valid sidecar for this content
+    """
+    path = sidecar_path_for(file_path)
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            reader = pa_ipc.open_file(source)
+            metadata = reader.schema.metadata or {}
+            if (metadata.get(b"source_sha256") != content_hash.encode()
+                    or metadata.get(b"sidecar_version") != SIDECAR_VERSION.encode()):
+                return None
+            return reader.read_all().to_pandas(types_mapper=getattr(pd, "ArrowDtype", None))
+    except (pa.ArrowException, OSError) as e:
+        print(f"Ignoring unreadable input sidecar: {str(e)}")
+        return None
+
+
+def write_sidecar(file_path, df, content_hash):
+    """
+    Write the sidecar next to the workbook. Failures (read-only folder,
+    columns Arrow cannot represent) only cost the speed-up, so they are
+    reported and ignored.
+    """
+    if pa is None or len(df) < SIDECAR_MIN_ROWS:
+        return False
+    path = sidecar_path_for(file_path)
+    tmp_path = f"{path}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b"source_sha256": content_hash.encode(),
+            b"sidecar_version": SIDECAR_VERSION.encode()
+        })
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # Replace atomically so a concurrent run never maps a partial file
+        os.replace(tmp_path, path)
+        return True
+    except (pa.ArrowException, OSError, ValueError, TypeError) as e:
+        print(f"Could not write input sidecar: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def read_input_frame(file_path, reader=pd.read_excel):
+    """
+    Load a workbook's rows, from its sidecar when one matches its content.
+
+    Parameters:
+    - file_path (str): Input workbook
+    - reader (function): Parser used when there is no valid sidecar
+
+    Returns:
+    - DataFrame with normalized input columns
+    """
+    if pa is None:
+        return normalize_inputs(reader(file_path))
+
+    content_hash = file_fingerprint(file_path)
+    df = load_sidecar(file_path, content_hash)
+    if df is not None:
+        return df
+
+    df = normalize_inputs(reader(file_path))
+    write_sidecar(file_path, df, content_hash)
+    return df
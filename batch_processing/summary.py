@@ -1,29 +1,64 @@
 import pandas as pd
 from openpyxl.styles import Font, Alignment, PatternFill
 
+from scoring_files.registry import get_metric, metric_names
+
+USAGE_HEADERS = ["Metric", "Calls", "Cached Calls", "Prompt Tokens", "Cache Hit Tokens",
+                 "Completion Tokens", "Cost (USD)"]
+COST_NUMBER_FORMAT = "$0.0000"
+
+
+def usage_table(usage):
+    """
+    Rows of the token usage section: one per metric, then the batch total.
+
+    Parameters:
+    - usage (dict): {metric: usage} from BatchProcessor.usage
+
+    Returns:
+    - list: value lists in USAGE_HEADERS order; empty if nothing was called
+    """
+    if not usage:
+        return []
+    rows = []
+    totals = [0] * (len(USAGE_HEADERS) - 1)
+    # Usage is recorded under the lower-case judge tag ("combined" included);
+    # list it by display name, in metric order
+    names = {}
+    for metric in usage:
+        try:
+            names[metric] = get_metric(metric).name
+        except ValueError:
+            names[metric] = metric.title()
+    order = {name: position for position, name in enumerate(metric_names())}
+    for metric in sorted(usage, key=lambda metric: order.get(names[metric], len(order))):
+        counts, name = usage[metric], names[metric]
+        values = [counts.get("calls", 0), counts.get("cached_calls", 0), counts.get("prompt_tokens", 0),
+                  counts.get("prompt_cache_hit_tokens", 0), counts.get("completion_tokens", 0),
+                  round(counts.get("cost", 0.0), 6)]
+        totals = [total + value for total, value in zip(totals, values)]
+        rows.append([name] + values)
+    rows.append(["Total"] + totals[:-1] + [round(totals[-1], 6)])
+    return rows
+
+
 def add_summary_sheet(writer, df):
     """Create summary sheet with pass rates for each metric"""
-    metrics = [
-        "Correctness", "Relevancy", "Hallucination",
-        "Completeness", "Bias", "Toxicity", "Consistency"
-    ]
+    metrics = metric_names()
     
+    # Pass rates for all metrics in one vectorized step over the status columns
+    status_columns = [f"{metric} Status" for metric in metrics if f"{metric} Status" in df.columns]
+    statuses = df[status_columns]
+    totals = statuses.notna().sum()
+    pass_rates = (statuses == "Passed").sum().div(totals.where(totals > 0)).fillna(0)
+
     summary_data = []
     for metric in metrics:
         status_col = f"{metric} Status"
-        try:
-            total = df[status_col].count()
-            passed = (df[status_col] == "Passed").sum()
-            pass_rate = passed / total if total > 0 else 0
-            summary_data.append({
-                "Metric": metric,
-                "Pass Rate": pass_rate
-            })
-        except KeyError:
-            summary_data.append({
-                "Metric": metric,
-                "Pass Rate": "N/A"
-            })
+        summary_data.append({
+            "Metric": metric,
+            "Pass Rate": float(pass_rates[status_col]) if status_col in pass_rates else "N/A"
+        })
 
     # Create DataFrame and write to Excel
     summary_df = pd.DataFrame(summary_data)
@@ -68,6 +103,102 @@ def add_summary_sheet(writer, df):
             )
         cell.alignment = Alignment(horizontal="center")
 
+    # Report the work saved by evaluating duplicate inputs only once
+    if "evaluations_saved" in df.attrs:
+        stats_row = len(metrics) + 4
+        worksheet[f"A{stats_row}"] = "Duplicate Rows"
+        worksheet[f"B{stats_row}"] = df.attrs.get("duplicate_rows", 0)
+        worksheet[f"A{stats_row+1}"] = "Evaluations Saved"
+        worksheet[f"B{stats_row+1}"] = df.attrs["evaluations_saved"]
+        for row in (stats_row, stats_row + 1):
+            worksheet[f"A{row}"].font = Font(bold=True)
+            worksheet[f"B{row}"].alignment = Alignment(horizontal="center")
+
+    # Tokens and cost of this run, per metric and in total
+    usage_rows = usage_table(df.attrs.get("usage"))
+    if usage_rows:
+        start_row = len(metrics) + (7 if "evaluations_saved" in df.attrs else 4)
+        worksheet[f"A{start_row}"] = "Token Usage"
+        worksheet[f"A{start_row}"].font = Font(bold=True)
+        for col_idx, header in enumerate(USAGE_HEADERS, 1):
+            cell = worksheet.cell(row=start_row + 1, column=col_idx, value=header)
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal="center")
+        for row_offset, values in enumerate(usage_rows, start_row + 2):
+            for col_idx, value in enumerate(values, 1):
+                cell = worksheet.cell(row=row_offset, column=col_idx, value=value)
+                if col_idx > 1:
+                    cell.alignment = Alignment(horizontal="center")
+            worksheet.cell(row=row_offset, column=len(USAGE_HEADERS)).number_format = COST_NUMBER_FORMAT
+        worksheet.cell(row=start_row + 1 + len(usage_rows), column=1).font = Font(bold=True)
+        if df.attrs.get("budget_exhausted"):
+            worksheet.cell(row=start_row + 2 + len(usage_rows), column=1,
+                           value="Stopped early: the token or cost budget was reached")
+
     # Set column widths
     worksheet.column_dimensions["A"].width = 22
-    worksheet.column_dimensions["B"].width = 18
\ No newline at end of file
+    worksheet.column_dimensions["B"].width = 18
+    for column in "CDEFG":
+        worksheet.column_dimensions[column].width = 18
+
+def write_streaming_summary(worksheet, pass_counts, usage=None, stats=None, budget_exhausted=False):
+    """
+    Write the summary layout into a write-only worksheet.
+
+    Write-only sheets cannot be edited after a row is appended, so pass
+    rates are computed from counts collected while the results streamed.
+
+    Parameters:
+    - worksheet: openpyxl write-only worksheet
+    - pass_counts (dict): {metric: (passed, total)}
+    - usage (dict): Optional {metric: usage} for the token usage section
+    - stats (dict): Optional {label: count} rows, e.g. the duplicate rows of process_batch
+    - budget_exhausted (bool): Note that the run stopped at its token or cost budget
+    """
+    from openpyxl.cell import WriteOnlyCell
+
+    def cell(value, bold=False, number_format=None):
+        c = WriteOnlyCell(worksheet, value=value)
+        c.alignment = Alignment(horizontal="center")
+        if bold:
+            c.font = Font(bold=True)
+        if number_format:
+            c.number_format = number_format
+            c.fill = PatternFill(start_color="F0F8FF", end_color="F0F8FF", fill_type="solid")
+        return c
+
+    worksheet.column_dimensions["A"].width = 22
+    worksheet.column_dimensions["B"].width = 18
+    for column in "CDEFG":
+        worksheet.column_dimensions[column].width = 18
+
+    title = WriteOnlyCell(worksheet, value="Evaluation Metrics Summary")
+    title.font = Font(bold=True, size=14)
+    worksheet.append([title])
+    worksheet.append([cell("Metric", bold=True), cell("Pass Rate", bold=True)])
+    for metric, (passed, total) in pass_counts.items():
+        pass_rate = passed / total if total > 0 else 0
+        worksheet.append([metric, cell(pass_rate, number_format="0.00%")])
+
+    if stats:
+        worksheet.append([])
+        for label, value in stats.items():
+            heading = WriteOnlyCell(worksheet, value=label)
+            heading.font = Font(bold=True)
+            worksheet.append([heading, cell(value)])
+
+    usage_rows = usage_table(usage)
+    if usage_rows:
+        worksheet.append([])
+        heading = WriteOnlyCell(worksheet, value="Token Usage")
+        heading.font = Font(bold=True)
+        worksheet.append([heading])
+        worksheet.append([cell(header, bold=True) for header in USAGE_HEADERS])
+        for values in usage_rows:
+            cost = WriteOnlyCell(worksheet, value=values[-1])
+            cost.alignment = Alignment(horizontal="center")
+            cost.number_format = COST_NUMBER_FORMAT
+            worksheet.append([values[0]] + [cell(value) for value in values[1:-1]] + [cost])
+
+    if budget_exhausted:
+        worksheet.append(["Stopped early: the token or cost budget was reached"])
@@ -0,0 +1,112 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Cold-start budget for the GUI.
+# Imports the entry module in fresh interpreters with -X importtime and fails
+# when the import time goes over budget or when a dependency that should
+# only load on first use (pandas, openpyxl, aiohttp, ...) is imported at
+# startup. Importing main does not open the window, so this runs headless;
+# the UI toolkits still have to be installed.
+#
+#   python benchmarks/startup_budget.py
+#   python benchmarks/startup_budget.py --budget-ms 300 --runs 7
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULE = "main"
+DEFAULT_BUDGET_MS = 300
+DEFAULT_RUNS = 5
+DEFERRED_MODULES = ["pandas", "numpy", "openpyxl", "aiohttp", "matplotlib", "pyarrow"]
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output.
+
+    Returns:
+    - list: (module name, self microseconds, cumulative microseconds, depth) per import
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            name_stripped = name.lstrip()
+            depth = (len(name) - len(name_stripped) - 1) // 2
+            imports.append((name_stripped.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return imports
+
+
+def measure(module):
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+    - list: parsed imports, see parse_importtime
+
+    Raises:
+    - RuntimeError: if the import fails
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")]))},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+    return parse_importtime(result.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when the GUI's cold start goes over budget.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help=f"Entry module to import (default: {DEFAULT_MODULE})")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("GENAI_STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help=f"Median import time allowed (default: GENAI_STARTUP_BUDGET_MS or {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Fresh interpreters to time (default: {DEFAULT_RUNS})")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    # The first run also warms the OS file cache and writes bytecode; it is not timed
+    try:
+        measure(args.module)
+        runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    totals = [sum(cumulative for _, _, cumulative, depth in imports if depth == 0) / 1000 for imports in runs]
+    median_ms = statistics.median(totals)
+
+    last = runs[-1]
+    print(f"import {args.module}: median {median_ms:.0f} ms over {len(totals)} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms")
+    print("Slowest top-level imports:")
+    top_level = sorted((entry for entry in last if entry[3] == 0), key=lambda entry: entry[2], reverse=True)
+    for name, _, cumulative, _ in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    imported = {name for name, _, _, _ in last}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    if eager:
+        print(f"FAIL: imported at startup, should load on first use: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: cold start {median_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
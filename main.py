@@ -6,11 +6,20 @@ import time
 import os
 import importlib
 import sys
-from batch_processing.summary import add_summary_sheet
-import requests
 
 # Import your batch UI utility
 from batch_processing.batch_ui import BatchUI
+from scoring_files.registry import get_metric, get_metrics, metric_names
+
+# Only the UI toolkits are imported at startup. pandas, openpyxl, aiohttp and
+# the scoring modules are imported where they are first used, and preloaded on
+# a background thread once the window is on screen (see preload_modules).
+# Check the startup cost with: python benchmarks/startup_budget.py
+PRELOAD_MODULES = [
+    "scoring_files.llm_client",
+    "batch_processing.batch_processor",
+    "batch_processing.summary",
+]
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -66,24 +75,13 @@ class GenAIEvaluatorApp:
 
         self.settings_visible = False
         self.settings_frame = None
-        self.accept_criteria = {
-            "Correctness": 90, "Relevancy": 90, "Hallucination": 90,
-            "Completeness": 90, "Bias": 90, "Toxicity": 90, "Consistency": 90
-        }
-        self.selected_criteria_metric = tk.StringVar(value="Correctness")
-
-        self.metric_definitions = {
-            "Correctness": "Verifies if generated content is factually correct against trusted sources.",
-            "Relevancy": "Evaluates alignment with user intent and context.",
-            "Hallucination": "Measures fabrication of false information.",
-            "Completeness": "Assesses thoroughness of responses.",
-            "Bias": "Quantifies unfair or discriminatory outputs.",
-            "Toxicity": "Measures harmful or inappropriate content.",
-            "Consistency": "Evaluates output stability across contexts."
-        }
+        self.accept_criteria = {metric: 90 for metric in metric_names()}
+        self.selected_criteria_metric = tk.StringVar(value=metric_names()[0])
+
+        self.metric_definitions = {metric.name: metric.description for metric in get_metrics()}
 
     def toggle_expected_response(self, *args):
-        if self.selected_metric.get() == "Correctness":
+        if self.selected_metric.get() and get_metric(self.selected_metric.get()).needs_expected:
             self.expected_label.grid()
             self.expected_textbox.grid()
         else:
@@ -148,8 +146,7 @@ class GenAIEvaluatorApp:
         metrics_grid_frame = ctk.CTkFrame(metrics_frame, fg_color="transparent")
         metrics_grid_frame.pack(fill="both", expand=True, padx=20, pady=10)
 
-        metrics = ["Correctness", "Relevancy", "Hallucination", "Completeness",
-                   "Bias", "Toxicity", "Consistency"]
+        metrics = metric_names()
         
         for i, metric in enumerate(metrics):
             row = i // 3
@@ -301,8 +298,7 @@ class GenAIEvaluatorApp:
                                    font=("Arial", 12))
         metric_label.pack(side="left")
         
-        metrics = ["Correctness", "Relevancy", "Hallucination", "Completeness", 
-                  "Bias", "Toxicity", "Consistency"]
+        metrics = metric_names()
         self.metric_dropdown = ctk.CTkOptionMenu(metric_selection_frame, 
                                                values=metrics,
                                                variable=self.selected_criteria_metric,
@@ -351,9 +347,16 @@ class GenAIEvaluatorApp:
 
     def update_api_key(self, event=None):
         new_key = self.apikey_entry.get().strip()
-        
+        changed = new_key != self.api_key
+
         self.api_key = new_key # Always update, even if blank
         print(f"API key updated to: {self.api_key}")
+
+        # Open a pooled connection now so the first evaluation skips the TLS
+        # handshake; focus changes that leave the key as it was do nothing
+        if self.api_key and changed:
+            from scoring_files.llm_client import warm_up_in_background
+            warm_up_in_background(self.api_url)
     
     def hide_settings(self):
         if self.settings_frame:
@@ -400,11 +403,11 @@ class GenAIEvaluatorApp:
             messagebox.showerror("Input Error", "Please fill the Question and Chatbot Response fields before starting evaluation.")
             return False
         
-        # For Correctness metric, expected response is required
-        if self.selected_metric.get() == "Correctness":
+        # Metrics such as Correctness compare against the expected response
+        if self.selected_metric.get() and get_metric(self.selected_metric.get()).needs_expected:
             expected = self.expected_textbox.get("1.0", "end-1c").strip()
             if not expected:
-                messagebox.showerror("Input Error", "Expected Response is required for Correctness evaluation.")
+                messagebox.showerror("Input Error", f"Expected Response is required for {self.selected_metric.get()} evaluation.")
                 return False
         
         # Check if a metric is selected
@@ -452,22 +455,21 @@ class GenAIEvaluatorApp:
     def run_evaluation_thread(self, question, response, expected, metric):
         start_time = time.time()
         status = "N/A"
+        from scoring_files.llm_client import APIRequestError, RateLimitError
         try:
-            module_name = f"scoring_files.{metric.lower()}"
-            scoring_module = importlib.import_module(module_name)
-            evaluation_function = getattr(scoring_module, f"evaluate_{metric.lower()}")
+            evaluator = get_metric(metric).load()
+            scoring_module = evaluator.module
 
             try:
-                    # Try online evaluation
-                if metric == "Correctness":
-                     result, _ = evaluation_function(
-                    question, response, expected, self.api_key, self.api_url, stop_requested=lambda: self.stop_requested
-                        )
-                else:
-                        result, _ = evaluation_function(
-                            question, response, self.api_key, self.api_url
-                        )
-            except (requests.RequestException, ConnectionError, TimeoutError, OSError) as api_exc:
+                # Try online evaluation; evaluators that can be stopped take a stop_requested callback
+                options = {}
+                if "stop_requested" in evaluator.signature.parameters:
+                    options["stop_requested"] = lambda: self.stop_requested
+                result, _ = evaluator.evaluate(question, response, expected, self.api_key, self.api_url, **options)
+            except RateLimitError:
+                # Still throttled after the client's retries: report it instead of scoring offline
+                raise
+            except (APIRequestError, ConnectionError, TimeoutError, OSError) as api_exc:
                 # API/network failure: switch to offline mode
                 self.root.after(0, lambda: self.reason_textbox.configure(state="normal"))
                 self.root.after(0, lambda: self.reason_textbox.delete("1.0", "end"))
@@ -475,7 +477,7 @@ class GenAIEvaluatorApp:
                 self.root.after(0, lambda: self.reason_textbox.configure(state="disabled"))
                 # Call a fallback scoring function (implement this in your scoring module)
                 if hasattr(scoring_module, "evaluate_offline"):
-                    if metric == "Correctness":
+                    if evaluator.needs_expected:
                         result, _ = scoring_module.evaluate_offline(
                             question, response, expected
                         )
@@ -498,10 +500,7 @@ class GenAIEvaluatorApp:
 
             score = result.get("score", 0)
             threshold = self.accept_criteria[metric]
-            if metric in ["Toxicity", "Bias", "Hallucination"]:
-                status = "Failed" if score >= threshold else "Passed"
-            else:
-                status = "Passed" if score >= threshold else "Failed"
+            status = "Passed" if evaluator.passed(score, threshold) else "Failed"
 
             self.root.after(0, lambda: self.update_results(result, time_str, status))
         except Exception as e:
@@ -583,32 +582,36 @@ class GenAIEvaluatorApp:
     def upload_excel(self):
         """Handle Excel file upload."""
         from tkinter import filedialog
-        import pandas as pd
+        from batch_processing.formats import (
+            INPUT_FILETYPES, STREAMING_ROW_THRESHOLD, can_stream, count_rows, preload_frame, read_header
+        )
 
         file_path = filedialog.askopenfilename(
-            title="Select Excel File",
-            filetypes=[("Excel files", "*.xlsx *.xls")]
+            title="Select Input File",
+            filetypes=INPUT_FILETYPES
         )
 
         if not file_path:
             return
 
         try:
-            # Read the Excel file to validate
-            df = pd.read_excel(file_path)
-            # Normalize column names for validation
-
-            df.columns = [col.strip().lower() for col in df.columns]
+            # Read only the header row to validate
+            columns = [col.strip().lower() for col in read_header(file_path)]
             required_columns = ["question to chatbot", "chatbot response", "expected response"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in columns]
             if missing_columns:
-                messagebox.showerror("Invalid Excel File",
+                messagebox.showerror("Invalid Input File",
                                  f"Missing required columns: {', '.join(missing_columns)}")
                 return
         except Exception as e:
             messagebox.showerror("Error", f"Error reading Excel file: {str(e)}")
             return
-        
+
+        # Parse the rows in the background so the run does not wait for it;
+        # large workbooks are streamed at run time instead
+        if not (can_stream(file_path) and count_rows(file_path) > STREAMING_ROW_THRESHOLD):
+            preload_frame(file_path)
+
         #Update UI with selected file
         self.uploaded_file_path = file_path
         filename = os.path.basename(file_path)
@@ -644,149 +647,62 @@ class GenAIEvaluatorApp:
         """Process the batch in a separate thread."""
     # ... method code ...
         try:
-            import pandas as pd
-            from openpyxl.styles import Font, Alignment
-            from openpyxl.utils import get_column_letter
-            
+            from batch_processing.batch_processor import BatchProcessor
+            from batch_processing.excel_io import write_results_workbook
+            from batch_processing.formats import STREAMING_ROW_THRESHOLD, can_stream, count_rows
+            from batch_processing.journal import discard_journal, journal_path_for
+
             start_time = time.time()
-            df = pd.read_excel(self.uploaded_file_path)
-            # Normalize column names
-            df.columns = [col.strip().lower() for col in df.columns]
-            required_columns = ["question to chatbot", "chatbot response", "expected response"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
-            # Initialize new columns for results
-            df["Question to chatbot"] = df["question to chatbot"]
-            df["Chatbot Response"] = df["chatbot response"]
-            df["Expected Response"] = df["expected response"]
-            df.drop(columns=required_columns, inplace=True, errors='ignore')
 
             # Initialize progress bar
             self.root.after(0, lambda: self.progress_bar.set(0))
             self.root.after(0, lambda: self.status_label.configure(text="Processing batch..."))
-            # Get total number of rows for progress tracking
-            importlib.reload(importlib.import_module("scoring_files.correctness"))
-            importlib.reload(importlib.import_module("scoring_files.relevancy"))
-            importlib.reload(importlib.import_module("scoring_files.hallucination"))
-            importlib.reload(importlib.import_module("scoring_files.completeness"))
-            importlib.reload(importlib.import_module("scoring_files.bias"))
-            importlib.reload(importlib.import_module("scoring_files.toxicity"))
-            importlib.reload(importlib.import_module("scoring_files.consistency"))
-            importlib.reload(importlib.import_module("batch_processing.summary"))   
-            total_rows = len(df)
-            
-            metrics = ["Correctness", "Relevancy", "Hallucination", "Completeness", 
-                      "Bias", "Toxicity", "Consistency"]
-            
-            for metric in metrics:
-                df[f"{metric} Score"] = None
-                df[f"{metric} Status"] = None
-                df[f"{metric} Reason"] = None
 
-            # Process each row
-            for index, row in df.iterrows():
-
-                if self.stop_requested:
-                    break  # Stop batch processing if stop requested
-
-
-                # Update progress
-                progress = (index + 1) / total_rows
+            def update_progress(current, total):
+                progress = current / total
                 self.root.after(0, lambda: self.progress_bar.set(progress))
                 self.root.after(0, lambda: self.status_label.configure(
-                    text=f"Processing row {index+1}/{total_rows} ({progress*100:.1f}%)"
+                    text=f"Processing row {current}/{total} ({progress*100:.1f}%)"
                 ))
 
-                # Process each metric
-                for metric in metrics:
-                    if self.stop_requested:
-                        break
-
-                    try:
-                        # Get evaluation results
-                        module_name = f"scoring_files.{metric.lower()}"
-                        scoring_module = importlib.import_module(module_name)
-                        evaluation_function = getattr(scoring_module, f"evaluate_{metric.lower()}")
-
-                        if metric == "Correctness":
-                            result, _ = evaluation_function(
-                                row["Question to chatbot"],
-                                row["Chatbot Response"],
-                                row["Expected Response"],
-                                self.api_key,
-                                self.api_url
-                            )
-                        else:
-                            result, _ = evaluation_function(
-                                row["Question to chatbot"],
-                                row["Chatbot Response"],
-                                self.api_key,
-                                self.api_url
-                            )
-
-                        score = result.get("score", 0)
-                        threshold = self.accept_criteria.get(metric, 90)
-                        if metric in ["Toxicity", "Bias", "Hallucination"]:
-                            status = "Failed" if score >= threshold else "Passed"
-                            print("bias status", status)
-                        else:
-                             status = "Passed" if score >= threshold else "Failed"
-
-                        # Update DataFrame
-                        df.at[index, f"{metric} Score"] = f"{score}%"
-                        df.at[index, f"{metric} Status"] = status
-                        df.at[index, f"{metric} Reason"] = result.get("reason", "")
-
-                    except Exception as e:
-                        print(f"Error processing {metric} for row {index}: {str(e)}")
-
-            if self.stop_requested:
-                self.root.after(0, lambda: self.update_batch_ui_stopped())
-                return
-
-            # Save with proper formatting
             output_dir = os.path.dirname(self.uploaded_file_path)
             base_name = os.path.splitext(os.path.basename(self.uploaded_file_path))[0]
-            self.processed_file_path = os.path.join(output_dir, f"{base_name}_results.xlsx")
-
-            # Create Excel writer object
-            with pd.ExcelWriter(self.processed_file_path, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Results')
-
-                # Add summary sheet
-                add_summary_sheet(writer, df)
-
-                # Get the workbook and worksheet objects
-                workbook = writer.book
-                worksheet = writer.sheets['Results']
-
-                # Define styles
-                header_font = Font(bold=True)
-                center_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                wrap_alignment = Alignment(wrap_text=True, vertical='top')
-
-                # Apply formatting to all columns
-                for col_idx, column in enumerate(df.columns, 1):
-                    col_letter = get_column_letter(col_idx)
-                    worksheet.column_dimensions[col_letter].width = 25
-
-                    # Apply formatting to each cell in column
-                    for row_idx, cell in enumerate(worksheet[col_letter], 1):
-                        if row_idx == 1:
-                            cell.font = header_font
-                            cell.alignment = center_alignment
-                        else:
-                            if "Score" in column or "Status" in column:
-                                cell.alignment = center_alignment
-                            else:
-                                cell.alignment = wrap_alignment
-
-                # Auto-adjust row heights
-                for row in worksheet.iter_rows():
-                    for cell in row:
-                        if "Reason" in cell.column_letter or cell.column_letter in ['A', 'B', 'C']:
-                            worksheet.row_dimensions[cell.row].height = 60
+            output_path = os.path.join(output_dir, f"{base_name}_results.xlsx")
+
+            # Finished cells are journaled as they complete, so a run that was
+            # stopped or crashed continues where it left off
+            processor = BatchProcessor(self.api_key, self.api_url, self.accept_criteria)
+            if (can_stream(self.uploaded_file_path)
+                    and count_rows(self.uploaded_file_path) > STREAMING_ROW_THRESHOLD):
+                # Large input: stream rows in and results out with bounded memory
+                processor.process_batch_streaming(
+                    self.uploaded_file_path,
+                    output_path,
+                    progress_callback=update_progress,
+                    stop_flag=lambda: self.stop_requested,
+                    resume=True
+                )
+                if self.stop_requested:
+                    self.root.after(0, lambda: self.update_batch_ui_stopped())
+                    return
+            else:
+                df, _ = processor.process_batch(
+                    self.uploaded_file_path,
+                    progress_callback=update_progress,
+                    stop_flag=lambda: self.stop_requested,
+                    resume=True
+                )
+
+                if self.stop_requested:
+                    self.root.after(0, lambda: self.update_batch_ui_stopped())
+                    return
+
+                # Results sheet and summary sheet, formatted as in streaming runs
+                write_results_workbook(df, output_path)
+
+            self.processed_file_path = output_path
+
+            discard_journal(journal_path_for(self.uploaded_file_path))
 
             elapsed_time = time.time() - start_time
             hours, remainder = divmod(elapsed_time, 3600)
@@ -861,9 +777,30 @@ class GenAIEvaluatorApp:
         except Exception as e:
             messagebox.showerror("Download Error", f"Error saving file: {str(e)}")
 
+def preload_modules():
+    """
+    Import the processing modules on a background thread, so the first
+    evaluation or batch run does not wait for pandas and aiohttp to load.
+    """
+    def run():
+        for module_name in PRELOAD_MODULES:
+            try:
+                importlib.import_module(module_name)
+            except ImportError as e:
+                print(f"Could not preload {module_name}: {str(e)}")
+        for metric in get_metrics():
+            try:
+                metric.load()
+            except (ImportError, ValueError) as e:
+                print(f"Could not load {metric.name} evaluator: {str(e)}")
+
+    threading.Thread(target=run, name="genai-evaluator-preload-modules", daemon=True).start()
+
 def main():
     root = ctk.CTk()
     app = GenAIEvaluatorApp(root)
+    # Start preloading once the window has been drawn
+    root.after_idle(preload_modules)
     root.mainloop()
 
 if __name__ == "__main__":
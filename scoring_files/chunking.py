@@ -0,0 +1,368 @@
+import re
+
+from scoring_files.llm_client import Judgment, judge_async, sum_deductions
+from scoring_files.sampling import run_samples
+from scoring_files.usage import USAGE_FIELDS, estimate_tokens
+
+# Map-reduce evaluation of long inputs.
+# When the row text of a judge call (response, plus expected response for
+# metrics that compare against it) is over CHUNK_TOKENS, the text is split
+# into segments at paragraph, sentence or word boundaries. Expected segments
+# are paired with the stretch of the response that covers them (see
+# align_segments), so both sides of a comparison cover the same part of the
+# document. The segments are judged concurrently, and their JSON answers are
+# merged: breakdown lists are concatenated, without repeating identical
+# issues, so each evaluator's usual "sum the deductions" scoring covers the
+# whole document. Latency is that of the slowest segment, and no single
+# request outgrows the model's context.
+#
+# Metrics that judge the answer as a whole (does it cover the question, is it
+# consistent) cannot add up segment verdicts: every segment would miss what
+# the others cover. They are judged in one call up to CONTEXT_TOKENS, and
+# only the worst segment counts beyond that.
+#
+# Inputs within the limit are sent in one call, exactly as before.
+
+# Row text allowed in one judge call, in estimated tokens (about 8,000
+# characters of English text), on top of the prompt itself
+CHUNK_TOKENS = 2400
+# Row text one call can hold whole: deepseek-chat has a 64K-token context,
+# less room for the prompt and the answer
+CONTEXT_TOKENS = 48000
+# Expected segments are not cut smaller than this (a few sentences)
+MIN_EXPECTED_SEGMENT_TOKENS = 150
+SEGMENT_NOTE = (
+    "[SEGMENT {index} of {count}] The texts below are one part of longer documents; "
+    "the other parts are evaluated separately. Judge only the content of this segment.\n"
+)
+
+_PARAGRAPHS = re.compile(r".+?(?:\n\s*\n|$)", re.S)
+_SENTENCES = re.compile(r".+?(?:[.!?。！？](?:\s+|$)|$)", re.S)
+_WORDS = re.compile(r"\S+\s*")
+_OVERLAP_WORDS = re.compile(r"\w{3,}")
+
+
+def split_pieces(text, max_tokens):
+    """
+    Split a text into its smallest natural pieces that fit max_tokens:
+    paragraphs, or sentences of long paragraphs, or words of long sentences.
+    Joining the pieces gives back the text.
+    """
+    pieces = []
+    for paragraph in _PARAGRAPHS.findall(text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCES.findall(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+            else:
+                pieces.extend(_WORDS.findall(sentence))
+    return [piece for piece in pieces if piece]
+
+
+def pack(pieces, max_tokens):
+    """Join consecutive pieces into segments of at most max_tokens."""
+    segments = []
+    current, current_tokens = "", 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            segments.append(current)
+            current, current_tokens = "", 0
+        current += piece
+        current_tokens += tokens
+    if current:
+        segments.append(current)
+    return segments
+
+
+def split_text(text, max_tokens=CHUNK_TOKENS):
+    """
+    Split a text into segments of at most max_tokens, at natural boundaries.
+
+    Returns:
+    - list: Segments in order; a single segment if the text fits
+    """
+    text = "" if text is None else str(text)
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    return pack(split_pieces(text, max_tokens), max_tokens)
+
+
+def _overlap(piece_words, segment_words):
+    if not piece_words:
+        return 0.0
+    return len(piece_words & segment_words) / len(piece_words)
+
+
+def align_segments(actual_result, expected_result, max_tokens=CHUNK_TOKENS):
+    """
+    Split a response and its expected response into aligned segment pairs.
+
+    Both texts are cut into as many segments as the allowance needs, keeping
+    a quarter of it as slack. The response is walked in order and its pieces
+    go to the current expected segment or the next one, never back: to the
+    next one when it shares more words with the piece, when the response has
+    moved on proportionally, or when the current pair is full. Every pair
+    stays within max_tokens; response text that does not fit beside the last
+    expected segment is packed into extra pairs with it. Expected segments
+    that receive no response text are merged into a neighbouring pair when
+    it has room, and left out otherwise.
+
+    Returns:
+    - list: (actual segment, expected segment) pairs; one pair if both fit together
+    """
+    actual_result = "" if actual_result is None else str(actual_result)
+    expected_result = "" if expected_result is None else str(expected_result)
+    actual_tokens = estimate_tokens(actual_result)
+    expected_tokens = estimate_tokens(expected_result)
+    if actual_tokens + expected_tokens <= max_tokens:
+        return [(actual_result, expected_result)]
+
+    count = -(-(actual_tokens + expected_tokens) // max(1, max_tokens * 3 // 4))
+    expected_size = max(-(-expected_tokens // count), min(MIN_EXPECTED_SEGMENT_TOKENS, max_tokens // 2))
+    expected_segments = pack(split_pieces(expected_result, expected_size), expected_size)
+    if len(expected_segments) <= 1:
+        # Nothing to align against: cut the response to fit beside the expected text
+        room = max(1, max_tokens - expected_tokens)
+        return [(segment, expected_result) for segment in pack(split_pieces(actual_result, room), room)]
+
+    slots = len(expected_segments)
+    rooms = [max(1, max_tokens - estimate_tokens(segment)) for segment in expected_segments]
+    # Pieces small enough that every expected segment can get some
+    pieces = split_pieces(actual_result, max(1, min(min(rooms) // 4, -(-actual_tokens // slots))))
+    segment_words = [set(_OVERLAP_WORDS.findall(segment.lower())) for segment in expected_segments]
+    assigned = [[] for _ in expected_segments]
+    used = [0] * slots
+    overflow = []
+    slot = 0
+    position = 0
+    for index, piece in enumerate(pieces):
+        tokens = estimate_tokens(piece)
+        # The expected segment at the same relative position as the piece
+        target = min(slots - 1, int((position + tokens / 2) * slots // max(1, actual_tokens)))
+        position += tokens
+        if assigned[slot] and slot < slots - 1:
+            words = set(_OVERLAP_WORDS.findall(piece.lower()))
+            here, ahead = _overlap(words, segment_words[slot]), _overlap(words, segment_words[slot + 1])
+            if (used[slot] + tokens > rooms[slot]
+                    or target > slot + 1
+                    or len(pieces) - index <= slots - 1 - slot
+                    or (target >= slot and (ahead > here or (ahead == here and target > slot)))):
+                slot += 1
+        if used[slot] + tokens > rooms[slot]:
+            overflow.append(piece)
+            continue
+        assigned[slot].append(piece)
+        used[slot] += tokens
+
+    pairs = [["".join(pieces), segment] for pieces, segment in zip(assigned, expected_segments)]
+    for index in range(len(pairs)):
+        actual_segment, expected_segment = pairs[index]
+        if actual_segment:
+            continue
+        for neighbour in (index - 1, index + 1):
+            if 0 <= neighbour < len(pairs) and pairs[neighbour][0] and (
+                    estimate_tokens(pairs[neighbour][0]) + estimate_tokens(pairs[neighbour][1])
+                    + estimate_tokens(expected_segment) <= max_tokens):
+                if neighbour < index:
+                    pairs[neighbour][1] += expected_segment
+                else:
+                    pairs[neighbour][1] = expected_segment + pairs[neighbour][1]
+                break
+    pairs = [(actual_segment, expected_segment) for actual_segment, expected_segment in pairs if actual_segment]
+    pairs += [(segment, expected_segments[-1]) for segment in pack(overflow, rooms[-1])]
+    return pairs
+
+
+def segment_count(actual_tokens, expected_tokens=0, max_tokens=CHUNK_TOKENS):
+    """Approximate number of segments for texts of the given token counts, for planning."""
+    if actual_tokens + expected_tokens <= max_tokens:
+        return 1
+    if expected_tokens:
+        return -(-(actual_tokens + expected_tokens) // max(1, max_tokens * 3 // 4))
+    return -(-actual_tokens // max_tokens)
+
+
+def _is_score_key(key):
+    return "score" in str(key).lower()
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(str(value).replace("%", "").strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def merge_answers(answers, lower_is_better=False):
+    """
+    Merge the parsed JSON answers of the segments of one evaluation.
+
+    Lists (breakdowns) are concatenated, leaving out items an earlier segment
+    already reported, nested objects (combined-judge sections) are merged key
+    by key, scores keep the worst segment's value and distinct texts are joined.
+
+    Parameters:
+    - answers (list): Parsed answers, in segment order
+    - lower_is_better (bool or set): The score measures a problem, so the
+      worst is the highest; a set names the nested sections for which this holds
+
+    Returns:
+    - dict: the merged answer
+    """
+    merged = {}
+    texts = {}
+    for answer in answers:
+        for key, value in answer.items():
+            if isinstance(value, list):
+                merged.setdefault(key, [])
+                if isinstance(merged[key], list):
+                    merged[key].extend(item for item in value if item not in merged[key])
+            elif isinstance(value, dict):
+                previous = merged.get(key)
+                section_lower = lower_is_better if isinstance(lower_is_better, bool) else key in lower_is_better
+                merged[key] = merge_answers([previous, value] if isinstance(previous, dict) else [value],
+                                            section_lower)
+            elif _is_score_key(key) and _as_number(value) is not None:
+                previous = _as_number(merged.get(key)) if key in merged else None
+                number = _as_number(value)
+                if previous is None:
+                    merged[key] = number
+                else:
+                    merged[key] = max(previous, number) if lower_is_better is True else min(previous, number)
+            elif isinstance(value, str):
+                seen = texts.setdefault(key, [])
+                if value.strip() and value not in seen:
+                    seen.append(value)
+                merged[key] = "; ".join(seen)
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+def _severity(answer, lower_is_better):
+    breakdown = answer.get("breakdown")
+    if isinstance(breakdown, list) and breakdown:
+        return sum_deductions(breakdown)
+    for key, value in answer.items():
+        number = _as_number(value) if _is_score_key(key) else None
+        if number is not None:
+            return number if lower_is_better is True else 100 - number
+    return 0
+
+
+def worst_answer(answers, lower_is_better=False):
+    """
+    The answer of the segment with the largest deductions (or, without a
+    breakdown, the worst score). Nested objects (combined-judge sections)
+    are picked section by section.
+
+    Parameters:
+    - answers (list): Parsed answers, in segment order
+    - lower_is_better (bool or set): as for merge_answers
+
+    Returns:
+    - dict: the worst answer
+    """
+    if any("breakdown" in answer or any(_is_score_key(key) for key in answer) for answer in answers):
+        return max(answers, key=lambda answer: _severity(answer, lower_is_better))
+    worst = {}
+    for answer in answers:
+        for key, value in answer.items():
+            if key in worst:
+                continue
+            sections = [other[key] for other in answers if isinstance(other.get(key), dict)]
+            if isinstance(value, dict):
+                section_lower = lower_is_better if isinstance(lower_is_better, bool) else key in lower_is_better
+                worst[key] = worst_answer(sections, section_lower)
+            else:
+                worst[key] = value
+    return worst
+
+
+def merge_judgments(judgments, lower_is_better=False, worst=False):
+    """
+    Combine segment judgments into one Judgment for the whole input.
+
+    Parameters:
+    - worst (bool): Keep only the worst segment's answer instead of merging them
+    """
+    answers = [judgment.data for judgment in judgments if judgment.data is not None]
+    usage = {field: sum(judgment.usage.get(field) or 0 for judgment in judgments) for field in USAGE_FIELDS}
+    if not answers:
+        data = None
+    elif worst:
+        data = worst_answer(answers, lower_is_better)
+    else:
+        data = merge_answers(answers, lower_is_better)
+    return Judgment(
+        "\n".join(judgment.content for judgment in judgments),
+        data,
+        usage,
+        all(judgment.cached for judgment in judgments)
+    )
+
+
+def fits_one_call(actual_result, expected_result=None, max_tokens=CHUNK_TOKENS):
+    """Whether the row text goes to the judge in a single call."""
+    return estimate_tokens(actual_result) + estimate_tokens(expected_result) <= max_tokens
+
+
+async def judge_chunked_async(api_url, api_key, input_template, question, actual_result, expected_result=None,
+                              lower_is_better=False, whole_answer=False, max_tokens_per_chunk=None,
+                              **judge_kwargs):
+    """
+    judge_async for one row, split into concurrent segment calls when the row
+    text is too long for one call.
+
+    Parameters:
+    - input_template (str): User message with {question}, {actual_result} and
+      {expected_result} fields
+    - expected_result (str): Only for prompts that compare against it; aligned
+      with the response segment by segment
+    - lower_is_better (bool): How to merge segment scores (see merge_answers)
+    - whole_answer (bool): The verdict is about the answer as a whole; split
+      only beyond CONTEXT_TOKENS, and then keep the worst segment
+    - max_tokens_per_chunk (int): Row text allowed per call; defaults to
+      CHUNK_TOKENS, or CONTEXT_TOKENS for whole-answer verdicts
+    - judge_kwargs: cache_tag, system, temperature, ... as for judge_async
+
+    Returns:
+    - Judgment: for a split input, the merged answer of all segments
+
+    Raises:
+    - RateLimitError, APIRequestError: as judge_async; the other segments are cancelled
+    """
+    if max_tokens_per_chunk is None:
+        max_tokens_per_chunk = CONTEXT_TOKENS if whole_answer else CHUNK_TOKENS
+    if expected_result is None:
+        segments = [(segment, "") for segment in split_text(actual_result, max_tokens_per_chunk)]
+    else:
+        segments = align_segments(actual_result, expected_result, max_tokens_per_chunk)
+        # A response compared with the whole of a short expected response in
+        # every segment is a whole-answer verdict too
+        whole_answer = whole_answer or len({segment for _, segment in segments}) == 1
+
+    if len(segments) == 1:
+        actual_segment, expected_segment = segments[0]
+        prompt = input_template.format(
+            question=question, actual_result=actual_segment, expected_result=expected_segment
+        )
+        return await judge_async(api_url, api_key, prompt, **judge_kwargs)
+
+    async def judge_segment(index):
+        actual_segment, expected_segment = segments[index]
+        prompt = SEGMENT_NOTE.format(index=index + 1, count=len(segments)) + input_template.format(
+            question=question, actual_result=actual_segment, expected_result=expected_segment
+        )
+        return await judge_async(api_url, api_key, prompt, **judge_kwargs)
+
+    judgments = await run_samples(judge_segment, len(segments))
+    return merge_judgments(judgments, lower_is_better, worst=whole_answer)
@@ -1,44 +1,24 @@
-import requests
-import json
 import time
 
-def evaluate_completeness(question, actual_result, api_key, api_url):
-    """
-    Evaluates response completeness with guaranteed breakdown display
-    Returns:
-    - dict: {"score": int, "reason": str, "breakdown": str}
-    - float: elapsed_time
-    """
-    start_time = time.time()
-    result = {
-        "score": 0,
-        "reason": "Evaluation initialization",
-        "breakdown": "Breakdown: None"  # Initialize with default
-    }
+from scoring_files.chunking import judge_chunked_async
+from scoring_files.llm_client import APIRequestError, run_sync, sum_deductions
 
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": api_key
-        }
-
-        prompt = f"""
-Analyze this insurance response for completeness:
-
-Question: {question}
-Response: {actual_result}
+# Static instructions, sent first as the system message so that every row
+# after the first reuses the API's cached prefix; the row inputs come last.
+COMPLETENESS_SYSTEM_PROMPT = """
+Analyze the insurance response in the user message for completeness.
 
 Return JSON with these EXACT fields:
-{{
+{
     "score": 0-100,
     "reason": "text explanation",
     "breakdown": [
-        {{
+        {
             "missing": "specific missing element",
             "deduction": 15
-        }}
+        }
     ]
-}}
+}
 
 Scoring Rules:
 1. 100% = Perfect response
@@ -47,50 +27,58 @@ Scoring Rules:
 4. -100% if completely irrelevant
 
 Required Output Example:
-{{
+{
     "score": 70,
     "reason": "Missing deductible information",
     "breakdown": [
-        {{
+        {
             "missing": "Annual deductible amount",
             "deduction": 15
-        }},
-        {{
+        },
+        {
             "missing": "Per-claim maximum",
             "deduction": 15
-        }}
+        }
     ]
-}}
+}
 """
 
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.3,
-            "max_tokens": 1000,
-            "response_format": {"type": "json_object"}
-        }
+COMPLETENESS_INPUT_TEMPLATE = """
+Question: {question}
+Response: {actual_result}
+"""
 
-        # Make API call
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        # Parse response
-        content = response.json()['choices'][0]['message']['content']
-        evaluation = json.loads(content)
+async def evaluate_completeness_async(question, actual_result, api_key, api_url):
+    """
+    Evaluates response completeness with guaranteed breakdown display
+    Returns:
+    - dict: {"score": int, "reason": str, "breakdown": str}
+    - float: elapsed_time
+    """
+    start_time = time.time()
+    content = ""
+    result = {
+        "score": 0,
+        "reason": "Evaluation initialization",
+        "breakdown": "Breakdown: None"  # Initialize with default
+    }
+
+    try:
+        judgment = await judge_chunked_async(
+            api_url, api_key, COMPLETENESS_INPUT_TEMPLATE, question, actual_result, whole_answer=True,
+            cache_tag="completeness",
+            system=COMPLETENESS_SYSTEM_PROMPT, temperature=0.3, max_tokens=1000
+        )
+        content = judgment.content
+        evaluation = judgment.data
+        if evaluation is None:
+            raise ValueError("Could not parse API response")
 
         # Process results
         # Calculate score from breakdown if available
         breakdown_items = evaluation.get("breakdown", [])
         if breakdown_items and isinstance(breakdown_items, list):
-            total_deduction = 0
-            for item in breakdown_items:
-                deduction = item.get("deduction", 0)
-                try:
-                    total_deduction += int(str(deduction).replace("%", ""))
-                except Exception:
-                    pass
-            result["score"] = max(0, 100 - total_deduction)
+            result["score"] = max(0, 100 - sum_deductions(breakdown_items))
         else:
             result["score"] = evaluation.get("score", 0)
         result["reason"] = f"Reason: {evaluation.get('reason', 'No reason provided')}"
@@ -107,12 +95,9 @@ Required Output Example:
         else:
             result["breakdown"] = "Breakdown: None"
 
-    except requests.exceptions.RequestException as e:
-        result.update({
-            "reason": f"Reason: API Error - {str(e)}",
-            "breakdown": "Breakdown: API request failed"
-        })
-    except json.JSONDecodeError:
+    except APIRequestError:
+        raise
+    except ValueError:
         result.update({
             "reason": "Reason: Invalid API response format",
             "breakdown": "Breakdown: Could not parse response"
@@ -122,9 +107,15 @@ Required Output Example:
             "reason": f"Reason: Unexpected error - {str(e)}",
             "breakdown": "Breakdown: Evaluation failed"
         })
-    finally:
-        elapsed_time = time.time() - start_time
-        print("Raw API content:", content)
-        # Always combine reason and breakdown for display
-        result["reason"] = f"{result['reason']}\n{result['breakdown']}"
-        return result, elapsed_time
\ No newline at end of file
+
+    elapsed_time = time.time() - start_time
+    print("Raw API content:", content)
+    # Always combine reason and breakdown for display
+    result["reason"] = f"{result['reason']}\n{result['breakdown']}"
+    return result, elapsed_time
+
+def evaluate_completeness(question, actual_result, api_key, api_url):
+    """
+    Blocking wrapper around evaluate_completeness_async for the GUI and batch processor.
+    """
+    return run_sync(evaluate_completeness_async(question, actual_result, api_key, api_url))
@@ -1,31 +1,14 @@
-def evaluate_consistency(question, actual_result, api_key, api_url, num_runs=3):
-    """
-    Evaluates the consistency of a chatbot response with improved consistency.
-    Returns median score from multiple runs for more reliable results.
-    
-    Returns:
-    - dict: {"score": ..., "reason": ...}
-    - float: elapsed time in seconds
-    """
-    import requests
-    import json
-    import time
-    import re
-    from statistics import median
+import time
 
-    start_time = time.time()
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": api_key
-    }
-    
-    # More structured prompt with fixed deduction values
-    prompt_template = """
-Analyze this response for consistency issues:
+from scoring_files.chunking import judge_chunked_async
+from scoring_files.llm_client import APIRequestError, run_sync
+from scoring_files.sampling import median_score, run_samples, run_samples_sequential
 
-Question: {question}
-Response: {actual_result}
+# Structured rules with fixed deduction values. They are the system message
+# and never vary, so the API can cache them across rows and runs.
+CONSISTENCY_SYSTEM_PROMPT = """You are a consistency evaluation tool. Respond with precise, standardized JSON output.
+
+Analyze the response in the user message for consistency issues.
 
 Evaluate based on these specific criteria (apply fixed deductions when found):
 1. Contradicting facts (15%)
@@ -35,17 +18,17 @@ Evaluate based on these specific criteria (apply fixed deductions when found):
 5. Logical inconsistencies (15%)
 
 Return JSON with this exact structure:
-{{
+{
     "score": 0-100,
     "reason": "Brief summary of findings",
     "breakdown": [
-        {{
+        {
             "type": "Specific issue type from above list",
             "evidence": "Exact problematic text",
             "deduction": 15
-        }}
+        }
     ]
-}}
+}
 
 Important Rules:
 - Use only the 5 issue types listed above
@@ -54,10 +37,25 @@ Important Rules:
 - Be extremely consistent in your evaluations
 """
 
-    formatted_prompt = prompt_template.format(
-        question=question,
-        actual_result=actual_result
-    )
+CONSISTENCY_INPUT_TEMPLATE = """
+Question: {question}
+Response: {actual_result}
+"""
+
+async def evaluate_consistency_async(question, actual_result, api_key, api_url, num_runs=3,
+                                     early_stop=False, max_spread=None):
+    """
+    Evaluates the consistency of a chatbot response with improved consistency.
+    Returns median score from multiple runs for more reliable results.
+    With early_stop, runs stop as soon as further runs cannot change the
+    median (or all scores are within max_spread points).
+    
+    Returns:
+    - dict: {"score": ..., "reason": ..., "runs_used": ...}
+    - float: elapsed time in seconds
+    """
+    start_time = time.time()
+    
     
     # Define valid issue types and their fixed deductions
     valid_issues = {
@@ -68,51 +66,15 @@ Important Rules:
         "Logical inconsistencies": 15
     }
     
-    all_scores = []
-    all_reasons = []
-    all_breakdowns = []
-    
-    for _ in range(num_runs):
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {
-                    "role": "system", 
-                    "content": "You are a consistency evaluation tool. Respond with precise, standardized JSON output."
-                },
-                {
-                    "role": "user", 
-                    "content": formatted_prompt
-                }
-            ],
-            "temperature": 0.0,  # Very low temperature for maximum consistency
-            "top_p": 0.1,
-            "max_tokens": 1000,
-            "response_format": {"type": "json_object"}
-        }
-        
+    async def run_once(run_index):
         try:
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            # Debugging output
-            # print(f"Run {_+1} raw content:", content)
-            
-            try:
-                # First try direct JSON parse
-                evaluation_result = json.loads(content)
-            except json.JSONDecodeError:
-                try:
-                    # Fallback to regex extraction
-                    json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                    if json_match:
-                        evaluation_result = json.loads(json_match.group(0))
-                    else:
-                        evaluation_result = {"score": 100, "reason": "No issues found"}
-                except json.JSONDecodeError as e:
-                    evaluation_result = {"score": 100, "reason": f"JSON parse error: {str(e)}"}
+            judgment = await judge_chunked_async(
+                api_url, api_key, CONSISTENCY_INPUT_TEMPLATE, question, actual_result, whole_answer=True,
+                cache_tag=f"consistency:{run_index}",
+                system=CONSISTENCY_SYSTEM_PROMPT,
+                temperature=0.0, top_p=0.1, max_tokens=1000  # Very low temperature for maximum consistency
+            )
+            evaluation_result = judgment.data or {"score": 100, "reason": "No issues found"}
             
             # Validate and standardize the evaluation result
             score = evaluation_result.get("score", 100)
@@ -146,21 +108,26 @@ Important Rules:
             if validated_breakdown:
                 reason = f"Found {len(validated_breakdown)} consistency issues"
             
-            all_scores.append(score)
-            all_reasons.append(reason)
-            all_breakdowns.append(validated_breakdown)
+            return score, reason, validated_breakdown
             
-        except requests.exceptions.RequestException as e:
-            all_scores.append(100)  # Assume consistent if error
-            all_reasons.append(f"API request failed: {str(e)}")
-            all_breakdowns.append([])
+        except APIRequestError:
+            raise
         except Exception as e:
-            all_scores.append(100)  # Assume consistent if error
-            all_reasons.append(f"Unexpected error: {str(e)}")
-            all_breakdowns.append([])
+            # A failed run has no score; it is left out of the median
+            return None, f"Unexpected error: {str(e)}", []
     
-    # Calculate final score as median of all runs
-    final_score = median(all_scores) if all_scores else 100
+    # Fire runs concurrently; with early_stop only escalate while they disagree
+    if early_stop:
+        runs = await run_samples_sequential(run_once, num_runs, lambda r: r[0], max_spread=max_spread)
+    else:
+        runs = await run_samples(run_once, num_runs)
+    runs_used = len(runs)
+    all_scores = [score for score, _, _ in runs if score is not None]
+    all_reasons = [reason for _, reason, _ in runs]
+    all_breakdowns = [breakdown for _, _, breakdown in runs]
+    
+    # Calculate final score as median of the runs that succeeded; assume consistent if none did
+    final_score = median_score(all_scores) if all_scores else 100
     
     # Select the most common reason (or most detailed one if tie)
     def reason_quality(reason):
@@ -181,7 +148,7 @@ Important Rules:
     final_breakdown = [
         {"type": k[0], "evidence": k[1], "deduction": valid_issues[k[0]]}
         for k, count in common_issues.items()
-        if count > num_runs / 2  # Only include issues found in majority of runs
+        if count > runs_used / 2  # Only include issues found in majority of runs
     ]
     
     # Format the output
@@ -195,6 +162,18 @@ Important Rules:
         breakdown_str += "  No consistency issues found\n"
     
     summary = f"Reason: {final_reason}\n{breakdown_str}"
+    if num_runs > 1:
+        summary += f"Runs used: {runs_used} of {num_runs}\n"
     
     elapsed_time = time.time() - start_time
-    return {"score": final_score, "reason": summary}, elapsed_time
\ No newline at end of file
+    return {"score": final_score, "reason": summary, "runs_used": runs_used}, elapsed_time
+
+def evaluate_consistency(question, actual_result, api_key, api_url, num_runs=3,
+                         early_stop=False, max_spread=None):
+    """
+    Blocking wrapper around evaluate_consistency_async for the GUI and batch processor.
+    """
+    return run_sync(evaluate_consistency_async(
+        question, actual_result, api_key, api_url, num_runs=num_runs,
+        early_stop=early_stop, max_spread=max_spread
+    ))
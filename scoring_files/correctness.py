@@ -1,7 +1,8 @@
-import requests
-import json
 import time
 
+from scoring_files.chunking import judge_chunked_async
+from scoring_files.llm_client import APIRequestError, run_sync, sum_deductions
+
 # Editable prompt for Correctness evaluation
 # CORRECTNESS_PROMPT = {
 
@@ -25,162 +26,122 @@ import time
 # """
 # }
 
-def evaluate_correctness(question, actual_result, expected_result, api_key, api_url, stop_requested=None):
+# The rules are identical for every row, so they go first, as the system
+# message, and the API's prompt cache can serve them from the second row on.
+# Only CORRECTNESS_INPUT_TEMPLATE changes per row.
+CORRECTNESS_SYSTEM_PROMPT = """
+You are a strict correctness evaluator that follows exact rules. Compare the actual result with the expected result given in the [INPUT] of the user message.
+
+[EVALUATION RULES]
+1. Scoring (MUST follow exactly):
+- Base score: 100%
+- Deduct EXACTLY 15% for each mismatch found
+- 0% for completely irrelevant responses
+
+2. Mismatch Types (15% each):
+- Currency/value differences (USD→HKD, 100→150)
+- Condition changes ("up to"→"exactly")
+- Coverage changes ("covered"→"not covered")
+- Missing required conditions
+- Added unnecessary information
+- Meaning-changing phrasing differences
+
+3. Required Actions:
+- COMPARE LINE-BY-LINE
+- IGNORE grammar/style differences
+- ALWAYS deduct 15% per mismatch
+- NEVER make exceptions
+
+[OUTPUT FORMAT]
+```json
+{
+"Correctness_score": [100 - (15 * mismatch_count)],
+"reason": "Brief issue summary",
+"breakdown": [
+    {
+    "type": "[Mismatch category]",
+    "expected": "[exact expected text]",
+    "actual": "[exact actual text]",
+    "deduction": 15
+    }
+]
+}
+
+[EVALUATION STEPS]
+1. Compare each element of expected vs actual result
+2. For each difference found:
+a) Categorize the mismatch type
+b) Record expected and actual values
+c) Apply 15% deduction
+3. Calculate final score (100 - total deductions)
+4. Prepare output in EXACTLY the specified JSON format
+
+[EXAMPLE]
+{
+"Correctness_score": 70,
+"reason": "3 mismatches found in currency, coverage and conditions",
+"breakdown": [
+    {
+    "mismatch_type": "currency",
+    "expected": "USD",
+    "actual": "HKD",
+    "deduction": 15
+    },
+    {
+    "mismatch_type": "coverage",
+    "expected": "not covered",
+    "actual": "covered",
+    "deduction": 15
+    },
+    {
+    "mismatch_type": "condition",
+    "expected": "up to $1000",
+    "actual": "exactly $1000",
+    "deduction": 15
+    }
+]
+}
+"""
+
+CORRECTNESS_INPUT_TEMPLATE = """[INPUT]
+Question: {question}
+Expected: {expected_result}
+Actual: {actual_result}
+"""
+
+async def evaluate_correctness_async(question, actual_result, expected_result, api_key, api_url, stop_requested=None):
     #content = None
     if stop_requested and stop_requested():
         return {"score": 0, "reason": "Stopped by user.", "breakdown": []}, 0.0
-    # Add this input length check
-    if len(actual_result) + len(expected_result) > 8000:  # or another threshold
-        return {"score": 0, "reason": "Input too long for evaluation.", "breakdown": []}, 0.0
     """
     Evaluates the correctness of a chatbot response using a detailed insurance-specific prompt.
+    Long responses are compared segment by segment against the matching part
+    of the expected response (see chunking.py), and the mismatches of all
+    segments are deducted.
     Returns:
     - dict: {"score": ..., "reason": ...}
     - float: elapsed time in seconds
     """
     start_time = time.time()
     content = ""
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": api_key
-    }
-    
- 
-    prompt_template = """
-    You are a strict correctness evaluator that follows exact rules. Analyze this response:
-
-    [EVALUATION RULES]
-    1. Scoring (MUST follow exactly):
-    - Base score: 100%
-    - Deduct EXACTLY 15% for each mismatch found
-    - 0% for completely irrelevant responses
-
-    2. Mismatch Types (15% each):
-    - Currency/value differences (USD→HKD, 100→150)
-    - Condition changes ("up to"→"exactly")
-    - Coverage changes ("covered"→"not covered")
-    - Missing required conditions
-    - Added unnecessary information
-    - Meaning-changing phrasing differences
-
-    3. Required Actions:
-    - COMPARE LINE-BY-LINE
-    - IGNORE grammar/style differences
-    - ALWAYS deduct 15% per mismatch
-    - NEVER make exceptions
-
-    [INPUT]
-    Question: {question}
-    Expected: {expected_result}
-    Actual: {actual_result}
-
-    [OUTPUT FORMAT]
-    ```json
-    {{
-    "Correctness_score": [100 - (15 * mismatch_count)],
-    "reason": "Brief issue summary",
-    "breakdown": [
-        {{
-        "type": "[Mismatch category]",
-        "expected": "[exact expected text]",
-        "actual": "[exact actual text]",
-        "deduction": 15
-        }}
-    ]
-    }}
-
-    [EVALUATION STEPS]
-    1. Compare each element of expected vs actual result
-    2. For each difference found:
-    a) Categorize the mismatch type
-    b) Record expected and actual values
-    c) Apply 15% deduction
-    3. Calculate final score (100 - total deductions)
-    4. Prepare output in EXACTLY the specified JSON format
-
-    [EXAMPLE]
-    {{
-    "Correctness_score": 70,
-    "reason": "3 mismatches found in currency, coverage and conditions",
-    "breakdown": [
-        {{
-        "mismatch_type": "currency",
-        "expected": "USD",
-        "actual": "HKD",
-        "deduction": 15
-        }},
-        {{
-        "mismatch_type": "coverage",
-        "expected": "not covered",
-        "actual": "covered",
-        "deduction": 15
-        }},
-        {{
-        "mismatch_type": "condition",
-        "expected": "up to $1000",
-        "actual": "exactly $1000",
-        "deduction": 15
-        }}
-    ]
-    }}
-    """
 
-    formatted_prompt = prompt_template.format(
-        question=question,
-        expected_result=expected_result,
-        actual_result=actual_result
-    )
-    
-    payload = {
-        "model": "deepseek-chat",
-        "messages": [
-            {"role": "user", "content": formatted_prompt}
-        ],
-        "temperature": 0.0,
-        "top_p": 0.1,
-        "max_tokens": 8000
-    }
-    
     try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        judgment = await judge_chunked_async(
+            api_url, api_key, CORRECTNESS_INPUT_TEMPLATE, question, actual_result, expected_result,
+            cache_tag="correctness",
+            system=CORRECTNESS_SYSTEM_PROMPT, temperature=0.0, top_p=0.1, max_tokens=8000, json_mode=False
+        )
         if stop_requested and stop_requested():
             return {"score": 0, "reason": "Stopped by user.", "breakdown": []}, 0.0
-        
-        if response.status_code != 200:
-            raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
-        
-        result = response.json()
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-
-        # Print token usage if available
-        usage = result.get("usage", {})
-        prompt_tokens = usage.get("prompt_tokens", "N/A")
-        completion_tokens = usage.get("completion_tokens", "N/A")
-        total_tokens = usage.get("total_tokens", "N/A")
-        print(f"Token usage - prompt: {prompt_tokens}, completion: {completion_tokens}, total: {total_tokens}")
-        
-        # Extract JSON from content
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = content[json_start:json_end]
-                evaluation_result = json.loads(json_str)
-            else:
-                evaluation_result = {
-                    "Correctness_score": 0,
-                    "Reason": "Could not parse API response.",
-                    "breakdown": []
-                }
-        except json.JSONDecodeError:
-            evaluation_result = {
-                "Correctness_score": 0,
-                "Reason": "Could not parse API response.",
-                "breakdown": []
-            }
-    
+        content = judgment.content
+        evaluation_result = judgment.data or {
+            "Correctness_score": 0,
+            "Reason": "Could not parse API response.",
+            "breakdown": []
+        }
+
+    except APIRequestError:
+        raise
     except Exception as e:
         evaluation_result = {
             "Correctness_score": 0,
@@ -188,7 +149,7 @@ def evaluate_correctness(question, actual_result, expected_result, api_key, api_
             "breakdown": []
         }
         content = ""
-    
+
     elapsed_time = time.time() - start_time
 
     breakdown = evaluation_result.get("breakdown", [])
@@ -201,10 +162,7 @@ def evaluate_correctness(question, actual_result, expected_result, api_key, api_
 
     # Calculate score from breakdown if available
     if breakdown and isinstance(breakdown, list):
-            total_deduction = sum(
-                int(item.get("deduction", 0)) for item in breakdown if isinstance(item, dict)
-            )
-            score = max(0, 100 - total_deduction)
+        score = max(0, 100 - sum_deductions(breakdown))
     else:
         score = (
     evaluation_result.get("Correctness_score")
@@ -239,6 +197,12 @@ def evaluate_correctness(question, actual_result, expected_result, api_key, api_
     # Return a dict for compatibility with main.py
     return {"score": score, "reason": summary}, elapsed_time
 
+def evaluate_correctness(question, actual_result, expected_result, api_key, api_url, stop_requested=None):
+    """
+    Blocking wrapper around evaluate_correctness_async for the GUI and batch processor.
+    """
+    return run_sync(evaluate_correctness_async(question, actual_result, expected_result, api_key, api_url, stop_requested=stop_requested))
+
 # question = "What is the capital of France?"
 # actual_result = "The capital of France is Paris."
 # expected_result = "The capital of France is Paris." # Example usage 
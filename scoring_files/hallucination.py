@@ -1,47 +1,27 @@
-import requests
-import json
 import time
-from statistics import median
 
-def evaluate_hallucination(question, actual_result, api_key, api_url, num_runs=3):
-    """
-    Evaluates hallucination with multiple runs for consistency
-    Returns median score and most common reason/breakdown
-    
-    Args:
-        num_runs: Number of evaluations to perform (default=3)
-    
-    Returns:
-        dict: {"score": int, "reason": str, "breakdown": str}
-        float: elapsed_time
-    """
-    start_time = time.time()
-    all_results = []
-    content = ""  # Initialize for error cases
-
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": api_key
-        }
+from scoring_files.chunking import judge_chunked_async
+from scoring_files.llm_client import APIRequestError, run_sync, sum_deductions
+from scoring_files.sampling import median_score, run_samples, run_samples_sequential
 
-        prompt_template = """
+# Sent as the system message: the rules never change between rows or runs,
+# so the API's prompt cache serves them after the first request and only
+# HALLUCINATION_INPUT_TEMPLATE is new input.
+HALLUCINATION_SYSTEM_PROMPT = """
 You are an AI hallucination detection system that MUST produce identical outputs for identical inputs.
-
-Question: {question}
-Response: {actual_result}
+Evaluate the question and response given in the user message.
 
 Return JSON with:
-{{
+{
     "hallucination_score": 0-100,
     "reason": "text explanation",
     "breakdown": [
-        {{
+        {
             "issue": "specific hallucination",
             "deduction": 15
-        }}
+        }
     ]
-}}
+}
 
 Scoring Rules (0 = perfect):
 1. -15% for unverifiable facts
@@ -51,41 +31,52 @@ Scoring Rules (0 = perfect):
 5. -Sum deductions for final score
 
 Required Output Example:
-{{
+{
     "hallucination_score": 85,
     "reason": "Minor unverified claim about coverage limits",
     "breakdown": [
-        {{
+        {
             "issue": "Unverified claim about annual limits",
             "deduction": 15
-        }}
+        }
     ]
-}}
+}
 """
 
-        for _ in range(num_runs):
-            try:
-                # Format prompt for each run
-                prompt = prompt_template.format(
-                    question=question,
-                    actual_result=actual_result
-                )
+HALLUCINATION_INPUT_TEMPLATE = """
+Question: {question}
+Response: {actual_result}
+"""
 
-                payload = {
-                    "model": "deepseek-chat",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3,
-                    "max_tokens": 1000,
-                    "response_format": {"type": "json_object"}
-                }
+async def evaluate_hallucination_async(question, actual_result, api_key, api_url, num_runs=3,
+                                       early_stop=False, max_spread=None):
+    """
+    Evaluates hallucination with multiple runs for consistency
+    Returns median score and most common reason/breakdown
+    
+    Args:
+        num_runs: Maximum number of evaluations to perform (default=3)
+        early_stop: Stop sampling once further runs cannot change the median
+        max_spread: Also stop once all scores are within this many points
+    
+    Returns:
+        dict: {"score": int, "reason": str, "breakdown": str, "runs_used": int}
+        float: elapsed_time
+    """
+    start_time = time.time()
+    runs_used = 0
 
-                # Make API call
-                response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-                response.raise_for_status()
-                
-                # Parse response
-                content = response.json()['choices'][0]['message']['content']
-                evaluation = json.loads(content)
+    try:
+        async def run_once(run_index):
+            try:
+                judgment = await judge_chunked_async(
+                    api_url, api_key, HALLUCINATION_INPUT_TEMPLATE, question, actual_result,
+                    lower_is_better=True, cache_tag=f"hallucination:{run_index}",
+                    system=HALLUCINATION_SYSTEM_PROMPT, temperature=0.3, max_tokens=1000
+                )
+                evaluation = judgment.data
+                if evaluation is None:
+                    raise ValueError("Could not parse API response")
 
                 # Process results
                 score = 0
@@ -93,33 +84,40 @@ Required Output Example:
                 
                 # Calculate score from breakdown if available
                 if breakdown_items and isinstance(breakdown_items, list):
-                    total_deduction = sum(
-                        int(str(item.get("deduction", 0)).replace("%", ""))
-                        for item in breakdown_items 
-                        if isinstance(item, dict)
-                    )
-                    score = min(100, total_deduction)  # Cap at 100%
+                    score = min(100, sum_deductions(breakdown_items))  # Cap at 100%
                 else:
                     score = evaluation.get("hallucination_score", 0)
 
                 # Store results
-                all_results.append({
+                return {
                     "score": score,
                     "reason": evaluation.get("reason", "No reason provided"),
                     "breakdown": breakdown_items
-                })
+                }
 
+            except APIRequestError:
+                raise
             except Exception as e:
-                print(f"Run {_+1} failed: {str(e)}")
-                all_results.append({
-                    "score": 0,
-                    "reason": f"Run {_+1} error: {str(e)}",
+                print(f"Run {run_index+1} failed: {str(e)}")
+                # A failed run has no score; it is left out of the median
+                return {
+                    "score": None,
+                    "reason": f"Run {run_index+1} error: {str(e)}",
                     "breakdown": []
-                })
+                }
+
+        # Fire runs concurrently; with early_stop only escalate while they disagree
+        if early_stop:
+            all_results = await run_samples_sequential(
+                run_once, num_runs, lambda r: r["score"], max_spread=max_spread
+            )
+        else:
+            all_results = await run_samples(run_once, num_runs)
+        runs_used = len(all_results)
 
         # Calculate median score
-        scores = [r["score"] for r in all_results]
-        final_score = median(scores) if scores else 0
+        scores = [r["score"] for r in all_results if r["score"] is not None]
+        final_score = median_score(scores) if scores else 0
 
         # Find most common reason (prioritize those with breakdowns)
         def reason_quality(r):
@@ -141,17 +139,34 @@ Required Output Example:
             "score": final_score,
             "reason": f"Reason: {best_result['reason']}\n{breakdown_str.strip()}",
             "breakdown": breakdown_str.strip(),
+            "runs_used": runs_used,
             "all_runs": all_results  # For debugging
         }
 
+    except APIRequestError:
+        raise
     except Exception as e:
         result = {
             "score": 0,
             "reason": f"Evaluation failed: {str(e)}",
-            "breakdown": "Breakdown: Evaluation error"
+            "breakdown": "Breakdown: Evaluation error",
+            "runs_used": runs_used
         }
-    finally:
-        elapsed_time = time.time() - start_time
-        print(f"Completed {num_runs} runs in {elapsed_time:.2f}s")
-        print("Final score:", result["score"])
-        return result, elapsed_time
\ No newline at end of file
+
+    if num_runs > 1:
+        result["reason"] += f"\nRuns used: {runs_used} of {num_runs}"
+
+    elapsed_time = time.time() - start_time
+    print(f"Completed {runs_used} of {num_runs} runs in {elapsed_time:.2f}s")
+    print("Final score:", result["score"])
+    return result, elapsed_time
+
+def evaluate_hallucination(question, actual_result, api_key, api_url, num_runs=3,
+                           early_stop=False, max_spread=None):
+    """
+    Blocking wrapper around evaluate_hallucination_async for the GUI and batch processor.
+    """
+    return run_sync(evaluate_hallucination_async(
+        question, actual_result, api_key, api_url, num_runs=num_runs,
+        early_stop=early_stop, max_spread=max_spread
+    ))
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Persistent cache of judge responses, so re-running a workbook only pays
+# for the cells whose inputs changed.
+# The key is a hash of the full request payload (model, temperature, top_p and
+# the rendered prompt, which contains the template and the row's question,
+# response and expected text) plus the metric tag and run index. Editing a
+# prompt template therefore changes the key and old entries are simply never
+# hit again; they age out through TTL and LRU eviction.
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_PATH = Path.home() / ".genai_evaluator" / "judgments.sqlite"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 3600
+
+
+def fingerprint(api_url, payload, tag):
+    """
+    Hash of everything that determines a judgment.
+
+    Parameters:
+    - api_url (str): Endpoint the request goes to
+    - payload (dict): Chat completion request body
+    - tag (str): Metric name and run index, e.g. "hallucination:2"
+
+    Returns:
+    - str: hex digest
+    """
+    material = json.dumps(
+        {"v": CACHE_FORMAT_VERSION, "url": api_url, "tag": tag, "payload": payload},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class JudgmentCache:
+    """
+    SQLite-backed cache of response bodies with a size cap, TTL and LRU eviction.
+
+    Parameters:
+    - path (str): Database file; parent directories are created
+    - max_bytes (int): Upper bound on the total size of cached bodies
+    - ttl (float): Seconds an entry stays valid, or None to keep entries until evicted
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS judgments ("
+            "key TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS judgments_accessed ON judgments(accessed)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM judgments").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached body for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, size, created FROM judgments WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, size, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM judgments WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE judgments SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Store a body, evicting least recently used entries beyond max_bytes."""
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM judgments WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO judgments (key, body, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, body, size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used ones
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM judgments WHERE created < ?", (time.time() - self.ttl,))
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM judgments").fetchone()[0]
+        # Evict down to 90% of the cap so eviction does not run on every put
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM judgments ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM judgments WHERE key = ?", doomed)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM judgments")
+            self._total_bytes = 0
+
+    def stats(self):
+        """Snapshot of the cache usage, for status messages."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+            return {
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_cache():
+    """
+    Open the cache at GENAI_EVALUATOR_CACHE, or the default location.
+    Setting the variable to "off" disables caching.
+    """
+    path = os.environ.get("GENAI_EVALUATOR_CACHE", str(DEFAULT_CACHE_PATH))
+    if path.lower() in ("off", "0", "false", "none", ""):
+        return None
+    try:
+        return JudgmentCache(path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Judgment cache disabled: {str(e)}")
+        return None
@@ -0,0 +1,485 @@
+import asyncio
+import atexit
+import json
+import threading
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from scoring_files.judgment_cache import (
+    DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL, JudgmentCache, default_cache, fingerprint
+)
+from scoring_files.rate_limit import THROTTLE_STATUS_CODES, AdaptiveRateLimiter, parse_duration
+# The usage functions are re-exported so callers only need the client module
+from scoring_files.usage import (
+    USAGE_FIELDS, get_usage_totals, prompt_cache_report, record_usage, reset_usage_totals
+)
+
+# Shared HTTP client used by every scoring module.
+# All requests go through one asyncio event loop running on a background
+# thread and one aiohttp session with a keep-alive connection pool, so
+# evaluations reuse TCP/TLS connections and thousands of in-flight requests
+# cost a coroutine each instead of a thread.
+#
+# Async callers (notebooks, services) can await the *_async evaluators on
+# their own loop; a separate session is kept for each running loop and
+# should be released with close_async() before that loop shuts down.
+#
+# Every request passes through one AdaptiveRateLimiter, which sees 429/503
+# responses and their Retry-After headers and retries them here, before the
+# evaluators could turn a throttled call into a score of 0.
+#
+# Requests sent with a cache_tag are looked up in the persistent judgment
+# cache first and successful responses are stored there, so repeated batch
+# runs only call the API for inputs that changed.
+#
+# Evaluators call judge_async, which builds the request, applies the default
+# timeout, extracts the JSON answer and records token usage per metric (see
+# usage.py); they only supply the prompt and turn the parsed answer into a score.
+
+DEFAULT_POOL_SIZE = 10
+MAX_THROTTLE_RETRIES = 6
+# Dropped connections, timeouts and these statuses are retried with backoff
+TRANSIENT_STATUS_CODES = (500, 502, 504)
+MAX_TRANSIENT_RETRIES = 2
+TRANSIENT_BACKOFF = 1.0
+
+DEFAULT_MODEL = "deepseek-chat"
+DEFAULT_TIMEOUT = 30
+
+_loop = None
+_loop_thread = None
+_pool_size = DEFAULT_POOL_SIZE
+_sessions = {}
+_headers_cache = {}
+_lock = threading.Lock()
+_rate_limiter = AdaptiveRateLimiter(max_concurrency=DEFAULT_POOL_SIZE)
+_judgment_cache = None
+_cache_loaded = False
+
+
+class APIRequestError(Exception):
+    """Raised when a request fails at the network level or returns an error status."""
+
+    def __init__(self, message, status_code=None, text="", headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class RateLimitError(APIRequestError):
+    """Raised when the provider keeps throttling a request after all retries."""
+
+
+class ChatResponse:
+    """Fully read HTTP response, usable after the connection is released."""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise APIRequestError(
+                f"{self.status_code} Error: {self.text}",
+                status_code=self.status_code,
+                text=self.text,
+                headers=self.headers
+            )
+
+
+def get_loop():
+    """Return the shared event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _loop_thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="genai-evaluator-loop",
+                    daemon=True
+                )
+                _loop_thread.start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """
+    Schedule a coroutine on the shared loop from any thread.
+
+    Returns:
+    - concurrent.futures.Future
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from the shared event loop; await the coroutine instead")
+    return submit(coro).result()
+
+
+def configure_pool(pool_size):
+    """
+    Resize the shared connection pool, e.g. to match the batch concurrency.
+    A session is rebuilt the next time it is used only if its pool is too
+    small; a larger pool is kept with its warm connections, as the rate
+    limiter already bounds how many requests run at once.
+    """
+    global _pool_size
+    _pool_size = max(1, int(pool_size))
+
+
+def configure_rate_limit(max_concurrency, requests_per_second=None):
+    """Set the upper bounds the adaptive rate limiter may grow back to."""
+    _rate_limiter.configure(max_concurrency=max_concurrency, requests_per_second=requests_per_second)
+
+
+def get_rate_limiter():
+    """Return the limiter shared by all requests."""
+    return _rate_limiter
+
+
+def configure_cache(path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, enabled=True):
+    """
+    Replace the judgment cache, e.g. to move it, change its limits or turn it off.
+
+    Parameters:
+    - path (str): Database file
+    - max_bytes (int): Upper bound on the size of cached responses
+    - ttl (float): Seconds an entry stays valid, or None for no expiry
+    - enabled (bool): False disables caching
+    """
+    global _judgment_cache, _cache_loaded
+    with _lock:
+        if _judgment_cache is not None:
+            _judgment_cache.close()
+        _judgment_cache = JudgmentCache(path, max_bytes=max_bytes, ttl=ttl) if enabled else None
+        _cache_loaded = True
+
+
+def get_judgment_cache():
+    """Return the judgment cache, opening it on first use; None when disabled."""
+    global _judgment_cache, _cache_loaded
+    if not _cache_loaded:
+        with _lock:
+            if not _cache_loaded:
+                _judgment_cache = default_cache()
+                _cache_loaded = True
+    return _judgment_cache
+
+
+async def get_session():
+    """Return the aiohttp session for the running loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    old_session = _sessions.get(loop)
+    if old_session is not None and not old_session.closed and old_session.connector.limit >= _pool_size:
+        return old_session
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=_pool_size, keepalive_timeout=60)
+    )
+    _sessions[loop] = session
+    if old_session is not None and not old_session.closed:
+        # Let requests already in flight on the old pool finish before closing it
+        asyncio.ensure_future(_close_later(old_session))
+    return session
+
+
+async def _close_later(session, delay=60):
+    await asyncio.sleep(delay)
+    await session.close()
+
+
+async def close_async():
+    """Close the session of the running loop; await this before an own loop shuts down."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def close():
+    """Close the shared loop's session; registered to run at interpreter exit."""
+    if _loop is None or not _loop.is_running():
+        return
+    try:
+        submit(close_async()).result(timeout=5)
+    except Exception:
+        pass
+
+
+atexit.register(close)
+
+
+def build_headers(api_key):
+    """Return the request headers for an API key, built once per key."""
+    headers = _headers_cache.get(api_key)
+    if headers is None:
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": api_key
+        }
+        _headers_cache[api_key] = headers
+    return headers
+
+
+async def _send(api_url, api_key, payload, timeout):
+    session = await get_session()
+    try:
+        async with session.post(
+            api_url,
+            headers=build_headers(api_key),
+            data=json.dumps(payload),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            text = await response.text()
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            return ChatResponse(response.status, text, headers)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise APIRequestError(f"Request failed: {str(e) or type(e).__name__}") from e
+
+
+async def post_chat_async(api_url, api_key, payload, timeout=None, max_retries=MAX_THROTTLE_RETRIES,
+                          cache_tag=None):
+    """
+    Send a chat completion request through the shared session and rate limiter.
+    Throttled requests (429/503) are retried after the delay the provider asks for;
+    network failures and 500/502/504 responses are retried MAX_TRANSIENT_RETRIES
+    times with exponential backoff.
+
+    Parameters:
+    - cache_tag (str): Metric name and run index identifying this judgment, e.g.
+      "hallucination:2". When given, the judgment cache is consulted first and
+      a successful response is stored in it. Untagged requests are never cached.
+
+    Returns:
+    - ChatResponse
+
+    Raises:
+    - RateLimitError: if the request is still throttled after max_retries retries
+    - APIRequestError: on network failures that persist after the transient retries
+    """
+    cache = get_judgment_cache() if cache_tag else None
+    if cache is not None:
+        key = fingerprint(api_url, payload, cache_tag)
+        body = cache.get(key)
+        if body is not None:
+            return ChatResponse(200, body, {"x-judgment-cache": "hit"})
+
+    transient_failures = 0
+    throttle_attempt = 0
+    while True:
+        await _rate_limiter.acquire()
+        failure = None
+        try:
+            response = await _send(api_url, api_key, payload, timeout)
+        except APIRequestError as e:
+            failure = e
+        finally:
+            _rate_limiter.release()
+
+        if failure is not None or response.status_code in TRANSIENT_STATUS_CODES:
+            if transient_failures < MAX_TRANSIENT_RETRIES:
+                transient_failures += 1
+                delay = TRANSIENT_BACKOFF * 2 ** (transient_failures - 1)
+                problem = str(failure) if failure is not None else f"{response.status_code} from API"
+                print(f"{problem}: retrying in {delay:.1f}s (attempt {transient_failures})")
+                await asyncio.sleep(delay)
+                continue
+            if failure is not None:
+                raise failure
+
+        _rate_limiter.update_from_headers(response.headers)
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            _rate_limiter.on_success()
+            if cache is not None and _is_complete_answer(response):
+                cache.put(key, response.text)
+            return response
+
+        delay = _rate_limiter.on_throttle(
+            retry_after=parse_duration(response.headers.get("retry-after")),
+            attempt=throttle_attempt
+        )
+        if throttle_attempt >= max_retries:
+            raise RateLimitError(
+                f"Rate limited: still throttled after {max_retries} retries",
+                status_code=response.status_code,
+                text=response.text,
+                headers=response.headers
+            )
+        print(f"{response.status_code} from API: retrying in {delay:.1f}s (attempt {throttle_attempt+1})")
+        throttle_attempt += 1
+
+
+def _is_complete_answer(response):
+    """Only successful responses with message content are worth caching."""
+    if response.status_code != 200:
+        return False
+    try:
+        choices = response.json().get("choices") or [{}]
+        return bool(choices[0].get("message", {}).get("content"))
+    except (ValueError, AttributeError):
+        return False
+
+
+def post_chat(api_url, api_key, payload, timeout=None):
+    """Blocking version of post_chat_async."""
+    return run_sync(post_chat_async(api_url, api_key, payload, timeout=timeout))
+
+
+class Judgment:
+    """
+    One parsed judge answer.
+
+    Attributes:
+    - content (str): The message text
+    - data (dict): The JSON object in the message, or None if there is none
+    - usage (dict): Token counts reported by the API (USAGE_FIELDS)
+    - cached (bool): Served from the judgment cache, so no tokens were spent
+    """
+
+    def __init__(self, content, data, usage, cached):
+        self.content = content
+        self.data = data
+        self.usage = usage
+        self.cached = cached
+
+
+def build_payload(prompt, system=None, temperature=0.0, top_p=None, max_tokens=1000, json_mode=True,
+                  model=DEFAULT_MODEL):
+    """
+    Chat completion request body for one judge prompt.
+
+    Parameters:
+    - prompt (str): User message
+    - system (str): Optional system message
+    - top_p (float): Only sent when given
+    - json_mode (bool): Ask the API for a JSON object answer
+    """
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if top_p is not None:
+        payload["top_p"] = top_p
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    return payload
+
+
+def extract_json(content):
+    """
+    Parse the JSON object in a judge answer: the whole message, or else the
+    span from its first "{" to its last "}" (answers wrapped in prose or a
+    code fence).
+
+    Returns:
+    - dict, or None if the message holds no JSON object
+    """
+    if not content:
+        return None
+    try:
+        data = json.loads(content)
+    except ValueError:
+        start = content.find("{")
+        end = content.rfind("}") + 1
+        if start < 0 or end <= start:
+            return None
+        try:
+            data = json.loads(content[start:end])
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def sum_deductions(breakdown):
+    """
+    Total of the deductions in a judge breakdown. Any key containing
+    "deduction" counts, and values like "15%" are accepted.
+    """
+    if not isinstance(breakdown, list):
+        return 0
+    total = 0
+    for item in breakdown:
+        if not isinstance(item, dict):
+            continue
+        for k, v in item.items():
+            if "deduction" in str(k).lower():
+                try:
+                    total += int(float(str(v).replace("%", "").strip()))
+                except ValueError:
+                    pass
+    return total
+
+
+async def judge_async(api_url, api_key, prompt, cache_tag, system=None, temperature=0.0, top_p=None,
+                      max_tokens=1000, json_mode=True, timeout=DEFAULT_TIMEOUT):
+    """
+    Ask the judge model one question and parse its answer.
+
+    Parameters:
+    - prompt (str): User message
+    - cache_tag (str): Metric name, plus ":<run index>" for multi-run metrics;
+      keys the judgment cache and the usage totals
+    - system, temperature, top_p, max_tokens, json_mode: see build_payload
+    - timeout (float): Seconds for the whole request
+
+    Returns:
+    - Judgment
+
+    Raises:
+    - RateLimitError: if the API keeps throttling the request
+    - APIRequestError: on network failures and error statuses
+    """
+    payload = build_payload(prompt, system=system, temperature=temperature, top_p=top_p,
+                            max_tokens=max_tokens, json_mode=json_mode)
+    response = await post_chat_async(api_url, api_key, payload, timeout=timeout, cache_tag=cache_tag)
+    response.raise_for_status()
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    choices = body.get("choices") or [{}]
+    content = (choices[0].get("message") or {}).get("content") or ""
+    usage = body.get("usage") or {}
+    cached = response.headers.get("x-judgment-cache") == "hit"
+    record_usage(cache_tag.split(":")[0], usage, cached)
+    return Judgment(content, extract_json(content), usage, cached)
+
+
+async def warm_up_async(api_url, timeout=10):
+    """
+    Open a pooled connection to the API host so the first evaluation does not
+    pay for the TCP and TLS handshake. Failures are ignored.
+    """
+    parts = urlsplit(api_url)
+    if not parts.scheme or not parts.netloc:
+        return
+    session = await get_session()
+    try:
+        async with session.head(
+            f"{parts.scheme}://{parts.netloc}/",
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ):
+            pass
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+
+
+def warm_up_in_background(api_url):
+    """Schedule warm_up_async on the shared loop without blocking the caller."""
+    return submit(warm_up_async(api_url))
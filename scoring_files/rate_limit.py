@@ -0,0 +1,235 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Adaptive rate limiting for the shared HTTP client.
+# Combines a token bucket (requests per second) with an additive-increase /
+# multiplicative-decrease (AIMD) concurrency window. Throttling responses
+# shrink both, successful responses slowly grow them back, and Retry-After or
+# rate-limit headers pause all requests until the provider says to resume.
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_duration(value):
+    """
+    Parse a header duration such as "2", "1.5", "250ms", "1m30s" or an
+    HTTP date into seconds from now. Returns None if it cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+        # Some providers send an absolute epoch timestamp instead of a delay
+        if seconds > 1e9:
+            seconds -= time.time()
+        return max(0.0, seconds)
+    except ValueError:
+        pass
+
+    total = 0.0
+    number = ""
+    i = 0
+    matched = False
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else ch
+        if not number or unit not in ("ms", "h", "m", "s"):
+            break
+        total += float(number) * {"ms": 0.001, "h": 3600, "m": 60, "s": 1}[unit]
+        number = ""
+        matched = True
+        i += len(unit)
+    else:
+        if matched and not number:
+            return total
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket plus AIMD concurrency limiter shared by all evaluations.
+
+    Parameters:
+    - max_concurrency (int): Upper bound for requests in flight at once
+    - requests_per_second (float): Upper bound for the request rate, or None for no rate cap
+    - min_concurrency (int): Lower bound the window never shrinks below
+    - decrease_factor (float): Multiplier applied to the window and rate when throttled
+    - cooldown (float): Minimum seconds between two decreases, so one burst of 429s counts once
+    """
+
+    def __init__(self, max_concurrency=10, requests_per_second=None, min_concurrency=1,
+                 decrease_factor=0.5, cooldown=1.0):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.max_rate = requests_per_second
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.concurrency = float(self.max_concurrency)
+        self.rate = requests_per_second
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.throttled_count = 0
+
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    def configure(self, max_concurrency=None, requests_per_second=None):
+        """Change the upper bounds, e.g. when a new batch starts."""
+        with self._lock:
+            if max_concurrency is not None:
+                self.max_concurrency = max(1, int(max_concurrency))
+                self.min_concurrency = min(self.min_concurrency, self.max_concurrency)
+                self.concurrency = min(self.concurrency, self.max_concurrency)
+            self.max_rate = requests_per_second
+            self.rate = requests_per_second
+        self._wake_waiters()
+
+    def _refill(self, now):
+        if self.rate is None:
+            self.tokens = 1.0
+            return
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _try_acquire(self):
+        """Take a slot and a token if possible; otherwise return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.concurrency):
+                return None
+            self._refill(now)
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / self.rate
+            self.tokens -= 1.0
+            self.in_flight += 1
+            return 0.0
+
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                return
+            if wait is None:
+                # No free slot: sleep until a request finishes
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                with self._lock:
+                    self._waiters.append((loop, waiter))
+                    has_room = self.in_flight < int(self.concurrency)
+                if has_room:
+                    self._wake_waiters()
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    with self._lock:
+                        if (loop, waiter) in self._waiters:
+                            self._waiters.remove((loop, waiter))
+                    raise
+            else:
+                await asyncio.sleep(wait)
+
+    def _wake_waiters(self):
+        with self._lock:
+            free = max(0, int(self.concurrency) - self.in_flight)
+            to_wake = []
+            while self._waiters and len(to_wake) < free:
+                to_wake.append(self._waiters.popleft())
+        for loop, waiter in to_wake:
+            loop.call_soon_threadsafe(_resolve, waiter)
+
+    def release(self):
+        """Give back the slot taken by acquire."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+        self._wake_waiters()
+
+    def on_success(self):
+        """Additive increase after a request that was not throttled."""
+        with self._lock:
+            if self.concurrency < self.max_concurrency:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            if self.rate is not None and self.max_rate is not None and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + 1.0 / max(self.rate, 1.0))
+        self._wake_waiters()
+
+    def on_throttle(self, retry_after=None, attempt=0):
+        """
+        Multiplicative decrease after a throttling response and pause all
+        requests for Retry-After seconds, or a jittered backoff if absent.
+
+        Returns:
+        - float: seconds until requests resume
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.throttled_count += 1
+            if now - self.last_decrease >= self.cooldown:
+                self.last_decrease = now
+                self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+                if self.rate is not None:
+                    self.rate = max(0.1, self.rate * self.decrease_factor)
+            if retry_after is None:
+                retry_after = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            self.paused_until = max(self.paused_until, now + retry_after)
+            return self.paused_until - now
+
+    def update_from_headers(self, headers):
+        """
+        Honor provider rate-limit headers: when no requests remain in the
+        current window, pause until the window resets.
+        """
+        remaining = None
+        reset = None
+        for remaining_key, reset_key in (
+            ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+            ("x-ratelimit-remaining", "x-ratelimit-reset"),
+            ("ratelimit-remaining", "ratelimit-reset"),
+        ):
+            if remaining_key in headers:
+                try:
+                    remaining = int(float(headers[remaining_key]))
+                except ValueError:
+                    remaining = None
+                reset = parse_duration(headers.get(reset_key))
+                break
+
+        if remaining is not None and remaining <= 0 and reset:
+            with self._lock:
+                self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+    def stats(self):
+        """Snapshot of the current limits, for status messages."""
+        with self._lock:
+            return {
+                "concurrency": int(self.concurrency),
+                "requests_per_second": self.rate,
+                "in_flight": self.in_flight,
+                "throttled": self.throttled_count
+            }
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
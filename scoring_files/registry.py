@@ -0,0 +1,198 @@
+import importlib
+import inspect
+import threading
+
+# Registry of the evaluation metrics.
+# Each metric is declared once here with the metadata the UI, the batch
+# processor, the summary sheet and the combined judge need. Its evaluator
+# module is imported on first use, once per process, and its
+# evaluate_<metric>_async / evaluate_<metric> functions are handed out as
+# ready-to-call Metric objects, so starting a batch does not import or
+# reload any module code.
+#
+# Declaring metrics does not import the evaluators (or aiohttp), so the GUI
+# can list them at startup.
+#
+# To add a metric, write scoring_files/<name>.py with
+#   async def evaluate_<name>_async(question, actual_result, [expected_result,] api_key, api_url, ...)
+#   def evaluate_<name>(...)  (the blocking wrapper)
+# and declare it at the bottom of this file, or call register_metric from a plugin.
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+class Metric:
+    """
+    One evaluation metric and its evaluator functions.
+
+    Parameters:
+    - name (str): Display name, also used for result column names
+    - description (str): One-line explanation shown in the UI
+    - lower_is_better (bool): The score measures a problem (e.g. toxicity), so
+      a row passes when the score is below the threshold
+    - needs_expected (bool): The evaluator compares against the expected response
+    - whole_answer (bool): The verdict is about the answer as a whole (coverage,
+      consistency), so long answers are not scored segment by segment (see chunking.py)
+    - module (str): Module holding the evaluator; defaults to scoring_files.<name>
+    """
+
+    def __init__(self, name, description, lower_is_better=False, needs_expected=False, whole_answer=False,
+                 module=None):
+        self.name = name
+        self.description = description
+        self.lower_is_better = lower_is_better
+        self.needs_expected = needs_expected
+        self.whole_answer = whole_answer
+        self.module_name = module or f"scoring_files.{name.lower()}"
+        self.module = None
+        self._evaluate_async = None
+        self._evaluate = None
+        self._signature = None
+
+    def __repr__(self):
+        return f"Metric({self.name!r})"
+
+    def load(self):
+        """
+        Import the evaluator module and look up its functions, once.
+
+        Raises:
+        - ImportError: if the module or its evaluate functions are missing
+        - ValueError: if the evaluator's parameters contradict needs_expected
+        """
+        if self._evaluate_async is not None:
+            return self
+        with _lock:
+            if self._evaluate_async is not None:
+                return self
+            module = importlib.import_module(self.module_name)
+            function_name = f"evaluate_{self.name.lower()}"
+            evaluate_async = getattr(module, f"{function_name}_async", None)
+            evaluate = getattr(module, function_name, None)
+            if evaluate_async is None or evaluate is None:
+                raise ImportError(f"{self.module_name} does not define {function_name}_async and {function_name}")
+
+            signature = inspect.signature(evaluate_async)
+            if ("expected_result" in signature.parameters) != self.needs_expected:
+                raise ValueError(
+                    f"{self.module_name}.{function_name}_async "
+                    f"{'lacks' if self.needs_expected else 'takes'} an expected_result parameter"
+                )
+            self.module = module
+            self._signature = signature
+            self._evaluate = evaluate
+            self._evaluate_async = evaluate_async
+        return self
+
+    @property
+    def signature(self):
+        """inspect.Signature of the async evaluator."""
+        return self.load()._signature
+
+    @property
+    def default_runs(self):
+        """Number of judge calls the evaluator makes by default (its num_runs)."""
+        parameter = self.signature.parameters.get("num_runs")
+        if parameter is None or parameter.default is inspect.Parameter.empty:
+            return 1
+        return parameter.default
+
+    def prompt_templates(self):
+        """
+        The evaluator's prompt, as declared by its module.
+
+        Returns:
+        - str: <NAME>_SYSTEM_PROMPT, the static system message, or None
+        - str: <NAME>_INPUT_TEMPLATE, the per-row user message with {question},
+          {actual_result} and {expected_result} fields, or None
+        """
+        module = self.load().module
+        prefix = self.name.upper()
+        return getattr(module, f"{prefix}_SYSTEM_PROMPT", None), getattr(module, f"{prefix}_INPUT_TEMPLATE", None)
+
+    def _arguments(self, question, actual_result, expected_result, api_key, api_url):
+        if self.needs_expected:
+            return (question, actual_result, expected_result, api_key, api_url)
+        return (question, actual_result, api_key, api_url)
+
+    async def evaluate_async(self, question, actual_result, expected_result, api_key, api_url, **kwargs):
+        """
+        Run the evaluator; expected_result is only passed on if the metric uses it.
+
+        Returns:
+        - dict: {"score": ..., "reason": ...}
+        - float: elapsed time in seconds
+        """
+        self.load()
+        return await self._evaluate_async(
+            *self._arguments(question, actual_result, expected_result, api_key, api_url), **kwargs
+        )
+
+    def evaluate(self, question, actual_result, expected_result, api_key, api_url, **kwargs):
+        """Blocking counterpart of evaluate_async."""
+        self.load()
+        return self._evaluate(*self._arguments(question, actual_result, expected_result, api_key, api_url), **kwargs)
+
+    def passed(self, score, threshold):
+        """Whether a score meets the acceptance threshold."""
+        if self.lower_is_better:
+            return score < threshold
+        return score >= threshold
+
+
+def register_metric(metric):
+    """Add a metric, or replace the one with the same name."""
+    _metrics[metric.name] = metric
+    return metric
+
+
+def get_metric(name):
+    """
+    Look up a metric by name, case-insensitively.
+
+    Raises:
+    - ValueError: for unknown metrics
+    """
+    metric = _metrics.get(name)
+    if metric is None:
+        for candidate in _metrics.values():
+            if candidate.name.lower() == str(name).strip().lower():
+                return candidate
+        raise ValueError(f"Unknown metric '{name}'; choose from {', '.join(_metrics)}")
+    return metric
+
+
+def get_metrics():
+    """All metrics, in display order."""
+    return list(_metrics.values())
+
+
+def metric_names():
+    """Names of all metrics, in display order."""
+    return list(_metrics)
+
+
+def reload_metrics():
+    """
+    Re-import every loaded evaluator module, e.g. after editing a prompt
+    while the app is running. Batch runs never do this.
+    """
+    for metric in _metrics.values():
+        if metric._evaluate_async is not None:
+            importlib.reload(importlib.import_module(metric.module_name))
+            metric._evaluate_async = None
+            metric.load()
+
+
+for _metric in [
+    Metric("Correctness", "Verifies if generated content is factually correct against trusted sources.",
+           needs_expected=True),
+    Metric("Relevancy", "Evaluates alignment with user intent and context.", whole_answer=True),
+    Metric("Hallucination", "Measures fabrication of false information.", lower_is_better=True),
+    Metric("Completeness", "Assesses thoroughness of responses.", whole_answer=True),
+    Metric("Bias", "Quantifies unfair or discriminatory outputs.", lower_is_better=True),
+    Metric("Toxicity", "Measures harmful or inappropriate content.", lower_is_better=True),
+    Metric("Consistency", "Evaluates output stability across contexts.", whole_answer=True),
+]:
+    register_metric(_metric)
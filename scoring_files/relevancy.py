@@ -1,7 +1,8 @@
-import requests
-import json
 import time
 
+from scoring_files.chunking import judge_chunked_async
+from scoring_files.llm_client import APIRequestError, run_sync, sum_deductions
+
 # Editable prompt for Relevancy evaluation
 RELEVANCY_PROMPT = {
     "description": "Evaluates how closely an AI-generated output aligns with the intent, context, and user needs of a given input",
@@ -26,26 +27,11 @@ JSON response only:
 """
 }
 
-def evaluate_relevancy(question, actual_result, api_key, api_url):
-    """
-    Evaluates the relevancy of a chatbot response using a detailed insurance-specific prompt.
-    Returns:
-    - dict: {"score": ..., "reason": ...}
-    - float: elapsed time in seconds
-    """
-    start_time = time.time()
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": api_key
-    }
-    
-    # Updated prompt as requested
-    prompt_template = """
-Analyze this insurance response test case:
-
-    Question: {question}
-    Actual Result: {actual_result}
+# Scoring rules sent as the system message. The text is the same for every
+# row, which lets the API serve it from its prompt cache; the row's question
+# and answer follow in the user message.
+RELEVANCY_SYSTEM_PROMPT = """
+Analyze the insurance response test case given in the user message.
 
     Return JSON with:
     1. relavancy_score (0-100%) using these rules:
@@ -61,57 +47,46 @@ Analyze this insurance response test case:
     3. Reason: Two line description of reason for the score. 
     
     Example Response:
-    {{
+    {
         "Relavancy score": 85,
         "Reason": "Reason for the score",
         "breakdown": [
-            {{
+            {
                 "Irrelavant Details: Python is great for data science. Start with basics like variables and loops. Also, Java is popular for enterprise apps.",
                 "Deduction": 15
-            }}
+            }
         ]
-    }}
-    """
+    }
+"""
+
+RELEVANCY_INPUT_TEMPLATE = """
+    Question: {question}
+    Actual Result: {actual_result}
+"""
 
-    formatted_prompt = prompt_template.format(
-        question=question,
-        actual_result=actual_result
-    )
+async def evaluate_relevancy_async(question, actual_result, api_key, api_url):
+    """
+    Evaluates the relevancy of a chatbot response using a detailed insurance-specific prompt.
+    Returns:
+    - dict: {"score": ..., "reason": ...}
+    - float: elapsed time in seconds
+    """
+    start_time = time.time()
+    content = ""
     
-    payload = {
-        "model": "deepseek-chat",
-        "messages": [
-            {"role": "user", "content": formatted_prompt}
-        ],
-        "temperature": 0.0,
-        "max_tokens": 1000
-    }
     
     try:
-        response = requests.post(api_url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
-        
-        result = response.json()
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-        
-        # Extract JSON from content
-        try:
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = content[json_start:json_end]
-                evaluation_result = json.loads(json_str)
-                breakdown = evaluation_result.get("breakdown", [])
-            else:
-                evaluation_result = {"score": 0, "reason": "Could not parse API response."}
-                breakdown = evaluation_result.get("breakdown", [])
-        except json.JSONDecodeError:
-            evaluation_result = {"score": 0, "reason": "Could not parse API response."}
-            breakdown = []
-        
+        judgment = await judge_chunked_async(
+            api_url, api_key, RELEVANCY_INPUT_TEMPLATE, question, actual_result, whole_answer=True,
+            cache_tag="relevancy",
+            system=RELEVANCY_SYSTEM_PROMPT, temperature=0.0, max_tokens=1000, json_mode=False
+        )
+        content = judgment.content
+        evaluation_result = judgment.data or {"score": 0, "reason": "Could not parse API response."}
+        breakdown = evaluation_result.get("breakdown", [])
+
+    except APIRequestError:
+        raise
     except Exception as e:
         evaluation_result = {"score": 0, "reason": f"Error: {str(e)}"}
         breakdown = []
@@ -120,16 +95,7 @@ Analyze this insurance response test case:
 
     # Calculate score from breakdown if available
     if breakdown and isinstance(breakdown, list):
-        total_deduction = 0
-        for item in breakdown:
-            if isinstance(item, dict):
-                for k, v in item.items():
-                    if "deduction" in k.lower():
-                        try:
-                            total_deduction += int(str(v).replace("%", ""))
-                        except Exception:
-                            pass
-        score = max(0, 100 - total_deduction)
+        score = max(0, 100 - sum_deductions(breakdown))
     else:
         score = (
             evaluation_result.get("Relavancy_score")
@@ -169,3 +135,9 @@ Analyze this insurance response test case:
 
     print("Evaluation result dict:", evaluation_result)
     return {"score": score, "reason": summary}, elapsed_time
+
+def evaluate_relevancy(question, actual_result, api_key, api_url):
+    """
+    Blocking wrapper around evaluate_relevancy_async for the GUI and batch processor.
+    """
+    return run_sync(evaluate_relevancy_async(question, actual_result, api_key, api_url))
@@ -0,0 +1,87 @@
+import asyncio
+from collections import Counter
+from statistics import median
+
+# Helpers for metrics that sample the judge several times and aggregate
+# the runs (median score, most common breakdown).
+
+
+async def run_samples(run_once, num_runs, start=0):
+    """
+    Fire all runs of a multi-run metric concurrently.
+
+    Parameters:
+    - run_once (coroutine function): Called as run_once(run_index); returns one run's result
+    - num_runs (int): Number of runs to perform
+    - start (int): Index of the first run, when adding runs to earlier ones
+
+    Returns:
+    - list: Run results in run order, so aggregation does not depend on which
+      request happened to finish first
+    """
+    tasks = [asyncio.ensure_future(run_once(run_index)) for run_index in range(start, start + num_runs)]
+    try:
+        # Wait as results arrive so a failing run cancels the rest straight away
+        for finished in asyncio.as_completed(tasks):
+            await finished
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [task.result() for task in tasks]
+
+
+def median_score(scores):
+    """Median of run scores, kept as an int when it is a whole number."""
+    value = median(scores)
+    return int(value) if value == int(value) else value
+
+
+def runs_needed(scores, max_runs, max_spread=None):
+    """
+    Return how many more runs could still change the aggregated score.
+
+    Sampling is settled when the most common score is held by more than half
+    of max_runs (the median can no longer move), or when the spread of the
+    scores so far is within max_spread.
+    """
+    remaining = max_runs - len(scores)
+    if remaining <= 0 or not scores:
+        return max(remaining, 0)
+    if max_spread is not None and len(scores) > 1 and max(scores) - min(scores) <= max_spread:
+        return 0
+    majority = max_runs // 2 + 1
+    top_count = Counter(scores).most_common(1)[0][1]
+    if top_count >= majority:
+        return 0
+    # Smallest number of extra runs that could give some score a majority
+    return min(remaining, majority - top_count)
+
+
+async def run_samples_sequential(run_once, max_runs, score_of, min_runs=2, max_spread=None):
+    """
+    Sample a multi-run metric only until more runs cannot change the result.
+
+    Starts with min_runs concurrent runs and escalates, a few runs at a time,
+    only while the samples disagree. Runs whose score is None failed; they
+    count against max_runs but not towards agreement, so two failed runs
+    never settle the result.
+
+    Parameters:
+    - run_once (coroutine function): Called as run_once(run_index); returns one run's result
+    - max_runs (int): Upper bound on the number of runs
+    - score_of (function): Extracts the score from one run's result, None for a failed run
+    - min_runs (int): Runs fired before the first agreement check
+    - max_spread (float): Optional bound on max-min score difference that counts as agreement
+
+    Returns:
+    - list: Run results in run order; its length is the number of runs used
+    """
+    results = await run_samples(run_once, min(min_runs, max_runs))
+    while True:
+        scores = [score_of(r) for r in results]
+        valid = [score for score in scores if score is not None]
+        extra = runs_needed(valid, max_runs - (len(scores) - len(valid)), max_spread)
+        if extra == 0:
+            return results
+        results += await run_samples(run_once, extra, start=len(results))
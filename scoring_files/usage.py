@@ -0,0 +1,201 @@
+import contextlib
+import contextvars
+import math
+import threading
+
+# Token and cost accounting for judge calls.
+# judge_async reports the usage of every call to record_usage, which adds it
+# to the process-wide totals and to the UsageMeter of the enclosing
+# metered_usage() block, if there is one. The batch processor opens such a
+# block around each (row, metric) unit, so spend can be attributed to the
+# call, the metric, the row and the batch. The current meter is held in a
+# context variable: concurrent units on the shared event loop each see their
+# own meter, and the sampling runs a unit starts inherit it.
+#
+# Judgments served from the local judgment cache count as calls but cost
+# no tokens.
+
+# prompt_cache_hit/miss_tokens split prompt_tokens into the part the provider
+# served from its prefix cache (billed at a fraction of the price) and the rest
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens",
+                "prompt_cache_hit_tokens", "prompt_cache_miss_tokens")
+
+# USD per million tokens (deepseek-chat list prices); change them with
+# configure_pricing when the model or plan differs
+DEFAULT_PRICES = {
+    "prompt_cache_hit_tokens": 0.07,
+    "prompt_cache_miss_tokens": 0.27,
+    "completion_tokens": 1.10,
+}
+
+# Token counts without a tokenizer, for estimates: DeepSeek documents about
+# 0.3 tokens per English character and 0.6 per Chinese character
+TOKENS_PER_ASCII_CHAR = 0.3
+TOKENS_PER_OTHER_CHAR = 0.6
+
+_prices = dict(DEFAULT_PRICES)
+_current_meter = contextvars.ContextVar("usage_meter", default=None)
+
+
+def configure_pricing(cache_hit=None, cache_miss=None, completion=None):
+    """
+    Set the prices used for cost totals, in USD per million tokens.
+    Prices left as None keep their current value.
+    """
+    for field, price in (("prompt_cache_hit_tokens", cache_hit),
+                         ("prompt_cache_miss_tokens", cache_miss),
+                         ("completion_tokens", completion)):
+        if price is not None:
+            _prices[field] = float(price)
+
+
+def usage_cost(usage):
+    """
+    USD cost of a usage dict. Providers that do not report cache hits are
+    billed entirely at the cache-miss price.
+    """
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    hit_tokens = usage.get("prompt_cache_hit_tokens") or 0
+    miss_tokens = usage.get("prompt_cache_miss_tokens") or max(0, prompt_tokens - hit_tokens)
+    completion_tokens = usage.get("completion_tokens") or 0
+    return (hit_tokens * _prices["prompt_cache_hit_tokens"]
+            + miss_tokens * _prices["prompt_cache_miss_tokens"]
+            + completion_tokens * _prices["completion_tokens"]) / 1_000_000
+
+
+def estimate_tokens(text):
+    """Approximate token count of a text, from its characters."""
+    if text is None:
+        return 0
+    text = str(text)
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars * TOKENS_PER_ASCII_CHAR + (len(text) - ascii_chars) * TOKENS_PER_OTHER_CHAR)
+
+
+def empty_usage():
+    return {**dict.fromkeys(("calls", "cached_calls") + USAGE_FIELDS, 0), "cost": 0.0}
+
+
+class UsageMeter:
+    """
+    Token usage and cost, per metric. Safe to share between threads.
+
+    Parameters:
+    - parent (UsageMeter): Meter that also receives everything added to this one
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def add(self, metric, usage, cached=False):
+        """Count one call."""
+        with self._lock:
+            totals = self._metrics.setdefault(metric, empty_usage())
+            totals["calls"] += 1
+            if cached:
+                totals["cached_calls"] += 1
+            else:
+                for field in USAGE_FIELDS:
+                    totals[field] += usage.get(field) or 0
+                totals["cost"] += usage_cost(usage)
+        if self.parent is not None:
+            self.parent.add(metric, usage, cached)
+
+    def merge(self, other):
+        """Add the totals of another meter to this one."""
+        for metric, usage in other.by_metric().items():
+            with self._lock:
+                totals = self._metrics.setdefault(metric, empty_usage())
+                for field, count in usage.items():
+                    totals[field] += count
+
+    def by_metric(self):
+        """
+        Returns:
+        - dict: {metric: {"calls", "cached_calls", "prompt_tokens", ..., "cost"}}
+        """
+        with self._lock:
+            return {metric: dict(totals) for metric, totals in self._metrics.items()}
+
+    def total(self):
+        """Sum over all metrics, in the same layout as one by_metric() entry."""
+        total = empty_usage()
+        for usage in self.by_metric().values():
+            for field, count in usage.items():
+                total[field] += count
+        return total
+
+    @property
+    def tokens(self):
+        return self.total()["total_tokens"]
+
+    @property
+    def cost(self):
+        return self.total()["cost"]
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+_totals = UsageMeter()
+
+
+def record_usage(metric, usage, cached=False):
+    """Count one judge call towards the process totals and the current meter."""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.add(metric, usage, cached)
+    _totals.add(metric, usage, cached)
+
+
+@contextlib.contextmanager
+def metered_usage():
+    """
+    Meter the judge calls made inside the block, including those of tasks it
+    starts. Blocks can be nested; the outer meter includes the inner one.
+
+    Yields:
+    - UsageMeter
+    """
+    meter = UsageMeter(parent=_current_meter.get())
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+
+def get_usage_totals():
+    """
+    Token usage since start (or the last reset_usage_totals), per metric.
+
+    Returns:
+    - dict: {metric: {"calls", "cached_calls", "prompt_tokens", ..., "cost"}}
+    """
+    return _totals.by_metric()
+
+
+def reset_usage_totals():
+    _totals.clear()
+
+
+def prompt_cache_report(totals):
+    """
+    One-line summary of how much of the prompt input the provider served from
+    its prefix cache.
+
+    Parameters:
+    - totals (dict): {metric: usage}, e.g. get_usage_totals() or UsageMeter.by_metric()
+
+    Returns:
+    - str: the summary, or "" when no prompt tokens were spent
+    """
+    prompt_tokens = sum(usage.get("prompt_tokens", 0) for usage in totals.values())
+    if not prompt_tokens:
+        return ""
+    hit_tokens = sum(usage.get("prompt_cache_hit_tokens", 0) for usage in totals.values())
+    return (f"Prompt cache: {hit_tokens:,} of {prompt_tokens:,} prompt tokens were cache hits "
+            f"({hit_tokens / prompt_tokens * 100:.1f}%)")
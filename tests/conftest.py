@@ -0,0 +1,47 @@
+import os
+import sys
+
+# Run from a checkout: the packages live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests never call the API, and must not read or fill the user's judgment cache
+os.environ["GENAI_EVALUATOR_CACHE"] = "off"
+
+
+import pandas as pd
+import pytest
+
+from batch_processing.batch_processor import BatchProcessor
+
+INPUT_COLUMNS = ["Question to chatbot", "Chatbot Response", "Expected Response"]
+
+
+@pytest.fixture
+def processor():
+    """BatchProcessor for Correctness (reads the expected response) and Bias (does not)."""
+    batch = BatchProcessor("test-key", "http://127.0.0.1:9/v1/chat/completions", {}, max_workers=4)
+    batch.metrics = ["Correctness", "Bias"]
+    return batch
+
+
+@pytest.fixture
+def judge(monkeypatch):
+    """
+    Replace the API with a fixed score per metric. Returns the list of
+    (metric, question, response, expected) evaluations that were made.
+    """
+    calls = []
+    scores = {"Correctness": 85, "Bias": 10}
+
+    async def score_metric(self, evaluator, metric, idx, question, chatbot_response,
+                           expected_response, status_callback=None):
+        calls.append((metric, question, chatbot_response, expected_response))
+        return self.format_cell(metric, {"score": scores.get(metric, 50), "reason": f"{metric} ok"})
+
+    monkeypatch.setattr(BatchProcessor, "score_metric", score_metric)
+    return calls
+
+
+def input_frame(rows):
+    """DataFrame with the required input columns from (question, response, expected) tuples."""
+    return pd.DataFrame(rows, columns=INPUT_COLUMNS)
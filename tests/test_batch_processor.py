@@ -0,0 +1,50 @@
+import math
+
+import pandas as pd
+
+from conftest import input_frame
+
+
+def test_duplicates_are_evaluated_once_per_metric(processor):
+    rows = processor.input_rows(input_frame([
+        ("q", "r", "e"),
+        ("q", "r", "e"),
+        ("q", "r", "other"),
+        ("q2", "r", "e"),
+    ]))
+    units = processor.plan_units(rows)
+
+    correctness = {key: unit for key, unit in units.items() if key[0] == "Correctness"}
+    bias = {key: unit for key, unit in units.items() if key[0] == "Bias"}
+    # Correctness reads the expected response, so row 2 is its own unit
+    assert sorted(unit[4] for unit in correctness.values()) == [[0, 1], [2], [3]]
+    # Bias ignores it, so rows 0-2 share one evaluation
+    assert sorted(unit[4] for unit in bias.values()) == [[0, 1, 2], [3]]
+    # The first row of a group is the one evaluated
+    assert all(unit[0] == unit[4][0] for unit in units.values())
+
+
+def test_combined_units_key_on_expected_when_any_metric_reads_it(processor):
+    processor.combined_judge = True
+    rows = processor.input_rows(input_frame([("q", "r", "e"), ("q", "r", "other"), ("q", "r", "e")]))
+    units = processor.plan_units(rows)
+    assert sorted(unit[4] for unit in units.values()) == [[0, 2], [1]]
+    assert all(key[0] is None for key in units)
+
+
+def test_blank_cells_read_the_same_on_every_path(processor):
+    frame = pd.DataFrame({
+        "Question to chatbot": ["q", "q", "q"],
+        "Chatbot Response": ["r", "r", "r"],
+        "Expected Response": pd.array([None, math.nan, pd.NA], dtype=object),
+    })
+    rows = processor.input_rows(frame)
+    assert rows == [(0, "q", "r", ""), (1, "q", "r", ""), (2, "q", "r", "")]
+    # ... and so all three are one unit per metric
+    assert len(processor.plan_units(rows)) == 2
+
+
+def test_missing_optional_column_reads_as_blank(processor):
+    frame = pd.DataFrame({"question to chatbot": ["q"], "CHATBOT RESPONSE": ["r"]})
+    assert processor.input_rows(frame) == [(0, "q", "r", "")]
+
@@ -0,0 +1,94 @@
+import random
+from collections import Counter
+
+import pytest
+
+from scoring_files.chunking import align_segments, merge_answers, split_pieces, split_text, worst_answer
+from scoring_files.usage import estimate_tokens
+
+
+def paragraphs(seed, count, sentences=6, vocabulary=None):
+    rng = random.Random(seed)
+    words = vocabulary or [f"word{i}" for i in range(200)]
+    return "\n\n".join(
+        " ".join(" ".join(rng.choice(words) for _ in range(rng.randint(5, 25))) + "." for _ in range(sentences))
+        for _ in range(count)
+    )
+
+
+def words(text):
+    return Counter(text.split())
+
+
+def test_split_text_keeps_every_character():
+    text = paragraphs(1, 40)
+    segments = split_text(text, max_tokens=200)
+    assert len(segments) > 1
+    assert "".join(segments) == text
+    assert all(estimate_tokens(segment) <= 200 for segment in segments)
+
+
+def test_split_pieces_falls_back_to_words():
+    text = "x" * 10 + " " + "y " * 400
+    assert "".join(split_pieces(text, 50)) == text
+
+
+def test_short_pairs_are_one_segment():
+    assert align_segments("short answer", "short expected") == [("short answer", "short expected")]
+    assert align_segments(None, None) == [("", "")]
+
+
+@pytest.mark.parametrize("seed, actual_count, expected_count", [
+    (0, 30, 30),   # similar lengths
+    (1, 60, 5),    # long response, short expected
+    (2, 5, 60),    # short response, long expected
+    (3, 80, 80),
+])
+def test_align_segments_loses_no_response_text(seed, actual_count, expected_count):
+    actual = paragraphs(seed, actual_count)
+    expected = paragraphs(seed + 100, expected_count)
+    pairs = align_segments(actual, expected, max_tokens=600)
+
+    assert len(pairs) > 1
+    assert words("".join(segment for segment, _ in pairs)) == words(actual)
+    for actual_segment, expected_segment in pairs:
+        assert actual_segment
+        assert estimate_tokens(actual_segment) + estimate_tokens(expected_segment) <= 600
+
+
+def test_align_segments_keeps_order_when_everything_fits():
+    actual = paragraphs(5, 30)
+    expected = paragraphs(6, 30)
+    pairs = align_segments(actual, expected, max_tokens=800)
+    assert "".join(segment for segment, _ in pairs) == actual
+    # Expected segments are used in order, never going back
+    expected_starts = [expected.find(segment) for _, segment in pairs]
+    assert expected_starts == sorted(expected_starts)
+
+
+def test_align_segments_follows_shared_wording():
+    topics = [[f"{topic}{i}" for i in range(30)] for topic in ("alpha", "beta", "gamma")]
+    expected = "\n\n".join(paragraphs(i, 4, vocabulary=words) for i, words in enumerate(topics))
+    actual = "\n\n".join(paragraphs(i + 10, 4, vocabulary=words) for i, words in enumerate(topics))
+    for actual_segment, expected_segment in align_segments(actual, expected, max_tokens=900):
+        topic = max(("alpha", "beta", "gamma"), key=actual_segment.count)
+        assert topic in expected_segment
+
+
+def test_merge_answers_keeps_worst_score_and_every_issue():
+    answers = [
+        {"score": 85, "breakdown": [{"issue": "a", "deduction": 15}]},
+        {"score": 90, "breakdown": [{"issue": "b", "deduction": 10}, {"issue": "a", "deduction": 15}]},
+    ]
+    merged = merge_answers(answers)
+    assert merged["score"] == 85
+    assert [item["issue"] for item in merged["breakdown"]] == ["a", "b"]
+    assert merge_answers(answers, lower_is_better=True)["score"] == 90
+
+
+def test_worst_answer_for_whole_answer_metrics():
+    answers = [
+        {"score": 90, "breakdown": [{"missing": "a", "deduction": 10}]},
+        {"score": 70, "breakdown": [{"missing": "b", "deduction": 30}]},
+    ]
+    assert worst_answer(answers)["score"] == 70
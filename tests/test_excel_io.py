@@ -0,0 +1,45 @@
+import pytest
+from openpyxl import load_workbook
+
+from conftest import input_frame
+
+
+def cell_styles(path):
+    worksheet = load_workbook(path)["Results"]
+    return [[cell.style for cell in row] for row in worksheet.iter_rows()]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "inputs.xlsx"
+    input_frame([("q0", "r0", "e0"), ("q1", "r1", None)]).to_excel(path, index=False)
+    return str(path)
+
+
+def test_streamed_and_in_memory_results_are_styled_alike(processor, judge, workbook, tmp_path):
+    streamed = str(tmp_path / "streamed.xlsx")
+    processor.process_batch_streaming(workbook, streamed)
+    in_memory = str(tmp_path / "in_memory.xlsx")
+    df, _ = processor.process_batch(workbook)
+    processor.save_results(df, in_memory, add_summary=True)
+
+    styles = cell_styles(in_memory)
+    assert styles == cell_styles(streamed)
+    header = ["Question to chatbot", "Chatbot Response", "Expected Response",
+              "Correctness Score", "Correctness Status", "Correctness Reason"]
+    assert styles[0][:len(header)] == ["Result Header"] * len(header)
+    assert styles[1][:len(header)] == ["Result Text"] * 3 + ["Result Score", "Result Status", "Result Text"]
+
+
+def test_results_workbook_summary(processor, judge, workbook, tmp_path):
+    output = str(tmp_path / "out.xlsx")
+    df, _ = processor.process_batch(workbook)
+    processor.save_results(df, output, add_summary=True)
+
+    results = load_workbook(output)
+    assert results["Results"]["D2"].value == 85
+    assert results["Results"]["D2"].number_format == '0"%"'
+    summary = {row[0]: row[1] for row in results["Summary"].iter_rows(values_only=True) if row and row[0]}
+    assert summary["Correctness"] == 0  # 85 is below the default threshold of 90
+    assert summary["Bias"] == 1
+    assert summary["Duplicate Rows"] == 0
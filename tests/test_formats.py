@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from conftest import input_frame
+
+
+def schema_of(path):
+    return [(field.name, str(field.type)) for field in pq.read_schema(path)]
+
+
+@pytest.fixture(params=["parquet", "csv", "xlsx", "jsonl"])
+def inputs(request, tmp_path):
+    """Input file with an extra integer column and a blank expected response."""
+    rows = [("q0", "r0", "e0"), ("q1", "r1", None)]
+    frame = input_frame(rows)
+    frame["n"] = [1, 2]
+    path = tmp_path / f"inputs.{request.param}"
+    if request.param == "parquet":
+        columns = {name: list(values) for name, values in zip(frame.columns, zip(*rows))}
+        pq.write_table(pa.table({**columns, "n": pa.array([1, 2], pa.int32())}), path)
+    elif request.param == "csv":
+        frame.to_csv(path, index=False)
+    elif request.param == "xlsx":
+        frame.to_excel(path, index=False)
+    else:
+        frame.to_json(path, orient="records", lines=True)
+    return str(path)
+
+
+def test_streamed_parquet_has_the_in_memory_schema(processor, judge, inputs, tmp_path):
+    streamed = str(tmp_path / "streamed.parquet")
+    processor.process_batch_streaming(inputs, streamed)
+    in_memory = str(tmp_path / "in_memory.parquet")
+    df, _ = processor.process_batch(inputs)
+    processor.save_results(df, in_memory)
+
+    assert schema_of(streamed) == schema_of(in_memory)
+    assert pd.read_parquet(streamed)["Correctness Score"].tolist() == [85, 85]
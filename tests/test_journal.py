@@ -0,0 +1,139 @@
+import json
+
+import pandas as pd
+import pytest
+
+from batch_processing.batch_processor import BatchProcessor
+from batch_processing.journal import BatchJournal, file_fingerprint, journal_path_for, load_journal
+from conftest import input_frame
+
+ROWS = [("q0", "r0", "e0"), ("q1", "r1", None), ("q2", "r2", "e2"), ("q3", "r3", "e3"), ("q4", "r4", None)]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "inputs.xlsx"
+    input_frame(ROWS).to_excel(path, index=False)
+    return str(path)
+
+
+def score_columns(df):
+    return df[[f"{metric} {kind}" for metric in ("Correctness", "Bias") for kind in ("Score", "Status")]]
+
+
+def test_resume_restores_every_journaled_cell(processor, judge, workbook):
+    first, _ = processor.process_batch(workbook)
+    assert len(judge) == 10
+    judge.clear()
+
+    resumed, _ = processor.process_batch(workbook, resume=True)
+    assert judge == []
+    pd.testing.assert_frame_equal(score_columns(resumed), score_columns(first))
+
+
+def test_resume_evaluates_only_missing_cells(processor, judge, workbook):
+    processor.process_batch(workbook)
+    journal_path = journal_path_for(workbook)
+    with open(journal_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    # Keep the header and three cells, and end on a line cut off mid-write
+    with open(journal_path, "w", encoding="utf-8") as f:
+        f.writelines(lines[:4])
+        f.write(lines[4][:10])
+    judge.clear()
+
+    resumed, _ = processor.process_batch(workbook, resume=True)
+    assert len(judge) == 7
+    assert score_columns(resumed).notna().all().all()
+
+
+@pytest.mark.parametrize("first_path, second_path", [("memory", "streaming"), ("streaming", "memory")])
+def test_resume_on_the_other_read_path(processor, judge, workbook, tmp_path, first_path, second_path):
+    def run(path, **kwargs):
+        if path == "memory":
+            processor.process_batch(workbook, **kwargs)
+        else:
+            processor.process_batch_streaming(workbook, str(tmp_path / "out.csv"), **kwargs)
+
+    run(first_path)
+    assert len(judge) == 10
+    judge.clear()
+    run(second_path, resume=True)
+    assert judge == []
+
+
+def test_resume_judges_status_with_current_thresholds(judge, workbook, tmp_path):
+    strict = BatchProcessor("k", "http://127.0.0.1:9", {"Correctness": 90, "Bias": 20}, max_workers=2)
+    strict.metrics = ["Correctness", "Bias"]
+    first, _ = strict.process_batch(workbook)
+    assert set(first["Correctness Status"]) == {"Failed"}
+    judge.clear()
+
+    lenient = BatchProcessor("k", "http://127.0.0.1:9", {"Correctness": 80, "Bias": 5}, max_workers=2)
+    lenient.metrics = ["Correctness", "Bias"]
+    resumed, _ = lenient.process_batch(workbook, resume=True)
+    assert judge == []
+    assert set(resumed["Correctness Status"]) == {"Passed"}
+    # Bias is lower-is-better: 10 fails a threshold of 5
+    assert set(resumed["Bias Status"]) == {"Failed"}
+
+    output = tmp_path / "out.csv"
+    lenient.process_batch_streaming(workbook, str(output), resume=True)
+    assert judge == []
+    assert set(pd.read_csv(output)["Correctness Status"]) == {"Passed"}
+
+
+def test_restore_cell(processor):
+    processor.accept_criteria = {"Correctness": 80, "Bias": 5}
+    assert processor.restore_cell("Correctness", (85, "Failed", "r")) == (85, "Passed", "r")
+    assert processor.restore_cell("Bias", (10, "Passed", "r")) == (10, "Failed", "r")
+
+
+def test_failed_cells_are_retried_on_resume(processor, judge, workbook, monkeypatch):
+    succeed = BatchProcessor.score_metric  # the judge fixture's fake
+
+    async def bias_down(self, evaluator, metric, idx, *inputs, **kwargs):
+        if metric == "Bias":
+            return None, None, "API request failed"
+        return await succeed(self, evaluator, metric, idx, *inputs, **kwargs)
+
+    monkeypatch.setattr(BatchProcessor, "score_metric", bias_down)
+    processor.process_batch(workbook)
+    judge.clear()
+
+    monkeypatch.setattr(BatchProcessor, "score_metric", succeed)
+    resumed, _ = processor.process_batch(workbook, resume=True)
+    assert sorted(metric for metric, *_ in judge) == ["Bias"] * 5
+    assert resumed["Bias Score"].notna().all()
+
+
+def test_run_on_changed_inputs_keeps_the_old_journal(processor, judge, workbook):
+    processor.process_batch(workbook)
+    old_fingerprint = file_fingerprint(workbook)
+
+    input_frame(ROWS[:3]).to_excel(workbook, index=False)
+    processor.process_batch(workbook, resume=True)
+
+    journal_path = journal_path_for(workbook)
+    assert len(load_journal(journal_path, old_fingerprint)) == 10
+    assert len(load_journal(journal_path, file_fingerprint(workbook))) == 6
+
+
+def test_fresh_run_supersedes_earlier_cells_of_same_inputs(processor, judge, workbook):
+    processor.process_batch(workbook)
+    # A run that does not resume, stopped before evaluating anything
+    processor.process_batch(workbook, stop_flag=lambda: True)
+    assert load_journal(journal_path_for(workbook), file_fingerprint(workbook)) == {}
+
+
+def test_journal_ignores_other_versions(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": 1, "fingerprint": "abc"}) + "\n")
+        f.write(json.dumps({"row": 0, "metric": "Bias", "score": 1, "status": "Passed", "reason": ""}) + "\n")
+    assert load_journal(path, "abc") == {}
+
+    journal = BatchJournal(path, "abc", resumed=True)
+    journal.record(1, "Bias", 2, "Passed", "r")
+    journal.close()
+    assert load_journal(path, "abc") == {(1, "Bias"): (2, "Passed", "r")}
@@ -0,0 +1,117 @@
+import types
+
+import pytest
+
+from scoring_files import judgment_cache
+from scoring_files.judgment_cache import JudgmentCache, fingerprint
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module."""
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(judgment_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    caches = []
+
+    def open_cache(**kwargs):
+        caches.append(JudgmentCache(tmp_path / "judgments.sqlite", **kwargs))
+        return caches[-1]
+
+    yield open_cache
+    for opened in caches:
+        opened.close()
+
+
+def test_get_returns_what_was_put(cache):
+    store = cache()
+    assert store.get("k") is None
+    store.put("k", '{"score": 80}')
+    assert store.get("k") == '{"score": 80}'
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    store = cache(ttl=60)
+    store.put("k", "body")
+    clock.value += 59
+    assert store.get("k") == "body"
+    clock.value += 2
+    assert store.get("k") is None
+    # The expired entry is removed, not just skipped
+    assert store.stats()["entries"] == 0
+    assert store.stats()["bytes"] == 0
+
+
+def test_no_ttl_keeps_entries(cache, clock):
+    store = cache(ttl=None)
+    store.put("k", "body")
+    clock.value += 10 ** 9
+    assert store.get("k") == "body"
+
+
+def test_eviction_drops_least_recently_used_first(cache, clock):
+    store = cache(max_bytes=300, ttl=None)
+    for key in "abc":
+        store.put(key, "x" * 100)
+        clock.value += 1
+    # Reading "a" makes "b" the least recently used entry
+    store.get("a")
+    clock.value += 1
+    store.put("d", "x" * 100)
+
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("d") is not None
+    assert store.stats()["bytes"] <= 300
+
+
+def test_eviction_drops_expired_entries_before_live_ones(cache, clock):
+    store = cache(max_bytes=300, ttl=60)
+    store.put("old", "x" * 200)
+    clock.value += 10
+    store.put("new", "x" * 50)
+    clock.value += 10
+    # "old" is read last, so by recency alone "new" would be evicted first
+    store.get("old")
+    clock.value += 50
+    store.put("b", "x" * 100)
+
+    assert store.get("new") is not None
+    assert store.get("b") is not None
+    assert store.stats()["entries"] == 2
+    assert store.stats()["bytes"] == 150
+
+
+def test_replacing_an_entry_keeps_the_size_total_right(cache):
+    store = cache()
+    store.put("k", "x" * 100)
+    store.put("k", "x" * 10)
+    assert store.stats()["bytes"] == 10
+    assert store.stats()["entries"] == 1
+
+
+def test_size_total_survives_reopening(tmp_path):
+    path = tmp_path / "judgments.sqlite"
+    store = JudgmentCache(path)
+    store.put("k", "x" * 42)
+    store.close()
+    reopened = JudgmentCache(path)
+    try:
+        assert reopened.stats()["bytes"] == 42
+        assert reopened.get("k") == "x" * 42
+    finally:
+        reopened.close()
+
+
+def test_fingerprint_changes_with_payload_and_tag():
+    payload = {"model": "deepseek-chat", "messages": [{"role": "user", "content": "q"}]}
+    key = fingerprint("https://api", payload, "bias:0")
+    assert key == fingerprint("https://api", dict(payload), "bias:0")
+    assert key != fingerprint("https://api", payload, "bias:1")
+    assert key != fingerprint("https://api", {**payload, "temperature": 0.5}, "bias:0")
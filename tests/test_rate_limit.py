@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from scoring_files.rate_limit import AdaptiveRateLimiter, parse_duration
+
+
+def test_throttle_halves_concurrency_and_rate():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, requests_per_second=10, cooldown=0)
+    limiter.on_throttle(retry_after=0)
+    assert limiter.stats()["concurrency"] == 4
+    assert limiter.rate == pytest.approx(5)
+    limiter.on_throttle(retry_after=0)
+    assert limiter.stats()["concurrency"] == 2
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_burst_of_throttles_within_cooldown_decreases_once():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, cooldown=60)
+    for _ in range(5):
+        limiter.on_throttle(retry_after=0)
+    assert limiter.stats()["concurrency"] == 4
+    assert limiter.stats()["throttled"] == 5
+
+
+def test_window_never_shrinks_below_min_concurrency():
+    limiter = AdaptiveRateLimiter(max_concurrency=4, min_concurrency=2, cooldown=0)
+    for _ in range(10):
+        limiter.on_throttle(retry_after=0)
+    assert limiter.stats()["concurrency"] == 2
+
+
+def test_success_grows_window_additively_back_to_max():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, requests_per_second=10, cooldown=0)
+    limiter.on_throttle(retry_after=0)
+    limiter.on_success()
+    # +1/window per success: one success does not restore the old window
+    assert 4 < limiter.concurrency < 5
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.stats()["concurrency"] == 8
+    assert limiter.rate == pytest.approx(10)
+
+
+def test_retry_after_pauses_all_requests():
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+    resume_in = limiter.on_throttle(retry_after=2.0)
+    assert resume_in == pytest.approx(2.0, abs=0.1)
+    wait = limiter._try_acquire()
+    assert wait == pytest.approx(2.0, abs=0.1)
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_backoff_without_retry_after_grows_with_attempt():
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+    first = limiter.on_throttle(attempt=0)
+    limiter.paused_until = 0.0
+    third = limiter.on_throttle(attempt=3)
+    assert 1.0 <= first <= 2.0
+    assert 8.0 <= third <= 9.0
+
+
+def test_exhausted_rate_limit_headers_pause_until_reset():
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+    limiter.update_from_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1.5s"})
+    assert limiter.paused_until - time.monotonic() == pytest.approx(1.5, abs=0.1)
+
+
+def test_remaining_requests_do_not_pause():
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+    limiter.update_from_headers({"x-ratelimit-remaining": "12", "x-ratelimit-reset": "30"})
+    assert limiter._try_acquire() == 0.0
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2", 2.0),
+    ("1.5", 1.5),
+    ("250ms", 0.25),
+    ("1m30s", 90.0),
+    ("1h", 3600.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+def test_parse_duration_http_date_and_garbage():
+    http_date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert parse_duration(http_date) == pytest.approx(30, abs=2)
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
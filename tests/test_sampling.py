@@ -0,0 +1,60 @@
+import asyncio
+
+from scoring_files.sampling import median_score, run_samples, run_samples_sequential, runs_needed
+
+
+def sample(scores):
+    """run_once returning scores[i] for run i, recording the runs made."""
+    calls = []
+
+    async def run_once(run_index):
+        calls.append(run_index)
+        return scores[run_index]
+
+    return run_once, calls
+
+
+def test_run_samples_keeps_run_order():
+    async def run_once(run_index):
+        await asyncio.sleep(0.01 * (3 - run_index))
+        return run_index
+
+    assert asyncio.run(run_samples(run_once, 3)) == [0, 1, 2]
+
+
+def test_agreeing_runs_stop_early():
+    run_once, calls = sample([20, 20, 50, 50, 50])
+    results = asyncio.run(run_samples_sequential(run_once, 3, lambda score: score))
+    assert results == [20, 20]
+    assert calls == [0, 1]
+
+
+def test_disagreeing_runs_escalate():
+    run_once, calls = sample([20, 40, 40, 90, 90])
+    results = asyncio.run(run_samples_sequential(run_once, 3, lambda score: score))
+    assert results == [20, 40, 40]
+    assert calls == [0, 1, 2]
+    assert median_score(results) == 40
+
+
+def test_failed_runs_do_not_count_as_agreement():
+    run_once, calls = sample([None, None, 30, 30, 30])
+    results = asyncio.run(run_samples_sequential(run_once, 5, lambda score: score))
+    # Two failures must not settle sampling; the remaining runs decide
+    assert calls == [0, 1, 2, 3, 4]
+    assert median_score([score for score in results if score is not None]) == 30
+
+
+def test_failed_runs_use_up_the_run_budget():
+    run_once, calls = sample([None, None, None])
+    results = asyncio.run(run_samples_sequential(run_once, 3, lambda score: score))
+    assert results == [None, None, None]
+    assert calls == [0, 1, 2]
+
+
+def test_runs_needed():
+    assert runs_needed([], 3) == 3
+    assert runs_needed([10, 10], 3) == 0
+    assert runs_needed([10, 20], 3) == 1
+    assert runs_needed([10, 14], 5, max_spread=5) == 0
+    assert runs_needed([10, 20, 30], 3) == 0
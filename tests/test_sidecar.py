@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from batch_processing import formats, sidecar
+from batch_processing.sidecar import read_input_frame, sidecar_path_for
+from conftest import input_frame
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """Workbook with blank expected responses, big enough to get a sidecar."""
+    monkeypatch.setattr(sidecar, "SIDECAR_MIN_ROWS", 4)
+    path = tmp_path / "inputs.xlsx"
+    input_frame([(f"q{i}", f"r{i}", None if i % 2 else f"e{i}") for i in range(6)]).to_excel(path, index=False)
+    return str(path)
+
+
+def test_sidecar_rows_match_the_parsed_rows(processor, workbook):
+    parsed = read_input_frame(workbook)
+    assert os.path.exists(sidecar_path_for(workbook))
+    mapped = read_input_frame(workbook)
+
+    assert processor.input_rows(mapped) == processor.input_rows(parsed)
+    assert processor.input_rows(mapped)[1] == (1, "q1", "r1", "")
+
+
+def test_sidecar_is_ignored_once_the_workbook_changes(workbook):
+    read_input_frame(workbook)
+    input_frame([("changed", "r", "e")] * 5).to_excel(workbook, index=False)
+    assert read_input_frame(workbook)["Question to chatbot"].tolist() == ["changed"] * 5
+
+
+def test_small_workbooks_get_no_sidecar(tmp_path):
+    path = str(tmp_path / "small.xlsx")
+    input_frame([("q", "r", "e")]).to_excel(path, index=False)
+    read_input_frame(path)
+    assert not os.path.exists(sidecar_path_for(path))
+
+
+def test_resume_from_the_sidecar_keeps_the_first_runs_journal(processor, judge, workbook):
+    # The first run parses the workbook and writes the sidecar
+    processor.process_batch(workbook)
+    assert len(judge) == 12
+    judge.clear()
+
+    # Drop the parsed frame so the resumed run maps the sidecar
+    formats._frame_cache.clear()
+    processor.process_batch(workbook, resume=True)
+    assert judge == []
+
+
+def test_sidecar_and_parsed_rows_send_the_same_prompts(processor, judge, workbook):
+    processor.process_batch(workbook)
+    parsed_calls = sorted(judge)
+    judge.clear()
+
+    formats._frame_cache.clear()
+    processor.process_batch(workbook)
+    assert sorted(judge) == parsed_calls